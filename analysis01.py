@@ -1,10 +1,15 @@
+import atexit
 import logging
+import pathlib
 from typing import Any
 from typing import Callable
 
 import click
 
 from mrtools import datasets
+from tools import cutflow
+from tools import histos
+from tools import weights
 
 log = logging.getLogger("mrtools.user")
 
@@ -30,14 +35,6 @@ SELECTION = [
     "HT>=300",
 ]
 
-WEIGHTS = [
-    "reweightPU",
-    "reweightBTag_SF",
-    "reweightL1Prefire",
-    "reweightwPt",
-    "reweightLeptonSF",
-]
-
 
 def def_event_selection(df: RDataFrame, selection: list[str]) -> RDataFrame:
     log.debug('Filter("%s")', " && ".join(selection))
@@ -47,19 +44,33 @@ def def_event_selection(df: RDataFrame, selection: list[str]) -> RDataFrame:
 def def_weight(
     df: RDataFrame, name: str, dataset_type: datasets.DatasetType
 ) -> RDataFrame:
-    if dataset_type == datasets.DatasetType.DATA:
-        w = "1"
-    else:
-        w = "*".join(WEIGHTS)
-    log.debug('Define("%s","%s")', name, w)
-    df = df.Define(name, w)
-
-    return df
+    is_data = dataset_type == datasets.DatasetType.DATA
+    return weights.def_weight(df, name, weights.FACTORS, is_data)
 
 
 class Analysis:
-    def __init__(self) -> None:
-        pass
+    cut_flow: bool
+    reorder_cuts: bool
+    systematics: pathlib.Path | None
+
+    def __init__(
+        self,
+        cut_flow: bool = False,
+        reorder_cuts: bool = False,
+        systematics: pathlib.Path | None = None,
+    ) -> None:
+        self.cut_flow = cut_flow
+        self.reorder_cuts = reorder_cuts
+        self.systematics = systematics
+        if cut_flow:
+            atexit.register(cutflow.report)
+        if systematics:
+            self.histos = histos.read_definitions(pathlib.Path(HISTOS_DEF))
+            atexit.register(histos.save, systematics)
+
+    def inputs(self) -> list[pathlib.Path]:
+        """Files read by the analysis, e.g. for the result cache."""
+        return []
 
     def __call__(
         self,
@@ -67,14 +78,51 @@ class Analysis:
         dataset_name: str,
         dataset_type: datasets.DatasetType,
         period: str,
+        first_entries: Callable[[int], RDataFrame] | None = None,
     ) -> dict[str, RDataFrame]:
+        """Dataframes of the selected events.
+
+        first_entries returns a bounded dataframe of the dataset (see
+        tools.samples.first_entries) to measure the cuts on.
+        """
         log.debug("Dataset %s", dataset_name)
-        df = def_event_selection(df, SELECTION)
         df = def_weight(df, "the_weight", dataset_type)
-
-        return {"main": df}
+        if self.cut_flow or self.reorder_cuts:
+            first = None
+            if self.reorder_cuts and first_entries is not None:
+                first = first_entries(cutflow.SAMPLE_ENTRIES)
+                first = def_weight(first, "the_weight", dataset_type)
+            df = cutflow.def_selection(
+                df,
+                dataset_name,
+                SELECTION,
+                "the_weight",
+                self.reorder_cuts,
+                self.cut_flow,
+                first,
+            )
+        else:
+            df = def_event_selection(df, SELECTION)
+
+        dfs = {"main": df}
+        if self.systematics:
+            histos.book_dataset(dfs, self.histos, dataset_name)
+        return dfs
 
 
 @click.command
-def get_analysis(**kwargs: dict[str, Any]) -> CallableDefineDF:
-    return Analysis()
+@click.option("--cutflow/--no-cutflow", default=False, help="Cut flow tables")
+@click.option(
+    "--reorder-cuts/--no-reorder-cuts",
+    default=False,
+    help="Order the cuts by cost and rejection measured on a sample",
+)
+@click.option(
+    "--systematics",
+    type=click.Path(path_type=pathlib.Path),
+    help="Write the histograms with all weight variations to this file",
+)
+def get_analysis(
+    cutflow: bool, reorder_cuts: bool, systematics: pathlib.Path | None
+) -> CallableDefineDF:
+    return Analysis(cutflow, reorder_cuts, systematics)
@@ -1,12 +1,18 @@
+import atexit
 import logging
+import pathlib
 from typing import Any
 from typing import Callable
 
 import click
 
 from mrtools import datasets
+from tools import cutflow
+from tools import histos
 from tools import leptons
+from tools import leptonsf
 from tools import pog
+from tools import weights
 
 log = logging.getLogger("mrtools.user")
 
@@ -31,68 +37,185 @@ SELECTION = [
     "HT>=300",
 ]
 
-WEIGHTS = [
+# Pileup weight recomputed with correctionlib
+WEIGHT_FACTORS = weights.replace(
+    weights.FACTORS,
     "reweightPU",
-    "reweightBTag_SF",
-    "reweightL1Prefire",
-    "reweightwPt",
+    weights.Factor(
+        "new_reweightPU", "new_reweightPUDown", "new_reweightPUUp", "reweightPU"
+    ),
+)
+
+# Lepton scale factors of the GoodMuon/GoodElec collections
+LEPTON_SF_FACTOR = weights.Factor(
+    "new_reweightLeptonSF",
+    "new_reweightLeptonSFDown",
+    "new_reweightLeptonSFUp",
     "reweightLeptonSF",
-]
+)
 
 
 class Analysis:
     loose: bool
-
-    def __init__(self, loose: bool) -> None:
+    view: bool
+    functor: bool
+    cut_flow: bool
+    reorder_cuts: bool
+    systematics: pathlib.Path | None
+    lepton_sf: dict[str, list[dict[str, Any]]] | None
+    lepton_sf_path: pathlib.Path | None
+
+    def __init__(
+        self,
+        loose: bool,
+        view: bool = False,
+        functor: bool = True,
+        cut_flow: bool = False,
+        reorder_cuts: bool = False,
+        systematics: pathlib.Path | None = None,
+        lepton_sf: pathlib.Path | None = None,
+    ) -> None:
         self.loose = loose
+        self.view = view
+        self.functor = functor
+        self.cut_flow = cut_flow
+        self.reorder_cuts = reorder_cuts
+        self.systematics = systematics
+        if cut_flow:
+            atexit.register(cutflow.report)
+        if systematics:
+            self.histos = histos.read_definitions(pathlib.Path(HISTOS_DEF))
+            atexit.register(histos.save, systematics)
+        self.lepton_sf = leptonsf.read_config(lepton_sf) if lepton_sf else None
+        self.lepton_sf_path = lepton_sf
         leptons.init()
 
+    def inputs(self) -> list[pathlib.Path]:
+        """Files read by the analysis, e.g. for the result cache."""
+        result = pog.pileup_files()
+        if self.lepton_sf_path:
+            result += [self.lepton_sf_path] + leptonsf.input_files(self.lepton_sf)
+        return result
+
+    def def_columns(
+        self, df: RDataFrame, dataset_type: datasets.DatasetType, period: str
+    ) -> RDataFrame:
+        """Lepton collections and the event weight."""
+        is_data = dataset_type == datasets.DatasetType.DATA
+
+        muon_attrs = leptons.MUON_ATTRS
+        elec_attrs = leptons.ELEC_ATTRS
+        lept_attrs = leptons.LEPT_ATTRS
+        if not is_data:
+            muon_attrs = muon_attrs + leptons.MC_ATTRS
+            elec_attrs = elec_attrs + leptons.MC_ATTRS
+            lept_attrs = lept_attrs + leptons.MC_ATTRS
+
+        # All working points from one bitmask, GoodX is the configured one
+        good = "Loose" if self.loose else "Tight"
+        muon_wps = {f"{wp}Muon": s for wp, s in leptons.MUON_WORKING_POINTS.items()}
+        muon_wps["GoodMuon"] = leptons.MUON_WORKING_POINTS[good]
+        elec_wps = {f"{wp}Elec": s for wp, s in leptons.ELEC_WORKING_POINTS.items()}
+        elec_wps["GoodElec"] = leptons.ELEC_WORKING_POINTS[good]
+
+        df = leptons.def_working_points(
+            df, "Muon", muon_wps, muon_attrs, self.view, self.functor
+        )
+        df = leptons.def_working_points(
+            df, "Electron", elec_wps, elec_attrs, self.view, self.functor
+        )
+
+        for wp in ["Good"] + list(leptons.MUON_WORKING_POINTS):
+            df = leptons.def_combined_leptons(
+                df, f"{wp}Lept", f"{wp}Muon", f"{wp}Elec", lept_attrs, self.view
+            )
+
+        # Defines are lazy, the weight can be booked before the selection
+        factors = WEIGHT_FACTORS
+        if not is_data:
+            df = pog.def_pileup_weight(df, "new_reweightPU", period)
+            if self.lepton_sf:
+                df = leptonsf.def_lepton_sf(
+                    df, LEPTON_SF_FACTOR.nominal, self.lepton_sf
+                )
+                factors = weights.replace(factors, "reweightLeptonSF", LEPTON_SF_FACTOR)
+        return weights.def_weight(df, "the_weight", factors, is_data)
+
     def __call__(
         self,
         df: RDataFrame,
         dataset_name: str,
         dataset_type: datasets.DatasetType,
         period: str,
+        first_entries: Callable[[int], RDataFrame] | None = None,
     ) -> dict[str, RDataFrame]:
-        log.debug("Dataset %s", dataset_name)
-
-        log.debug('Filter("%s")', " && ".join(SELECTION))
-        df = df.Filter(" && ".join(SELECTION))
-
-        if dataset_type != datasets.DatasetType.DATA:
-            pog.def_pileup_weight(df, "new_reweightPU", period)
-            new_weight = "*".join(WEIGHTS)
-        else:
-            new_weight = "1"
-        log.debug('Define("new_weight", "%s")', new_weight)
-        df = df.Define("new_weight", new_weight)
+        """Dataframes of the selected events.
 
-        if self.loose:
-            muon_select = leptons.MUON_SELECT_LOOSE_HYBRID_ISO
-            elec_select = leptons.ELEC_SELECT_LOOSE_HYBRID_ISO
+        first_entries returns a bounded dataframe of the dataset (see
+        tools.samples.first_entries) to measure the cuts on.
+        """
+        log.debug("Dataset %s", dataset_name)
+        df = self.def_columns(df, dataset_type, period)
+
+        if self.cut_flow or self.reorder_cuts:
+            first = None
+            if self.reorder_cuts and first_entries is not None:
+                first = first_entries(cutflow.SAMPLE_ENTRIES)
+                first = self.def_columns(first, dataset_type, period)
+            df = cutflow.def_selection(
+                df,
+                dataset_name,
+                SELECTION,
+                "the_weight",
+                self.reorder_cuts,
+                self.cut_flow,
+                first,
+            )
         else:
-            muon_select = leptons.MUON_SELECT_HYBRID_ISO
-            elec_select = leptons.ELEC_SELECT_HYBRID_ISO
-
-        muon_attrs = leptons.MUON_ATTRS
-        elec_attrs = leptons.ELEC_ATTRS
-        lept_attrs = leptons.LEPT_ATTRS
-        if dataset_type != datasets.DatasetType.DATA:
-            muon_attrs += leptons.MC_ATTRS
-            elec_attrs += leptons.MC_ATTRS
-            lept_attrs += leptons.MC_ATTRS
-
-        df = leptons.def_vector_obj(df, "GoodMuon", muon_select, "Muon", muon_attrs)
-        df = leptons.def_vector_obj(df, "GoodElec", elec_select, "Electron", elec_attrs)
-
-        df = leptons.def_combined_leptons(
-            df, "GoodLept", "GoodMuon", "GoodElec", lept_attrs
-        )
+            log.debug('Filter("%s")', " && ".join(SELECTION))
+            df = df.Filter(" && ".join(SELECTION))
 
-        return {"main": df}
+        dfs = {"main": df}
+        if self.systematics:
+            histos.book_dataset(dfs, self.histos, dataset_name)
+        return dfs
 
 
 @click.command
-@click.option("--loose/--no-loose", help="Loose HybridIso lepton selection")
-def get_analysis(loose: bool):
-    return Analysis(loose)
+@click.option(
+    "--loose/--no-loose", help="GoodMuon/GoodElec with the loose HybridIso selection"
+)
+@click.option(
+    "--view/--no-view", default=False, help="Lepton collections as indexed views"
+)
+@click.option(
+    "--functor/--no-functor",
+    default=True,
+    help="Compiled working point functor, else jitted expressions",
+)
+@click.option("--cutflow/--no-cutflow", default=False, help="Cut flow tables")
+@click.option(
+    "--reorder-cuts/--no-reorder-cuts",
+    default=False,
+    help="Order the cuts by cost and rejection measured on a sample",
+)
+@click.option(
+    "--systematics",
+    type=click.Path(path_type=pathlib.Path),
+    help="Write the histograms with all weight variations to this file",
+)
+@click.option(
+    "--lepton-sf",
+    type=click.Path(exists=True, path_type=pathlib.Path),
+    help="YAML with the GoodMuon/GoodElec scale factor tables",
+)
+def get_analysis(
+    loose: bool,
+    view: bool,
+    functor: bool,
+    cutflow: bool,
+    reorder_cuts: bool,
+    systematics: pathlib.Path | None,
+    lepton_sf: pathlib.Path | None,
+):
+    return Analysis(loose, view, functor, cutflow, reorder_cuts, systematics, lepton_sf)
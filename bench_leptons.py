@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""Micro-benchmark of the lepton selections.
+
+Compares the selections evaluated on whole RVecs, as in a jitted Define,
+with the fused selectors generated by tools.leptons. The selectors are
+compiled into a standalone program that runs on synthetic events and counts
+the heap allocations (malloc/realloc) per event.
+"""
+
+import logging
+import pathlib
+import shlex
+import subprocess
+import tempfile
+
+import click
+
+from tools import leptons
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s -  %(message)s",
+    datefmt="%y-%m-%d %H:%M:%S",
+)
+log = logging.getLogger(__name__)
+
+SELECTIONS = {
+    "Muon hybrid iso": leptons.MUON_SELECT_HYBRID_ISO,
+    "Electron hybrid iso": leptons.ELEC_SELECT_HYBRID_ISO,
+    "LowPtElectron hybrid iso": leptons.LOWPT_ELEC_SELECT_HYBRID_ISO,
+}
+
+# NanoAOD type and generated distribution of the attributes
+ATTRIBUTES = {
+    "pt": ("float", "Uniform(gen, 0., 60.)"),
+    "eta": ("float", "Uniform(gen, -3., 3.)"),
+    "deltaEtaSC": ("float", "Uniform(gen, -0.1, 0.1)"),
+    "dxy": ("float", "Uniform(gen, -0.05, 0.05)"),
+    "dz": ("float", "Uniform(gen, -0.2, 0.2)"),
+    "pfRelIso03_all": ("float", "Uniform(gen, 0., 0.5)"),
+    "miniPFRelIso_all": ("float", "Uniform(gen, 0., 0.5)"),
+    "ID": ("float", "Uniform(gen, -2., 4.)"),
+    "looseId": ("bool", "Uniform(gen, 0., 1.) < 0.8"),
+    "vidNestedWPBitmap": ("int", "Vid(gen)"),
+}
+
+PROGRAM = """\
+// Generated by bench_leptons.py
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <random>
+#include <vector>
+
+static unsigned long nAlloc = 0;
+
+extern "C" void *__libc_malloc(std::size_t);
+extern "C" void *__libc_realloc(void *, std::size_t);
+
+extern "C" void *malloc(std::size_t size)
+{{
+    ++nAlloc;
+    return __libc_malloc(size);
+}}
+
+extern "C" void *realloc(void *p, std::size_t size)
+{{
+    ++nAlloc;
+    return __libc_realloc(p, size);
+}}
+
+#include "leptons_inc.hxx"
+
+double Uniform(std::mt19937 &gen, double lo, double hi)
+{{
+    return std::uniform_real_distribution<double>(lo, hi)(gen);
+}}
+
+int Vid(std::mt19937 &gen)
+{{
+    std::uniform_int_distribution<int> field(0, 4);
+    int v = 0;
+    for (int i = 0; i < 10; ++i)
+    {{
+        v = (v << 3) | field(gen);
+    }}
+    return v;
+}}
+{functors}
+struct Event
+{{
+{fields}
+}};
+
+template <class F>
+void Bench(const char *label, const std::vector<Event> &events, F select)
+{{
+    long selected = 0;
+    nAlloc = 0;
+    auto start = std::chrono::steady_clock::now();
+    for (const auto &e : events)
+    {{
+        auto mask = select(e);
+        selected += Sum(mask);
+    }}
+    std::chrono::duration<double, std::nano> elapsed = std::chrono::steady_clock::now() - start;
+    std::printf("%-40s %8.3f alloc/event %8.1f ns/event %10ld selected\\n",
+                label, double(nAlloc) / events.size(), elapsed.count() / events.size(), selected);
+}}
+
+int main(int argc, char **argv)
+{{
+    std::size_t nEvents = std::atol(argv[1]);
+    std::mt19937 gen(42);
+    std::poisson_distribution<int> multiplicity(std::atof(argv[2]));
+    std::vector<Event> events(nEvents);
+    for (auto &e : events)
+    {{
+{fill}
+    }}
+{bench}
+    return 0;
+}}
+"""
+
+
+def program_source() -> str:
+    columns: dict[str, tuple[str, str]] = {}
+    for select in SELECTIONS.values():
+        for column in leptons.selector_columns(select, _all_columns()):
+            columns[column] = ATTRIBUTES[column.split("_", 1)[1]]
+
+    functors = []
+    bench = []
+    for i, (label, select) in enumerate(SELECTIONS.items()):
+        used = leptons.selector_columns(select, set(columns))
+        types = {c: f"ROOT::RVec<{columns[c][0]}>" for c in used}
+        arguments = ", ".join(f"e.{c}" for c in used)
+        for fused in (False, True):
+            functor = f"{'Fused' if fused else 'Vector'}Selector{i}"
+            functors.append(leptons.selector_functor(functor, select, types, fused))
+            bench.append(
+                f'    Bench("{label} ({"fused" if fused else "RVec"})", events, '
+                f"[](const Event &e) {{ return {functor}{{}}({arguments}); }});"
+            )
+
+    fields = [f"    ROOT::RVec<{t}> {c};" for c, (t, _) in columns.items()]
+    fill = []
+    for collection in dict.fromkeys(c.split("_", 1)[0] for c in columns):
+        fill.append("        {")
+        fill.append("            int n = multiplicity(gen);")
+        for column, (_, value) in columns.items():
+            if column.split("_", 1)[0] == collection:
+                fill.append(f"            e.{column}.resize(n);")
+                fill.append(f"            for (auto &x : e.{column}) x = {value};")
+        fill.append("        }")
+
+    return PROGRAM.format(
+        functors="".join(functors),
+        fields="\n".join(fields),
+        fill="\n".join(fill),
+        bench="\n".join(bench),
+    )
+
+
+def _all_columns() -> set[str]:
+    return {
+        f"{collection}_{attr}"
+        for collection in ("Muon", "Electron", "LowPtElectron")
+        for attr in ATTRIBUTES
+    }
+
+
+@click.command
+@click.option("--events", default=1000000, help="Number of synthetic events.")
+@click.option("--multiplicity", default=3.0, help="Mean number of leptons.")
+@click.option("--keep", type=click.Path(path_type=pathlib.Path), help="Keep source.")
+def main(events: int, multiplicity: float, keep: pathlib.Path | None) -> None:
+    """Benchmark RVec and fused lepton selections."""
+    log.setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = pathlib.Path(tmp) / "bench_leptons.cxx"
+        binary = pathlib.Path(tmp) / "bench_leptons"
+        source.write_text(program_source())
+        if keep:
+            keep.write_text(source.read_text())
+
+        root_config = subprocess.run(
+            ["root-config", "--cflags", "--libs"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        command = ["c++", "-O2", "-rdynamic", "-o", str(binary), str(source)]
+        command += [f"-I{leptons.TOOLS_PATH}"] + shlex.split(root_config)
+        log.info("Compiling %s", source)
+        subprocess.run(command, check=True)
+        subprocess.run([str(binary), str(events), str(multiplicity)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""Benchmark of snapshot compression and basket layouts.
+
+Writes (some files of) one sample with each setting, then runs analysis01
+with its histograms on the result with different numbers of threads. Every
+measurement runs in a fresh process, so that the thread pool size can be
+changed; the files are read from the page cache after the first pass. The
+analysis is jitted by a warm-up loop over one entry before the timed loop,
+and the read speed is reported in MB/s and events/s.
+
+    ./bench_snapshot.py /scratch/bench --sample 'MET_Run2016B*' \\
+        --compression zlib:1 --compression lz4:4 --compression zstd:5
+"""
+
+import concurrent.futures
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import time
+from typing import Any
+from typing import Callable
+
+import click
+import ROOT
+
+from mrtools import datasets
+from tools import histos
+from tools import samples
+from tools import snapshot
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s -  %(message)s",
+    datefmt="%y-%m-%d %H:%M:%S",
+)
+log = logging.getLogger(__name__)
+
+COMPRESSIONS = ("zlib:1", "zlib:4", "lz4:4", "zstd:5")
+THREADS = (1, 4, 16)
+MODULE = "analysis01"
+
+
+def _enable_threads(threads: int) -> None:
+    ROOT.gROOT.SetBatch()
+    if threads > 1:
+        ROOT.EnableImplicitMT(threads)
+
+
+def write(
+    sample: samples.Sample,
+    files: list[str],
+    output: pathlib.Path,
+    settings: snapshot.Settings,
+    threads: int,
+) -> float:
+    """Snapshot of the files with the settings, returns the time taken."""
+    _enable_threads(threads)
+    df = samples.dataframe(sample, files)
+    start = time.perf_counter()
+    df.Snapshot("Events", str(output), "", settings.options())
+    return time.perf_counter() - start
+
+
+def _book(
+    df: Any,
+    analysis: Callable,
+    sample: samples.Sample,
+    definitions: list[dict[str, Any]],
+) -> list[Any]:
+    dataset_type = datasets.DatasetType[sample.type.upper()]
+    dfs = analysis(df, sample.name, dataset_type, sample.period)
+    return [
+        booked.nominal
+        for definition in definitions
+        for booked in histos.book_histos(
+            dfs[definition["dataframe"]], definition
+        ).values()
+    ]
+
+
+def read(
+    sample: samples.Sample, path: pathlib.Path, module: str, threads: int
+) -> tuple[float, int, float]:
+    """Run the analysis with its histograms on a file.
+
+    The analysis is first run on one entry, so that the timed event loop
+    does not include the jitting of its expressions.
+
+    Returns:
+        The time of the event loop, the number of entries and the time of
+        the warm-up loop.
+    """
+    analysis_module = importlib.import_module(module)
+    analysis = analysis_module.get_analysis.main([], standalone_mode=False)
+    definitions = histos.read_definitions(pathlib.Path(analysis_module.HISTOS_DEF))
+
+    # Range needs a single-threaded loop, before implicit MT is enabled
+    warm_up = ROOT.RDataFrame("Events", str(path)).Range(1)
+    start = time.perf_counter()
+    ROOT.RDF.RunGraphs(_book(warm_up, analysis, sample, definitions))
+    warm_up_seconds = time.perf_counter() - start
+
+    _enable_threads(threads)
+    df = ROOT.RDataFrame("Events", str(path))
+    count = df.Count()
+    handles = _book(df, analysis, sample, definitions)
+    start = time.perf_counter()
+    ROOT.RDF.RunGraphs([count] + handles)
+    return time.perf_counter() - start, count.GetValue(), warm_up_seconds
+
+
+def _isolated(function: Callable, *args: Any) -> Any:
+    # ROOT cannot resize its thread pool, one process per measurement
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(1, context) as executor:
+        return executor.submit(function, *args).result()
+
+
+@click.command
+@click.argument("output_dir", type=click.Path(path_type=pathlib.Path))
+@click.option("--datasets", "datasets_def", help="Dataset definition YAML.")
+@click.option("--sample", required=True, help="Sample glob, the first match is used.")
+@click.option("--period", multiple=True, help="Only these periods.")
+@click.option("--max-files", default=5, help="Files of the sample to write.")
+@click.option(
+    "--compression",
+    multiple=True,
+    default=COMPRESSIONS,
+    show_default=True,
+    help="ALGORITHM[:LEVEL] to compare.",
+)
+@click.option("--basket-size", multiple=True, type=int, help="Basket sizes to compare.")
+@click.option("--auto-flush", type=int, help="Cluster size of all outputs.")
+@click.option("--threads", multiple=True, type=int, default=THREADS, show_default=True)
+@click.option("--write-threads", default=4, help="Threads writing the snapshots.")
+@click.option("--module", default=MODULE, help="Analysis reading the outputs.")
+@click.option("--json", "json_output", type=click.Path(path_type=pathlib.Path))
+def main(
+    output_dir: pathlib.Path,
+    datasets_def: str | None,
+    sample: str,
+    period: tuple[str, ...],
+    max_files: int,
+    compression: tuple[str, ...],
+    basket_size: tuple[int, ...],
+    auto_flush: int | None,
+    threads: tuple[int, ...],
+    write_threads: int,
+    module: str,
+    json_output: pathlib.Path | None,
+) -> None:
+    """Compare snapshot settings, writing into OUTPUT_DIR."""
+    log.setLevel(logging.INFO)
+    datasets_path = datasets_def or importlib.import_module(module).DATASETS_DEF
+    the_samples = samples.load(datasets_path, list(period), [sample])
+    if not the_samples:
+        raise click.BadParameter(f"No sample matches {sample}", param_hint="--sample")
+    the_sample = the_samples[0]
+    files = the_sample.files()[:max_files]
+    input_bytes = sum(os.stat(f).st_size for f in files)
+    log.info("%s: %d files, %.1f MB", the_sample.key, len(files), input_bytes / 1e6)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for text in compression:
+        for basket in basket_size or (None,):
+            settings = snapshot.Settings.parse(text, basket, auto_flush)
+            output = output_dir / f"{settings.label.replace(':', '_')}.root"
+            log.info("Writing %s", output)
+            write_seconds = _isolated(
+                write, the_sample, files, output, settings, write_threads
+            )
+            result: dict[str, Any] = {
+                "settings": settings.label,
+                "bytes": os.stat(output).st_size,
+                "write_seconds": write_seconds,
+                "read_seconds": {},
+                "events_per_second": {},
+                "warm_up_seconds": {},
+            }
+            for n in threads:
+                seconds, entries, warm_up = _isolated(
+                    read, the_sample, output, module, n
+                )
+                log.info(
+                    "%s, %d threads: %.1f s, %.1f s warm-up",
+                    settings.label,
+                    n,
+                    seconds,
+                    warm_up,
+                )
+                result["read_seconds"][n] = seconds
+                result["events_per_second"][n] = entries / seconds
+                result["warm_up_seconds"][n] = warm_up
+                result["entries"] = entries
+            results.append(result)
+
+    header = f"{'settings':30} {'MB':>8} {'ratio':>6} {'write s':>8}"
+    header += "".join(f" {f'{n} thr MB/s':>12} {f'{n} thr kev/s':>13}" for n in threads)
+    click.echo(header)
+    for result in results:
+        size = result["bytes"]
+        line = f"{result['settings']:30} {size / 1e6:8.1f}"
+        line += f" {size / input_bytes:6.2f} {result['write_seconds']:8.1f}"
+        for n in threads:
+            line += f" {size / result['read_seconds'][n] / 1e6:12.1f}"
+            line += f" {result['events_per_second'][n] / 1e3:13.1f}"
+        click.echo(line)
+
+    if json_output:
+        with open(json_output, "w") as out:
+            json.dump({"input_bytes": input_bytes, "results": results}, out, indent=1)
+
+
+if __name__ == "__main__":
+    main()
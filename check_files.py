@@ -10,6 +10,9 @@ import pathlib
 import click
 import ROOT
 
+from tools import fileinfo
+from tools import integrity
+
 ROOT.PyConfig.IgnoreCommandLineOptions = True
 logging.basicConfig(
     format="%(asctime)s - %(levelname)s -  %(message)s",
@@ -20,29 +23,50 @@ log = logging.getLogger(__name__)
 PATH = pathlib.Path("/scratch-cbe/users/dietrich.liko/StopsCompressed/nanoTuples/")
 
 
-def check_file(path: pathlib.Path):
-    """Chcke a file."""
-    df = ROOT.RDataFrame("Events", str(path))
-    events = df.Count()
-    sum_weights = df.Sum("weight")
-    print(
-        f"{'/'.join(path.parts[-2:])} - events {events.GetValue()} - weights {sum_weights.GetValue()}"
-    )
+def check_files(paths: list[pathlib.Path], workers: int | None) -> None:
+    """Print entries and weight sums of the files, read in parallel."""
+    infos = fileinfo.scan(paths, weights=True, workers=workers)
+    for path in paths:
+        info = infos[str(path)]
+        if isinstance(info, Exception):
+            print(f"{'/'.join(path.parts[-2:])} - error {info}")
+        else:
+            print(
+                f"{'/'.join(path.parts[-2:])} - events {info.entries} - weights {info.sum_weights}"
+            )
 
 
 @click.command
 @click.argument("input", type=click.Path(exists=True, path_type=pathlib.Path))
 @click.option("--verify/--no-verify", default=False, help="Try reading the files.")
-@click.option("--root-threads", default=4, help="Number of root threads.")
-def main(input: pathlib.Path, verify: bool, root_threads: int) -> None:
+@click.option(
+    "--integrity",
+    "integrity_report",
+    type=click.Path(path_type=pathlib.Path),
+    help="Check the file structure and write a JSON report.",
+)
+@click.option(
+    "--workers", type=int, help="Number of processes, default number of CPUs."
+)
+@click.option("--root-threads", type=int, help="Deprecated, ignored, see --workers.")
+def main(
+    input: pathlib.Path,
+    verify: bool,
+    integrity_report: pathlib.Path | None,
+    workers: int | None,
+    root_threads: int | None,
+) -> None:
     """Verify datasets."""
     log.setLevel(logging.DEBUG)
     ROOT.gROOT.SetBatch()
-    ROOT.EnableImplicitMT(root_threads)
+    if root_threads is not None:
+        log.warning("--root-threads is deprecated and ignored, use --workers")
     skim, period = input.stem.split(" - ")
     log.info("Skim %s, Period %s", skim, period)
     tot1 = 0
     tot2 = 0
+    to_check = []
+    sample_dirs = []
     with open(input, "r") as csv_input:
         for e in csv.DictReader(csv_input):
             prefix = e["Path"]
@@ -56,13 +80,14 @@ def main(input: pathlib.Path, verify: bool, root_threads: int) -> None:
             icnt = 0
             sample_dir = PATH / f"{tag}/{skim}/{name}"
             if sample_dir.exists():
+                sample_dirs.append(sample_dir)
                 files = set(p for p in sample_dir.iterdir())
                 if nr == 1:
                     path = sample_dir / f"{name}.root"
                     try:
                         files.remove(path)
                         if verify:
-                            check_file(path)
+                            to_check.append(path)
                         icnt += 1
                     except KeyError:
                         log.debug("Missing %s", path)
@@ -72,7 +97,7 @@ def main(input: pathlib.Path, verify: bool, root_threads: int) -> None:
                         try:
                             files.remove(path)
                             if verify:
-                                check_file(path)
+                                to_check.append(path)
                             icnt += 1
                         except KeyError:
                             log.debug("Missing %s", path)
@@ -94,6 +119,13 @@ def main(input: pathlib.Path, verify: bool, root_threads: int) -> None:
                 log.info("%-50s: %3d/%3d", f"{prefix}/{name}", icnt, nr)
     log.info("Total: %3d/%3d", tot1, tot2)
 
+    if verify:
+        check_files(to_check, workers)
+
+    if integrity_report:
+        files = integrity.scan(sample_dirs, workers)
+        integrity.write_report(integrity_report, files)
+
 
 if __name__ == "__main__":
     main()
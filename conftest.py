@@ -0,0 +1,4 @@
+"""Pytest configuration, the tests are in tests/."""
+
+# Standalone scripts run on the nanoTuples, not tests
+collect_ignore = ["test_leptons"]
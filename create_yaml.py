@@ -4,6 +4,7 @@
 Read data definition from CSV file and create sample definition in yaml.
 """
 import csv
+import json
 import logging
 import os
 import pathlib
@@ -13,6 +14,9 @@ from typing import Callable
 
 import click
 import ruamel.yaml
+from ruamel.yaml.comments import CommentedMap
+
+from tools import fileinfo
 
 logging.basicConfig(
     format="%(asctime)s - %(levelname)s -  %(name)s - %(message)s",
@@ -50,6 +54,50 @@ def make_sample(v: dict[str, Any], **kwargs: Any) -> dict[str, Any]:
     return sample
 
 
+def read_exclude_report(path: pathlib.Path) -> dict[str, list[str]]:
+    """Bad file names by directory, from a check_files.py --integrity report."""
+    with open(path, "r") as inp:
+        files = json.load(inp)["files"]
+    exclude: dict[str, list[str]] = {}
+    for name, report in sorted(files.items()):
+        if not report["ok"]:
+            exclude.setdefault(os.path.dirname(name), []).append(os.path.basename(name))
+    return exclude
+
+
+def add_manifests(samples: list[dict[str, Any]], workers: int | None) -> None:
+    """Add the files with entries, size and weight sums to the samples."""
+    sample_files = []
+    for sample in samples:
+        directory = pathlib.Path(sample["directory"])
+        exclude = set(sample.get("exclude", []))
+        files = sorted(p for p in directory.glob("*.root") if p.name not in exclude)
+        if not files:
+            log.warning("No files in %s", directory)
+        sample_files.append((sample, files))
+
+    infos = fileinfo.scan(
+        [f for _, files in sample_files for f in files], weights=True, workers=workers
+    )
+    for sample, files in sample_files:
+        sample["files"] = []
+        for file in files:
+            info = infos[str(file)]
+            if isinstance(info, Exception):
+                log.error("No manifest entry for %s: %s", file, info)
+                continue
+            entry = CommentedMap(
+                name=file.name,
+                entries=info.entries,
+                size=info.size,
+                mtime_ns=info.mtime_ns,
+                sum_weights=info.sum_weights,
+                sum_weights2=info.sum_weights2,
+            )
+            entry.fa.set_flow_style()
+            sample["files"].append(entry)
+
+
 @click.command
 @click.argument("output", type=click.File(mode="w"))
 @click.option(
@@ -59,9 +107,31 @@ def make_sample(v: dict[str, Any], **kwargs: Any) -> dict[str, Any]:
     help="Generate sample definition for a specific skim",
 )
 @click.option("--eos/--no-eos", default=False)
-def main(output: TextIO, skim: str, eos: bool) -> None:
+@click.option(
+    "--exclude-report",
+    type=click.Path(exists=True, path_type=pathlib.Path),
+    help="Exclude the bad files of a check_files.py --integrity report",
+)
+@click.option(
+    "--manifest/--no-manifest",
+    default=False,
+    help="List the files with entries, size and weight sums",
+)
+@click.option("--workers", type=int, help="Processes reading the files for --manifest")
+def main(
+    output: TextIO,
+    skim: str,
+    eos: bool,
+    exclude_report: pathlib.Path | None,
+    manifest: bool,
+    workers: int | None,
+) -> None:
     """Generate sample definition for a skim."""
     log.info("Writing %s", output.name)
+    if manifest and eos:
+        raise click.UsageError("--manifest needs the files on the filesystem")
+
+    exclude = read_exclude_report(exclude_report) if exclude_report else {}
 
     if eos:
         file_path = EOSPATH
@@ -118,10 +188,10 @@ def main(output: TextIO, skim: str, eos: bool) -> None:
                         )
                         samples[path.parent]['samples_groups'].append(samples[path])
                     else:
-                        samples[path] = make_sample(
-                            v,
-                            directory=f'{file_path}/{v["Tag"]}/{skim}/{v["Name"]}',
-                        )
+                        directory = f'{file_path}/{v["Tag"]}/{skim}/{v["Name"]}'
+                        samples[path] = make_sample(v, directory=directory)
+                        if directory in exclude:
+                            samples[path]["exclude"] = exclude[directory]
                         samples[path.parent][yaml_tag].append(samples[path])                        
 
                 for path, sample in samples.items():
@@ -129,6 +199,11 @@ def main(output: TextIO, skim: str, eos: bool) -> None:
                         if attr in sample and not sample[attr]:
                             del sample[attr]
 
+                if manifest:
+                    add_manifests(
+                        [s for s in samples.values() if "directory" in s], workers
+                    )
+
                 yaml.dump(samples[pathlib.PurePath("")])
 
 
@@ -2,22 +2,24 @@
 
 import pathlib
 import logging
-import concurrent.futures
+import sys
+from typing import Any
 
 import click
 import ROOT
 
+from tools import fileinfo
+from tools import manifest
+from tools import samples
+from tools import snapshot
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 log = logging.getLogger(__name__)
 
 
-def correct(
-    input: pathlib.Path, output: pathlib.Path, tree: str, columns: dict[str, str]
-) -> None:
-    log.debug("Processing %s ....", input)
-    df = ROOT.RDataFrame(tree, str(input))
+def define_missing(df: Any, columns: dict[str, str]) -> Any:
     file_columns = set(df.GetColumnNames())
     for col_name, col_type in columns.items():
         if col_name not in file_columns:
@@ -25,9 +27,45 @@ def correct(
             if col_type != "Bool_t":
                 log.error("Column %s is not boolean.", col_name)
             df = df.Define(str(col_name), "false")
+    return df
+
+
+def correct(
+    input: pathlib.Path,
+    output: pathlib.Path,
+    tree: str,
+    columns: dict[str, str],
+    settings: snapshot.Settings,
+) -> None:
+    log.debug("Processing %s ....", input)
+    df = define_missing(ROOT.RDataFrame(tree, str(input)), columns)
+
+    log.info("Creating %s ...", output)
+    df.Snapshot(tree, str(output), "", settings.options())
+
+
+def write_friend(
+    input: pathlib.Path,
+    output: pathlib.Path,
+    tree: str,
+    columns: dict[str, str],
+    settings: snapshot.Settings,
+) -> None:
+    """Friend tree with only the columns, false where missing in the input."""
+    log.debug("Processing %s ....", input)
+    df = define_missing(ROOT.RDataFrame(tree, str(input)), columns)
 
     log.info("Creating %s ...", output)
-    df.Snapshot(tree, str(output))
+    df.Snapshot(samples.FRIEND_TREE, str(output), list(columns), settings.options())
+
+
+def sample_directories(path: pathlib.Path, filter: str) -> list[pathlib.Path]:
+    """Sample directories, without the ones written by this script."""
+    return [
+        sample
+        for sample in pathlib.Path(path).iterdir()
+        if sample.match(filter) and not sample.name.endswith(("_cor", "_friend"))
+    ]
 
 
 @click.command
@@ -40,38 +78,117 @@ def correct(
 @click.option("-t", "--tree", default="Events")
 @click.option("--filter", default="MET_Run*")
 @click.option("-w", "--workers", default=4)
+@click.option(
+    "--friend",
+    is_flag=True,
+    help="Write only the missing columns into friend trees.",
+)
+@click.option(
+    "--manifest",
+    "manifest_path",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="State of the tasks, default PATH/fixdata_manifest.json.",
+)
+@click.option("--retries", default=manifest.RETRIES, help="Attempts per file.")
+@click.option(
+    "--backoff", default=manifest.BACKOFF, help="Seconds before the first retry."
+)
+@click.option("--verify", is_flag=True, help="Checksum finished outputs on rerun.")
+@snapshot.click_options
 @click.option("-d", "--debug", is_flag=True)
-def main(path: pathlib.Path, tree: str, filter: str, workers: int, debug: bool) -> None:
+def main(
+    path: pathlib.Path,
+    tree: str,
+    filter: str,
+    workers: int,
+    friend: bool,
+    manifest_path: pathlib.Path | None,
+    retries: int,
+    backoff: float,
+    verify: bool,
+    snapshot_settings: snapshot.Settings,
+    debug: bool,
+) -> None:
     """Merge NanoAODs."""
     if debug:
         log.setLevel(logging.DEBUG)
 
+    sample_dirs = sample_directories(path, filter)
+    files = [file for sample in sample_dirs for file in sample.iterdir()]
+    log.info("Getting columns of %d files", len(files))
     columns: dict[str, str] = {}
-    for sample in pathlib.Path(path).iterdir():
-        if not sample.match(filter):
+    infos = fileinfo.scan(files, workers=workers, schema=True, tree=tree)
+    for file, info in infos.items():
+        if isinstance(info, Exception):
+            log.error("No columns for %s: %s", file, info)
             continue
-        log.info("Getting columns for %s", sample)
-        for file in sample.iterdir():
-            df = ROOT.RDataFrame(tree, str(file))
-            for col_name in df.GetColumnNames():
-                col_type = df.GetColumnType(col_name)
-                if col_name not in columns:
-                    log.debug("New column %s", col_name)
-                    columns[col_name] = col_type
-                else:
-                    if col_type != columns[col_name]:
-                        log.error("Column type mismatch for %s", col_name)
-
-    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
-        for sample in pathlib.Path(path).iterdir():
-            if not sample.match(filter):
-                continue
-            output = path / f"{sample.name}_cor"
-            output.mkdir(parents=True, exist_ok=True)
+        for col_name, col_type in info.schema.items():
+            if col_name not in columns:
+                log.debug("New column %s", col_name)
+                columns[col_name] = col_type
+            elif col_type != columns[col_name]:
+                log.error("Column type mismatch for %s", col_name)
+
+    if friend:
+        jobs = friend_jobs(sample_dirs, tree, columns, infos, snapshot_settings)
+    else:
+        jobs = []
+        for sample in sample_dirs:
             for file in sample.iterdir():
-                executor.submit(
-                    correct, file, output / f"{file.stem}_cor.root", tree, columns
+                output = path / f"{sample.name}_cor" / f"{file.stem}_cor.root"
+                jobs.append(
+                    manifest.Job(
+                        str(file),
+                        str(output),
+                        correct,
+                        (file, output, tree, columns, snapshot_settings),
+                    )
+                )
+
+    tasks = manifest.Manifest(manifest_path or path / "fixdata_manifest.json")
+    if not manifest.run(tasks, jobs, workers, retries, backoff, verify):
+        sys.exit(1)
+
+
+def friend_jobs(
+    sample_dirs: list[pathlib.Path],
+    tree: str,
+    columns: dict[str, str],
+    infos: dict[str, fileinfo.FileInfo | Exception],
+    settings: snapshot.Settings,
+) -> list[manifest.Job]:
+    """Friend trees of the samples with missing columns.
+
+    All files of a sample get a friend with the same columns, copied where
+    the file has them, so that the friends can be chained.
+    """
+    jobs = []
+    for sample in sample_dirs:
+        files = list(sample.iterdir())
+        missing = {}
+        for file in files:
+            info = infos[str(file)]
+            if isinstance(info, Exception):
+                continue
+            for col_name, col_type in columns.items():
+                if col_name not in info.schema:
+                    missing[col_name] = col_type
+        if not missing:
+            log.info("No missing columns in %s", sample)
+            continue
+
+        log.info("%d missing columns in %s", len(missing), sample)
+        for file in files:
+            output = samples.friend_path(file)
+            jobs.append(
+                manifest.Job(
+                    str(file),
+                    str(output),
+                    write_friend,
+                    (file, output, tree, missing, settings),
                 )
+            )
+    return jobs
 
 
 if __name__ == "__main__":
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+"""Run an analysis over all samples in one event loop.
+
+The analysis module (e.g. analysis01) provides get_analysis, DATASETS_DEF and
+HISTOS_DEF. The histograms of its YAML are booked lazily on the graph of
+every sample, and all graphs are run together with RDF.RunGraphs, so the
+thread pool is kept busy across samples.
+
+Options after -- are passed to the get_analysis of the module:
+
+    ./run_analysis.py analysis02 --output output/analysis02.root -- --loose
+
+With --backend processes the samples are split into entry-range tasks that
+run single threaded in a pool of processes (see tools.backend). With --queue
+the tasks go through a directory on a shared filesystem, and further jobs
+(e.g. the other tasks of a SLURM job) help with --worker-only:
+
+    srun bash -c './run_analysis.py analysis02 --backend processes --workers 10 \\
+        --queue /scratch/queue/analysis02 \\
+        $([ $SLURM_PROCID = 0 ] || echo --worker-only)'
+"""
+
+import functools
+import importlib
+import logging
+import pathlib
+import time
+from typing import Any
+from typing import Callable
+
+import click
+import ROOT
+
+from mrtools import datasets
+from tools import backend
+from tools import cache
+from tools import histos
+from tools import samples
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s -  %(message)s",
+    datefmt="%y-%m-%d %H:%M:%S",
+)
+log = logging.getLogger(__name__)
+
+
+@click.command(context_settings={"ignore_unknown_options": True})
+@click.argument("module")
+@click.argument("analysis_args", nargs=-1, type=click.UNPROCESSED)
+@click.option("--datasets", "datasets_def", help="Dataset definition YAML.")
+@click.option("--histos", "histos_def", help="Histogram definition YAML.")
+@click.option("--period", multiple=True, help="Only these periods.")
+@click.option("--sample", multiple=True, help="Only samples matching these globs.")
+@click.option(
+    "--output",
+    default="histos.root",
+    type=click.Path(path_type=pathlib.Path),
+    help="Output file.",
+)
+@click.option(
+    "--systematics/--no-systematics", default=False, help="Weight variations."
+)
+@click.option(
+    "--cache/--no-cache", "use_cache", default=False, help="Per-file result cache."
+)
+@click.option("--root-threads", default=4, help="Number of root threads.")
+@click.option(
+    "--backend",
+    "backend_name",
+    type=click.Choice(["threads", "processes"]),
+    default="threads",
+    help="One process with root threads, or entry-range tasks in processes.",
+)
+@click.option("--workers", type=int, help="Processes, default number of CPUs.")
+@click.option("--task-entries", default=backend.TASK_ENTRIES, help="Events per task.")
+@click.option(
+    "--queue",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    help="Task queue on a shared filesystem, for several jobs.",
+)
+@click.option(
+    "--worker-only", is_flag=True, help="Only run tasks of the --queue, then exit."
+)
+@click.option(
+    "--stale-after",
+    default=backend.STALE_AFTER,
+    help="Seconds after which a claimed task is run again.",
+)
+@click.option("--debug/--no-debug", default=False)
+def main(
+    module: str,
+    analysis_args: tuple[str, ...],
+    datasets_def: str | None,
+    histos_def: str | None,
+    period: tuple[str, ...],
+    sample: tuple[str, ...],
+    output: pathlib.Path,
+    systematics: bool,
+    use_cache: bool,
+    root_threads: int,
+    backend_name: str,
+    workers: int | None,
+    task_entries: int,
+    queue: pathlib.Path | None,
+    worker_only: bool,
+    stale_after: float,
+    debug: bool,
+) -> None:
+    """Run analysis MODULE."""
+    log.setLevel(logging.DEBUG if debug else logging.INFO)
+    logging.getLogger("mrtools").setLevel(logging.DEBUG if debug else logging.INFO)
+    ROOT.gROOT.SetBatch()
+    if worker_only:
+        if not queue:
+            raise click.UsageError("--worker-only needs --queue")
+        backend.work_local(queue, workers)
+        return
+    if queue and backend_name != "processes":
+        raise click.UsageError("--queue needs --backend processes")
+    if root_threads > 0 and backend_name == "threads":
+        ROOT.EnableImplicitMT(root_threads)
+
+    analysis_module = importlib.import_module(module)
+    analysis = analysis_module.get_analysis.main(
+        list(analysis_args), standalone_mode=False
+    )
+    definitions = histos.read_definitions(
+        pathlib.Path(histos_def or analysis_module.HISTOS_DEF)
+    )
+
+    the_samples = samples.load(
+        datasets_def or analysis_module.DATASETS_DEF, list(period), list(sample)
+    )
+    entries = {s.key: s.nr_entries() for s in the_samples}
+    known = [n for n in entries.values() if n is not None]
+    log.info("%d events in %d of %d samples", sum(known), len(known), len(entries))
+    # Largest samples first, so that no long graph starts last
+    the_samples.sort(key=lambda s: entries[s.key] or 0, reverse=True)
+    if backend_name == "processes":
+        if use_cache:
+            log.warning("The result cache is not used by the processes backend")
+        spec = backend.AnalysisSpec(
+            module, list(analysis_args), histos_def, systematics
+        )
+        run_backend(
+            spec,
+            the_samples,
+            definitions,
+            output,
+            workers,
+            task_entries,
+            queue,
+            stale_after,
+        )
+        return
+    if use_cache:
+        options = list(analysis_args) + [f"systematics={systematics}"]
+        analysis_key = cache.analysis_key(
+            pathlib.Path(analysis_module.__file__), options, analysis.inputs()
+        )
+        run_cached(
+            analysis, the_samples, definitions, analysis_key, systematics, output
+        )
+        return
+
+    for s in the_samples:
+        files = s.files()
+        if not files:
+            log.warning("No files for %s", s.key)
+            continue
+        df = samples.dataframe(s, files)
+        dataset_type = datasets.DatasetType[s.type.upper()]
+        first_entries = functools.partial(samples.first_entries, s)
+        dfs = analysis(df, s.name, dataset_type, s.period, first_entries)
+        histos.book_dataset(dfs, definitions, s.key, systematics)
+
+    handles = histos.handles()
+    if not handles:
+        log.warning("Nothing to run")
+        return
+    log.info("Running %d histograms of %d samples", len(handles), len(the_samples))
+    start = time.perf_counter()
+    ROOT.RDF.RunGraphs(handles)
+    log.info("Event loops done in %.1f s", time.perf_counter() - start)
+
+    histos.save(output)
+
+
+def run_cached(
+    analysis: Callable,
+    the_samples: list[samples.Sample],
+    definitions: list[dict[str, Any]],
+    analysis_key: str,
+    systematics: bool,
+    output: pathlib.Path,
+) -> None:
+    """Process only the files with missing histograms.
+
+    The files of a sample with missing histograms are processed by one
+    graph, so the analysis is jitted once per sample. Every entry is tagged
+    with the index of its file, each histogram is booked once with the index
+    as a further axis, and split into the histograms of the files after the
+    event loop.
+    """
+    result_cache = cache.ResultCache()
+    single = histos.split_definitions(definitions)
+    partials: dict[str, dict[str, list[cache.Partial]]] = {}
+    pending = []
+    for s in the_samples:
+        dataset_type = datasets.DatasetType[s.type.upper()]
+        sample_partials = partials.setdefault(s.key, {name: [] for name in single})
+        missing: dict[str, dict[str, str]] = {}
+        for file in s.files():
+            for name, definition in single.items():
+                key = result_cache.key(analysis_key, definition, file)
+                partial = result_cache.get(key)
+                if partial is None:
+                    missing.setdefault(file, {})[name] = key
+                else:
+                    sample_partials[name].append(partial)
+        if not missing:
+            continue
+
+        files = list(missing)
+        df = histos.def_file_index(
+            samples.dataframe(s, files), "file_index_", files, samples.TREE
+        )
+        first_entries = functools.partial(samples.first_entries, s)
+        dfs = analysis(df, s.name, dataset_type, s.period, first_entries)
+        for name, definition in single.items():
+            keys = {i: m[name] for i, m in enumerate(missing.values()) if name in m}
+            if not keys:
+                continue
+            booked = histos.book_histos(
+                dfs[definition["dataframe"]],
+                definition,
+                systematics,
+                by_file=("file_index_", len(files)),
+            )
+            pending.append((s.key, name, keys, booked[name]))
+
+    log.info("Running %d histograms", len(pending))
+    if pending:
+        start = time.perf_counter()
+        ROOT.RDF.RunGraphs([booked.nominal for _, _, _, booked in pending])
+        log.info("Event loops done in %.1f s", time.perf_counter() - start)
+
+    for sample_key, name, keys, booked in pending:
+        by_file = histos.split_by_file(booked, single[name], list(keys))
+        for key, partial in zip(keys.values(), by_file):
+            result_cache.put(key, partial)
+            partials[sample_key][name].append(partial)
+
+    write_partials(output, partials, single)
+
+    result_cache.report()
+    result_cache.evict()
+
+
+def run_backend(
+    spec: backend.AnalysisSpec,
+    the_samples: list[samples.Sample],
+    definitions: list[dict[str, Any]],
+    output: pathlib.Path,
+    workers: int | None,
+    task_entries: int,
+    queue: pathlib.Path | None,
+    stale_after: float,
+) -> None:
+    """Process entry-range tasks in worker processes, here or via a queue."""
+    tasks = backend.make_tasks(the_samples, task_entries, workers)
+    start = time.perf_counter()
+    if queue:
+        tasks, results = backend.run_queue(queue, spec, tasks, workers, stale_after)
+    else:
+        results = backend.run_local(spec, tasks, workers)
+    log.info("Event loops done in %.1f s", time.perf_counter() - start)
+    partials = backend.merge(tasks, results)
+    write_partials(output, partials, histos.split_definitions(definitions))
+
+
+def write_partials(
+    output: pathlib.Path,
+    partials: dict[str, dict[str, list[cache.Partial]]],
+    single: dict[str, dict[str, Any]],
+) -> None:
+    """Write the merged partial histograms, one directory per sample."""
+    out = ROOT.TFile.Open(str(output), "RECREATE")
+    try:
+        for sample_key, sample_partials in partials.items():
+            directory = out.mkdir(sample_key, "", True)
+            for name, definition in single.items():
+                if not sample_partials.get(name):
+                    continue
+                kind = next(k for k in histos.MODELS if k in definition)
+                overflow = definition[kind][0].get("overflow", False)
+                merged = cache.merge(sample_partials[name])
+                histos.write_histo(directory, name, list(merged.items()), overflow)
+    finally:
+        out.Close()
+    log.info("Histograms written to %s", output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Skim the samples for an analysis.
+
+Applies the event selection of the analysis module once and writes only the
+columns used by the analysis and its histogram YAML (found with
+tools.columns.Tracer) into compact local files, one per sample. A copy of
+the dataset YAML pointing to the skimmed samples is written too.
+
+Options after -- are passed to the get_analysis of the module:
+
+    ./skim.py analysis02 /scratch/skims/analysis02 -- --loose
+"""
+
+import importlib
+import logging
+import pathlib
+import time
+
+import click
+import ROOT
+
+from tools import columns
+from tools import histos
+from tools import samples
+from tools import snapshot
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s -  %(message)s",
+    datefmt="%y-%m-%d %H:%M:%S",
+)
+log = logging.getLogger(__name__)
+
+
+@click.command(context_settings={"ignore_unknown_options": True})
+@click.argument("module")
+@click.argument("output_dir", type=click.Path(path_type=pathlib.Path))
+@click.argument("analysis_args", nargs=-1, type=click.UNPROCESSED)
+@click.option("--datasets", "datasets_def", help="Dataset definition YAML.")
+@click.option("--histos", "histos_def", help="Histogram definition YAML.")
+@click.option("--period", multiple=True, help="Only these periods.")
+@click.option("--sample", multiple=True, help="Only samples matching these globs.")
+@click.option(
+    "--yaml-output",
+    type=click.Path(path_type=pathlib.Path),
+    help="Dataset definition of the skim, default <datasets>_skim.yaml.",
+)
+@click.option("--root-threads", default=4, help="Number of root threads.")
+@snapshot.click_options
+def main(
+    module: str,
+    output_dir: pathlib.Path,
+    analysis_args: tuple[str, ...],
+    datasets_def: str | None,
+    histos_def: str | None,
+    period: tuple[str, ...],
+    sample: tuple[str, ...],
+    yaml_output: pathlib.Path | None,
+    root_threads: int,
+    snapshot_settings: snapshot.Settings,
+) -> None:
+    """Skim the samples of analysis MODULE into OUTPUT_DIR."""
+    log.setLevel(logging.INFO)
+    ROOT.gROOT.SetBatch()
+    if root_threads > 0:
+        ROOT.EnableImplicitMT(root_threads)
+
+    analysis_module = importlib.import_module(module)
+    analysis = analysis_module.get_analysis.main(
+        list(analysis_args), standalone_mode=False
+    )
+    definitions = histos.read_definitions(
+        pathlib.Path(histos_def or analysis_module.HISTOS_DEF)
+    )
+    datasets_path = pathlib.Path(datasets_def or analysis_module.DATASETS_DEF)
+    selection = " && ".join(analysis_module.SELECTION)
+
+    options = snapshot_settings.options(lazy=True)
+    handles = []
+    skimmed = {}
+    for s in samples.load(datasets_path, list(period), list(sample)):
+        files = s.files()
+        if not files:
+            log.warning("No files for %s", s.key)
+            continue
+        used = columns.analysis_columns(analysis, s, definitions, files)
+        log.info("%s: %d columns", s.key, len(used))
+        log.debug("%s: %s", s.key, ", ".join(used))
+
+        directory = output_dir / s.period / s.name
+        directory.mkdir(parents=True, exist_ok=True)
+        df = samples.dataframe(s, files).Filter(selection)
+        handles.append(
+            df.Snapshot("Events", str(directory / f"{s.name}.root"), used, options)
+        )
+        skimmed[s.key] = directory
+
+    start = time.perf_counter()
+    ROOT.RDF.RunGraphs(handles)
+    log.info("Skimmed %d samples in %.1f s", len(handles), time.perf_counter() - start)
+
+    if yaml_output is None:
+        yaml_output = datasets_path.with_name(f"{datasets_path.stem}_skim.yaml")
+    samples.rewrite_directories(datasets_path, yaml_output, skimmed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+"""Slim the nanoTuples for the analyses.
+
+Writes a copy of every sample, one file per sample, with only the columns
+read by the analysis modules and their histogram YAMLs (found with
+tools.columns.Tracer) with each set of OPTIONS, the columns of the options
+that need inputs (OPTION_COLUMNS), and columns matching --keep. Unlike
+skim.py no events are dropped, so all selections can still be run on the
+copies.
+
+The copies are lossless, unless float columns are rounded to fewer mantissa
+bits with --precision rules or the default rules of tools.precision
+(--default-precision). The compressed size of every branch is reported
+before and after, and the histograms of the analyses are validated on all
+events of each sample (a multi-threaded snapshot does not keep the order of
+the events, so the first entries of a copy are other events): the fraction
+of the weight that moves between bins must stay below the tolerance. A copy
+of the dataset YAML pointing to the slimmed samples is written too.
+
+    ./slim.py /scratch/slim/Met_v10 --sample 'MET_Run2016*' --precision '*_pt=16'
+"""
+
+import dataclasses
+import fnmatch
+import importlib
+import json
+import logging
+import pathlib
+import sys
+import time
+from typing import Any
+from typing import Callable
+
+import click
+import ROOT
+
+from mrtools import datasets
+from tools import columns
+from tools import fileinfo
+from tools import histos
+from tools import precision
+from tools import samples
+from tools import snapshot
+from tools import weights
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s -  %(message)s",
+    datefmt="%y-%m-%d %H:%M:%S",
+)
+log = logging.getLogger(__name__)
+
+MODULES = ("analysis01", "analysis02")
+KEEP = ("run", "luminosityBlock", "event")
+TOLERANCE = 1e-3
+
+# Further option sets traced for the whitelist, without side effects
+OPTIONS = {
+    "analysis01": [["--cutflow"]],
+    "analysis02": [["--loose"], ["--view"], ["--cutflow"]],
+}
+
+# Columns of the options that cannot be traced without their inputs: the
+# weight variations of --systematics and the leptons of --lepton-sf
+OPTION_COLUMNS = [c for f in weights.FACTORS for c in (f.down, f.up) if c] + [
+    f"{collection}_{attr}"
+    for collection in ("Muon", "Electron")
+    for attr in ("pt", "eta")
+]
+
+Analysis = tuple[str, Callable, list[dict[str, Any]]]
+
+
+def load_analyses(
+    modules: tuple[str, ...], all_options: bool = False
+) -> list[Analysis]:
+    """Analyses with their histogram definitions.
+
+    Args:
+        modules: analysis modules.
+        all_options: also with the option sets of OPTIONS, else only with
+            the default options.
+    """
+    result = []
+    for module in modules:
+        analysis_module = importlib.import_module(module)
+        definitions = histos.read_definitions(pathlib.Path(analysis_module.HISTOS_DEF))
+        option_sets = [[]] + (OPTIONS.get(module, []) if all_options else [])
+        for args in option_sets:
+            analysis = analysis_module.get_analysis.main(args, standalone_mode=False)
+            result.append((" ".join([module] + args), analysis, definitions))
+    return result
+
+
+def whitelist(
+    analyses: list[Analysis], sample: samples.Sample, keep: tuple[str, ...]
+) -> list[str]:
+    """Columns read by any of the analyses, of OPTION_COLUMNS and matching keep."""
+    files = sample.files()
+    used: set[str] = set()
+    for _, analysis, definitions in analyses:
+        used |= set(columns.analysis_columns(analysis, sample, definitions, files))
+    all_columns = samples.dataframe(sample, files[:1]).GetColumnNames()
+    for column in map(str, all_columns):
+        if column in OPTION_COLUMNS:
+            used.add(column)
+        elif any(fnmatch.fnmatchcase(column, pattern) for pattern in keep):
+            used.add(column)
+    return sorted(used)
+
+
+def branch_sizes(paths: list[str]) -> dict[str, int]:
+    """Compressed bytes by branch, summed over files."""
+    result: dict[str, int] = {}
+    for path in paths:
+        for branch, size in fileinfo.read_branch_sizes(path).items():
+            result[branch] = result.get(branch, 0) + size
+    return result
+
+
+def report_sizes(
+    before: dict[str, int], after: dict[str, int], rows: int
+) -> dict[str, Any]:
+    """Log the size reduction by branch, largest original branches first."""
+    total_before = sum(before.values())
+    total_after = sum(after.values())
+    dropped = sum(size for branch, size in before.items() if branch not in after)
+    log.info(
+        "Size %.1f MB -> %.1f MB (%.1f%%), %.1f MB in dropped branches",
+        total_before / 1e6,
+        total_after / 1e6,
+        100 * total_after / max(total_before, 1),
+        dropped / 1e6,
+    )
+    kept = sorted(after, key=lambda b: before.get(b, 0), reverse=True)
+    click.echo(f"{'branch':40} {'before MB':>10} {'after MB':>10} {'ratio':>6}")
+    for branch in kept[:rows]:
+        size_before = before.get(branch, 0)
+        click.echo(
+            f"{branch:40} {size_before / 1e6:10.2f} {after[branch] / 1e6:10.2f}"
+            f" {after[branch] / max(size_before, 1):6.2f}"
+        )
+    return {
+        "before": before,
+        "after": after,
+        "total_before": total_before,
+        "total_after": total_after,
+        "dropped": dropped,
+    }
+
+
+def migrated(original: ROOT.TH1, slimmed: ROOT.TH1) -> float:
+    """Fraction of the weight in different bins, over all cells."""
+    difference = total = 0.0
+    for cell in range(original.GetNcells()):
+        content = original.GetBinContent(cell)
+        difference += abs(content - slimmed.GetBinContent(cell))
+        total += abs(content)
+    return difference / total if total else difference
+
+
+def book_validation(
+    analyses: list[Analysis],
+    sample: samples.Sample,
+    slimmed: samples.Sample,
+) -> list[tuple[str, histos.Booked, histos.Booked]]:
+    """Histograms of the analyses on all events of both samples."""
+    dataset_type = datasets.DatasetType[sample.type.upper()]
+    original_df = samples.dataframe(sample)
+    slimmed_df = samples.dataframe(slimmed)
+    result = []
+    for module, analysis, definitions in analyses:
+        original_dfs = analysis(original_df, sample.name, dataset_type, sample.period)
+        slimmed_dfs = analysis(slimmed_df, sample.name, dataset_type, sample.period)
+        for definition in definitions:
+            name = definition["dataframe"]
+            original = histos.book_histos(original_dfs[name], definition, False)
+            slimmed_histos = histos.book_histos(slimmed_dfs[name], definition, False)
+            for histo, booked in original.items():
+                label = f"{sample.key} {module} {histo}"
+                result.append((label, booked, slimmed_histos[histo]))
+    return result
+
+
+@click.command
+@click.argument("output_dir", type=click.Path(path_type=pathlib.Path))
+@click.option("--module", multiple=True, default=MODULES, show_default=True)
+@click.option("--datasets", "datasets_def", help="Dataset definition YAML.")
+@click.option("--period", multiple=True, help="Only these periods.")
+@click.option("--sample", multiple=True, help="Only samples matching these globs.")
+@click.option(
+    "--keep",
+    multiple=True,
+    default=KEEP,
+    show_default=True,
+    help="Further columns to keep, glob patterns.",
+)
+@click.option(
+    "--precision",
+    "precision_rules",
+    multiple=True,
+    help="Mantissa bits of float columns, PATTERN=BITS.",
+)
+@click.option(
+    "--default-precision/--full-precision",
+    default=False,
+    help="Also apply the default precision rules, lossy.",
+)
+@click.option("--validate/--no-validate", default=True)
+@click.option("--tolerance", default=TOLERANCE, help="Fraction of migrated weight.")
+@click.option("--report", type=click.Path(path_type=pathlib.Path), help="JSON report.")
+@click.option("--report-rows", default=30, help="Branches in the size table.")
+@click.option(
+    "--yaml-output",
+    type=click.Path(path_type=pathlib.Path),
+    help="Dataset definition of the slimmed samples, default <datasets>_slim.yaml.",
+)
+@click.option("--root-threads", default=4, help="Number of root threads.")
+@snapshot.click_options
+def main(
+    output_dir: pathlib.Path,
+    module: tuple[str, ...],
+    datasets_def: str | None,
+    period: tuple[str, ...],
+    sample: tuple[str, ...],
+    keep: tuple[str, ...],
+    precision_rules: tuple[str, ...],
+    default_precision: bool,
+    validate: bool,
+    tolerance: float,
+    report: pathlib.Path | None,
+    report_rows: int,
+    yaml_output: pathlib.Path | None,
+    root_threads: int,
+    snapshot_settings: snapshot.Settings,
+) -> None:
+    """Write slimmed copies of the samples into OUTPUT_DIR."""
+    log.setLevel(logging.INFO)
+    ROOT.gROOT.SetBatch()
+    if root_threads > 0:
+        ROOT.EnableImplicitMT(root_threads)
+
+    try:
+        rules = precision.parse_rules(list(precision_rules))
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--precision")
+    if default_precision:
+        rules |= {p: b for p, b in precision.PRECISION.items() if p not in rules}
+
+    traced = load_analyses(module, all_options=True)
+    analyses = load_analyses(module)
+    datasets_path = pathlib.Path(
+        datasets_def or importlib.import_module(module[0]).DATASETS_DEF
+    )
+
+    options = snapshot_settings.options(lazy=True)
+    handles = []
+    slimmed: dict[str, pathlib.Path] = {}
+    outputs: dict[str, str] = {}
+    the_samples = []
+    for s in samples.load(datasets_path, list(period), list(sample)):
+        files = s.files()
+        if not files:
+            log.warning("No files for %s", s.key)
+            continue
+        used = whitelist(traced, s, keep)
+        log.info("%s: %d columns", s.key, len(used))
+        log.debug("%s: %s", s.key, ", ".join(used))
+
+        # One graph per sample, its Redefines are jitted once
+        directory = output_dir / s.period / s.name
+        directory.mkdir(parents=True, exist_ok=True)
+        output = str(directory / f"{s.name}.root")
+        df = samples.dataframe(s, files)
+        schema = {c: str(df.GetColumnType(c)) for c in used}
+        df = precision.def_reduced(df, schema, rules)
+        handles.append(df.Snapshot(samples.TREE, output, used, options))
+        outputs[s.key] = output
+        slimmed[s.key] = directory
+        the_samples.append(s)
+
+    start = time.perf_counter()
+    ROOT.RDF.RunGraphs(handles)
+    log.info("Slimmed %d samples in %.1f s", len(handles), time.perf_counter() - start)
+
+    before = branch_sizes([f for s in the_samples for f in s.files()])
+    after = branch_sizes(list(outputs.values()))
+    result = report_sizes(before, after, report_rows)
+
+    failed = []
+    if validate:
+        booked = []
+        for s in the_samples:
+            copy = dataclasses.replace(
+                s, directory=slimmed[s.key], exclude=[], manifest={}
+            )
+            booked += book_validation(analyses, s, copy)
+        ROOT.RDF.RunGraphs([h.nominal for _, o, s in booked for h in (o, s)])
+        result["validation"] = {}
+        for label, original, copy in booked:
+            fraction = migrated(original.nominal.GetValue(), copy.nominal.GetValue())
+            result["validation"][label] = fraction
+            if fraction > tolerance:
+                log.error("%s: %.2g of the weight migrated", label, fraction)
+                failed.append(label)
+        log.info(
+            "%d of %d histograms validated", len(booked) - len(failed), len(booked)
+        )
+
+    if report:
+        with open(report, "w") as out:
+            json.dump(result, out, indent=1)
+
+    if yaml_output is None:
+        yaml_output = datasets_path.with_name(f"{datasets_path.stem}_slim.yaml")
+    samples.rewrite_directories(datasets_path, yaml_output, slimmed)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
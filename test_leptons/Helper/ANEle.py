@@ -6,10 +6,40 @@ from Helper.VarCalc import eleVID, sortedlist, DeltaR
 
 
 class ANEle:
+    # selector evaluations done and saved by the per-event cache, for all instances
+    stats = {"evaluated": 0, "saved": 0}
+
     def __init__(self, tr, objtype, pref):
         self.tr = tr
         self.objtype = objtype  # its a string: 'Std' for standard PF ele, 'LowpT' for low pT ele and 'comb' for combination of both starting from the object according to the given preference
         self.pref = pref  # pref is string which defines the preference between standard and low pT ele while using the 'comb' objtype, 'Std' for Standard & 'LowpT' for Low pT electron. *** for now we use satndard ele as the preference
+        self._cache = {}
+        self._entry = self.tr.GetReadEntry()
+
+    @classmethod
+    def cache_stats(cls):
+        # number of selections evaluated and served from the cache
+        return dict(cls.stats)
+
+    @classmethod
+    def reset_cache_stats(cls):
+        cls.stats = {"evaluated": 0, "saved": 0}
+
+    def invalidate(self):
+        # drop the cached selections, called when the tree entry changes
+        self._cache = {}
+        self._entry = self.tr.GetReadEntry()
+
+    def _cached(self, key, func):
+        # key is (collection, lepton_selection, isolationType)
+        if self.tr.GetReadEntry() != self._entry:
+            self.invalidate()
+        if key in self._cache:
+            ANEle.stats["saved"] += 1
+        else:
+            ANEle.stats["evaluated"] += 1
+            self._cache[key] = func()
+        return list(self._cache[key])
 
     def getTheType(self):
         # return the type of leading ele,
@@ -22,7 +52,7 @@ class ANEle:
 
     def getANEleIdx(self):
         if self.objtype == "comb":
-            return self.CombEleIdx(self.pref)
+            return self.CombEleIdx()
         elif self.objtype == "Std":
             return self.StdselectEleIdx()
         else:
@@ -119,7 +149,13 @@ class ANEle:
             )
         return Llist
 
-    def LowselectEleIdx(self, lepsel="HybridIso"):
+    def LowselectEleIdx(self, lepsel="HybridIso", isolationType="mini"):
+        return self._cached(
+            ("LowPtElectron", lepsel, isolationType),
+            lambda: self._LowselectEleIdx(lepsel, isolationType),
+        )
+
+    def _LowselectEleIdx(self, lepsel, isolationType):
         idx = []
         for i in range(len(self.tr.LowPtElectron_pt)):
             if self.LoweleSelector(
@@ -131,11 +167,18 @@ class ANEle:
                 dz=self.tr.LowPtElectron_dz[i],
                 Id=self.tr.LowPtElectron_ID[i],
                 lepton_selection=lepsel,
+                isolationType=isolationType,
             ):
                 idx.append(tuple((i, "LowPtElectron")))
         return idx
 
-    def StdselectEleIdx(self, lepsel="HybridIso"):
+    def StdselectEleIdx(self, lepsel="HybridIso", isolationType="standard"):
+        return self._cached(
+            ("Electron", lepsel, isolationType),
+            lambda: self._StdselectEleIdx(lepsel, isolationType),
+        )
+
+    def _StdselectEleIdx(self, lepsel, isolationType):
         idx = []
         for i in range(len(self.tr.Electron_pt)):
             if self.StdeleSelector(
@@ -147,16 +190,18 @@ class ANEle:
                 dz=self.tr.Electron_dz[i],
                 Id=self.tr.Electron_vidNestedWPBitmap[i],
                 lepton_selection=lepsel,
+                isolationType=isolationType,
             ):
                 idx.append(tuple((i, "Electron")))
         return idx
 
     def SelectPairIdx(self):
         PIdx = []
+        lowIdx = self.LowselectEleIdx()
         for isx, ist in self.StdselectEleIdx():
             mindr = 9999
             milx = -9999
-            for ilx, ilt in self.LowselectEleIdx():
+            for ilx, ilt in lowIdx:
                 dr = DeltaR(
                     self.tr.Electron_eta[isx],
                     self.tr.Electron_phi[isx],
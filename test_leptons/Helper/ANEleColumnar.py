@@ -0,0 +1,338 @@
+"""Columnar version of the ANEle electron selection.
+
+Branches are read chunk by chunk with uproot as flat NumPy arrays plus
+offsets, and the Std, LowpT and comb selections of :class:`Helper.ANEle.ANEle`
+are computed for all events of a chunk at once.
+
+Float branches are promoted to float64 when read, so that the cuts compare
+exactly like the per-event Python implementation (which works on Python floats).
+
+Example:
+    from Helper import ANEleColumnar
+
+    for chunk in ANEleColumnar.iterate(files):
+        std = ANEleColumnar.std_select(chunk)
+        lowpt = ANEleColumnar.lowpt_select(chunk)
+        comb = ANEleColumnar.comb_select(std, lowpt, pref="Std")
+"""
+
+import math
+from typing import Any
+from typing import Iterator
+
+import awkward as ak
+import numpy as np
+import uproot
+
+from Helper.CosmeticCode import vidNestedWPBitMapNamingList
+
+STD_BRANCHES = [
+    "pt",
+    "eta",
+    "deltaEtaSC",
+    "phi",
+    "dxy",
+    "dz",
+    "charge",
+    "pfRelIso03_all",
+    "vidNestedWPBitmap",
+]
+
+LOWPT_BRANCHES = [
+    "pt",
+    "eta",
+    "deltaEtaSC",
+    "phi",
+    "dxy",
+    "dz",
+    "charge",
+    "miniPFRelIso_all",
+    "ID",
+]
+
+OUTPUT_VARS = ["pt", "eta", "deltaEtaSC", "phi", "dxy", "dz", "charge"]
+
+# (f1, f2, max |dxy|, max |dz|) of the HybridIso working points
+HYBRID_ISO = {
+    "HybridIso": (5.0, 0.2, 0.02, 0.1),
+    "looseHybridIso": (20.0, 0.8, 0.1, 0.5),
+}
+
+# removedCuts names of VarCalc.eleVID
+VID_CUTS = {
+    "pt": "MinPtCut",
+    "sieie": "GsfEleFull5x5SigmaIEtaIEtaCut",
+    "hoe": "GsfEleHadronicOverEMEnergyScaledCut",
+    "pfRelIso03_all": "GsfEleRelPFIsoScaledCut",
+    "SCEta": "GsfEleSCEtaMultiRangeCut",
+    "dEtaSeed": "GsfEleDEtaInSeedCut",
+    "dPhiInCut": "GsfEleDPhiInCut",
+    "EinvMinusPinv": "GsfEleEInverseMinusPInverseCut",
+    "convVeto": "GsfEleConversionVetoCut",
+    "lostHits": "GsfEleMissingHitsCut",
+}
+
+TYPE_STD = 0
+TYPE_LOWPT = 1
+
+
+class Collection:
+    """Jagged collection stored as flat columns plus offsets.
+
+    Attributes:
+        columns: flat array per attribute.
+        offsets: start of each event in the flat arrays, length n_events + 1.
+        index: position of each element in its original collection.
+    """
+
+    columns: dict[str, np.ndarray]
+    offsets: np.ndarray
+    index: np.ndarray
+
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        offsets: np.ndarray,
+        index: np.ndarray | None = None,
+    ) -> None:
+        self.columns = columns
+        self.offsets = offsets
+        if index is None:
+            index = np.arange(offsets[-1]) - np.repeat(offsets[:-1], self.counts)
+        self.index = index
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def event_index(self) -> np.ndarray:
+        """Chunk-local event number of each element."""
+        return np.repeat(np.arange(len(self)), self.counts)
+
+    def select(self, mask: np.ndarray) -> "Collection":
+        """Keep the elements where mask is true."""
+        selected = np.zeros(len(mask) + 1, dtype=np.int64)
+        np.cumsum(mask, out=selected[1:])
+        offsets = selected[self.offsets]
+        return Collection(
+            {k: v[mask] for k, v in self.columns.items()}, offsets, self.index[mask]
+        )
+
+
+class Chunk:
+    """Event range read from the input files."""
+
+    event: np.ndarray
+    electron: Collection
+    lowpt_electron: Collection
+
+    def __init__(
+        self, event: np.ndarray, electron: Collection, lowpt_electron: Collection
+    ) -> None:
+        self.event = event
+        self.electron = electron
+        self.lowpt_electron = lowpt_electron
+
+    def __len__(self) -> int:
+        return len(self.event)
+
+
+def _collection(arrays: Any, prefix: str, attrs: list[str]) -> Collection:
+    columns = {}
+    for attr in attrs:
+        flat = ak.to_numpy(ak.flatten(arrays[f"{prefix}_{attr}"]))
+        if flat.dtype == np.float32:
+            flat = flat.astype(np.float64)
+        columns[attr] = flat
+    counts = ak.to_numpy(ak.num(arrays[f"{prefix}_{attrs[0]}"]))
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return Collection(columns, offsets)
+
+
+def iterate(
+    files: list[str] | str,
+    tree: str = "Events",
+    step_size: int | str = 100000,
+    entry_stop: int | None = None,
+) -> Iterator[Chunk]:
+    """Read the electron branches chunk by chunk."""
+    if isinstance(files, str):
+        files = [files]
+    branches = ["event"]
+    branches += [f"Electron_{attr}" for attr in STD_BRANCHES]
+    branches += [f"LowPtElectron_{attr}" for attr in LOWPT_BRANCHES]
+
+    entries = 0
+    for arrays in uproot.iterate(
+        {f: tree for f in files}, branches, step_size=step_size, library="ak"
+    ):
+        if entry_stop is not None and entries + len(arrays) > entry_stop:
+            arrays = arrays[: entry_stop - entries]
+        entries += len(arrays)
+        yield Chunk(
+            ak.to_numpy(arrays["event"]),
+            _collection(arrays, "Electron", STD_BRANCHES),
+            _collection(arrays, "LowPtElectron", LOWPT_BRANCHES),
+        )
+        if entry_stop is not None and entries >= entry_stop:
+            break
+
+
+def ecal_gap(eta: np.ndarray, delta_eta_sc: np.ndarray) -> np.ndarray:
+    sc_eta = np.abs(eta + delta_eta_sc)
+    return (sc_eta < 1.4442) | (sc_eta > 1.566)
+
+
+def ele_vid(
+    vid: np.ndarray, level: int, removed_cuts: tuple[str, ...] = ()
+) -> np.ndarray:
+    """Vectorised VarCalc.eleVID."""
+    removed = {VID_CUTS[c] for c in removed_cuts}
+    result = np.ones(len(vid), dtype=bool)
+    vid = vid.astype(np.uint32)
+    for i, cut in enumerate(vidNestedWPBitMapNamingList):
+        if cut in removed:
+            continue
+        shift = 3 * (len(vidNestedWPBitMapNamingList) - 1 - i)
+        result &= ((vid >> shift) & 7) >= level
+    return result
+
+
+def mini_isolation_weight(pt: np.ndarray) -> np.ndarray:
+    weight = np.full(len(pt), 0.02616993)
+    weight[pt < 200] = np.tan(10.0 / pt[pt < 200]) ** 2 / math.tan(0.3) ** 2
+    weight[pt < 50] = 0.42942652
+    return weight
+
+
+def _select(
+    coll: Collection,
+    iso: np.ndarray,
+    id_pass: np.ndarray,
+    min_pt: float,
+    lepton_selection: str,
+    isolation_weight: np.ndarray | float,
+) -> np.ndarray:
+    pt = coll["pt"]
+    eta = coll["eta"]
+    mask = (pt > min_pt) & (np.abs(eta) < 2.5) & ecal_gap(eta, coll["deltaEtaSC"])
+    if lepton_selection in HYBRID_ISO:
+        f1, f2, dxy, dz = HYBRID_ISO[lepton_selection]
+        mask &= np.where(
+            pt <= 25, (iso * pt) < f1 * isolation_weight, iso < f2 * isolation_weight
+        )
+        mask &= (np.abs(coll["dxy"]) < dxy) & (np.abs(coll["dz"]) < dz)
+    return mask & id_pass
+
+
+def std_select(chunk: Chunk, lepton_selection: str = "HybridIso") -> Collection:
+    """Selected standard electrons, as ANEle.StdselectEleIdx."""
+    coll = chunk.electron
+    if lepton_selection in HYBRID_ISO:
+        id_pass = ele_vid(coll["vidNestedWPBitmap"], 1, ("pfRelIso03_all",))
+    else:
+        id_pass = ele_vid(coll["vidNestedWPBitmap"], 1)
+    mask = _select(coll, coll["pfRelIso03_all"], id_pass, 5, lepton_selection, 1.0)
+    return coll.select(mask)
+
+
+def lowpt_select(chunk: Chunk, lepton_selection: str = "HybridIso") -> Collection:
+    """Selected low pT electrons, as ANEle.LowselectEleIdx."""
+    coll = chunk.lowpt_electron
+    weight = mini_isolation_weight(coll["pt"])
+    mask = _select(
+        coll, coll["miniPFRelIso_all"], coll["ID"] > 0, 3, lepton_selection, weight
+    )
+    return coll.select(mask)
+
+
+def delta_r(
+    eta1: np.ndarray, phi1: np.ndarray, eta2: np.ndarray, phi2: np.ndarray
+) -> np.ndarray:
+    """Vectorised VarCalc.DeltaR."""
+    dphi = phi2 - phi1
+    dphi = np.where(dphi > math.pi, dphi - 2.0 * math.pi, dphi)
+    dphi = np.where(dphi <= -math.pi, dphi + 2.0 * math.pi, dphi)
+    return np.sqrt(dphi**2 + (eta1 - eta2) ** 2)
+
+
+def select_pairs(std: Collection, lowpt: Collection) -> tuple[np.ndarray, np.ndarray]:
+    """Pair each standard electron with its closest low pT electron.
+
+    Returns:
+        Flat positions in std and lowpt of the pairs with DeltaR < 0.1,
+        as ANEle.SelectPairIdx.
+    """
+    std_event = std.event_index
+    nr_low = lowpt.counts[std_event]
+    total = int(nr_low.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # all (std, lowpt) combinations within the same event
+    pair_std = np.repeat(np.arange(len(std_event)), nr_low)
+    group_start = np.cumsum(nr_low) - nr_low
+    pair_low = np.repeat(lowpt.offsets[std_event], nr_low) + (
+        np.arange(total) - np.repeat(group_start, nr_low)
+    )
+    dr = delta_r(
+        std["eta"][pair_std],
+        std["phi"][pair_std],
+        lowpt["eta"][pair_low],
+        lowpt["phi"][pair_low],
+    )
+
+    # first closest low pT electron for each standard electron
+    has_low = nr_low > 0
+    min_dr = np.minimum.reduceat(dr, group_start[has_low])
+    min_dr_pair = np.repeat(min_dr, nr_low[has_low])
+    candidates = np.flatnonzero(dr == min_dr_pair)
+    std_idx, first = np.unique(pair_std[candidates], return_index=True)
+    low_idx = pair_low[candidates[first]]
+
+    matched = min_dr < 0.1
+    return std_idx[matched], low_idx[matched]
+
+
+def comb_select(std: Collection, lowpt: Collection, pref: str = "Std") -> Collection:
+    """Combined electrons, as ANEle.CombEleIdx and ANEle.getCombEleVar.
+
+    The result has the OUTPUT_VARS columns, "type" (TYPE_STD or TYPE_LOWPT)
+    and the index in the original collection.
+    """
+    std_pair, low_pair = select_pairs(std, lowpt)
+    if pref == "Std":
+        first, second, first_type, second_type = std, lowpt, TYPE_STD, TYPE_LOWPT
+        paired = low_pair
+    else:
+        first, second, first_type, second_type = lowpt, std, TYPE_LOWPT, TYPE_STD
+        paired = std_pair
+    keep = np.ones(second.offsets[-1], dtype=bool)
+    keep[paired] = False
+    second = second.select(keep)
+
+    order = np.argsort(
+        np.concatenate([first.event_index, second.event_index]), kind="stable"
+    )
+    columns = {
+        var: np.concatenate([first[var], second[var]])[order] for var in OUTPUT_VARS
+    }
+    columns["type"] = np.concatenate(
+        [
+            np.full(first.offsets[-1], first_type, dtype=np.int8),
+            np.full(second.offsets[-1], second_type, dtype=np.int8),
+        ]
+    )[order]
+    return Collection(
+        columns,
+        first.offsets + second.offsets,
+        np.concatenate([first.index, second.index])[order],
+    )
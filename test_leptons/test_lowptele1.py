@@ -54,6 +54,10 @@ def main():
                     f"{evt.event}, {j}, {ce['pt']:7.3f}, {ce['eta']:7.3f}, {ce['phi']:7.3f}, {0 if ce['type'] == 'Electron' else 1}",
                     file=out_comb_elec,
                 )
+    stats = ANEle.cache_stats()
+    print(
+        f"Selections evaluated: {stats['evaluated']} saved by cache: {stats['saved']}"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+import pathlib
+
+import numpy as np
+
+from Helper import ANEleColumnar
+
+dataset = "WJetsToLNu_HT400to600"
+PATH = pathlib.Path(
+    f"/scratch-cbe/users/dietrich.liko/StopsCompressed/nanoTuples/compstops_UL16APVv9_nano_v10/Met/{dataset}/{dataset}_0.root"
+)
+
+
+def write_csv(out, event: np.ndarray, coll: ANEleColumnar.Collection, type_col=False):
+    columns = [
+        np.repeat(event, coll.counts),
+        np.arange(coll.offsets[-1]) - np.repeat(coll.offsets[:-1], coll.counts),
+        coll["pt"],
+        coll["eta"],
+        coll["phi"],
+    ]
+    fmt = "%d, %d, %7.3f, %7.3f, %7.3f"
+    if type_col:
+        columns.append(coll["type"])
+        fmt += ", %d"
+    np.savetxt(out, np.column_stack(columns), fmt=fmt)
+
+
+def main():
+    with (
+        open("electron3.csv", "w") as out_elec,
+        open("lowpt_electron3.csv", "w") as out_lowpt_elec,
+        open("comb_electron3.csv", "w") as out_comb_elec,
+    ):
+        print("event, index, pt, eta, phi", file=out_elec)
+        print("event, index, pt, eta, phi", file=out_lowpt_elec)
+        print("event, index, pt, eta, phi, type", file=out_comb_elec)
+        nr_events = 0
+        for chunk in ANEleColumnar.iterate(str(PATH)):
+            nr_events += len(chunk)
+            print(f"Events {nr_events}")
+            good_elec = ANEleColumnar.std_select(chunk)
+            good_lowpt_elec = ANEleColumnar.lowpt_select(chunk)
+            comb_elec = ANEleColumnar.comb_select(good_elec, good_lowpt_elec, "Std")
+            write_csv(out_elec, chunk.event, good_elec)
+            write_csv(out_lowpt_elec, chunk.event, good_lowpt_elec)
+            write_csv(out_comb_elec, chunk.event, comb_elec, type_col=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import math
+import pathlib
+import random
+import sys
+
+import pytest
+
+pytest.importorskip("ROOT")
+np = pytest.importorskip("numpy")
+pytest.importorskip("awkward")
+pytest.importorskip("uproot")
+
+# The helpers are imported as Helper by the scripts in test_leptons
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / "test_leptons"))
+
+from Helper import ANEle  # noqa: E402
+from Helper import ANEleColumnar  # noqa: E402
+from Helper import VarCalc  # noqa: E402
+
+EVENTS = 200
+
+STD = ANEleColumnar.STD_BRANCHES
+LOWPT = ANEleColumnar.LOWPT_BRANCHES
+
+
+def bitmap(rng: random.Random) -> int:
+    """VID bitmap with mostly passing cuts."""
+    result = 0
+    for _ in range(10):
+        result = result << 3 | rng.choice([0, 1, 2, 3, 4] + [1] * 10)
+    return result
+
+
+def electron(rng: random.Random, low: float) -> dict[str, float]:
+    return {
+        "pt": rng.uniform(low, 60.0),
+        "eta": rng.uniform(-2.6, 2.6),
+        "deltaEtaSC": rng.uniform(-0.1, 0.1),
+        "phi": rng.uniform(-math.pi, math.pi),
+        "dxy": rng.uniform(-0.025, 0.025),
+        "dz": rng.uniform(-0.12, 0.12),
+        "charge": rng.choice([-1, 1]),
+    }
+
+
+def make_events(seed: int = 1) -> list[dict[str, list]]:
+    """Random events, with low pT electrons near some standard ones."""
+    rng = random.Random(seed)
+    events = []
+    for number in range(EVENTS):
+        std = []
+        for _ in range(rng.randint(0, 4)):
+            e = electron(rng, 3.0)
+            e["pfRelIso03_all"] = rng.uniform(0.0, 0.25)
+            e["vidNestedWPBitmap"] = bitmap(rng)
+            std.append(e)
+        lowpt = []
+        for _ in range(rng.randint(0, 4)):
+            e = electron(rng, 1.0)
+            if std and rng.random() < 0.5:
+                near = rng.choice(std)
+                e["eta"] = near["eta"] + rng.uniform(-0.06, 0.06)
+                e["phi"] = near["phi"] + rng.uniform(-0.06, 0.06)
+            e["miniPFRelIso_all"] = rng.uniform(0.0, 0.25)
+            e["ID"] = rng.uniform(-2.0, 4.0)
+            lowpt.append(e)
+        event = {"event": number}
+        event |= {f"Electron_{a}": [e[a] for e in std] for a in STD}
+        event |= {f"LowPtElectron_{a}": [e[a] for e in lowpt] for a in LOWPT}
+        events.append(event)
+    return events
+
+
+class Tree:
+    """Entries of a tree as read by ANEle."""
+
+    def __init__(self, events: list[dict[str, list]]) -> None:
+        self.events = events
+        self.entry = -1
+
+    def GetEntry(self, entry: int) -> None:
+        self.entry = entry
+        for name, value in self.events[entry].items():
+            setattr(self, name, value)
+
+    def GetReadEntry(self) -> int:
+        return self.entry
+
+
+def collection(events: list[dict[str, list]], prefix: str, attrs: list[str]):
+    counts = [len(event[f"{prefix}_pt"]) for event in events]
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    columns = {
+        a: np.array([x for event in events for x in event[f"{prefix}_{a}"]])
+        for a in attrs
+    }
+    return ANEleColumnar.Collection(columns, offsets)
+
+
+def chunk(events: list[dict[str, list]]) -> ANEleColumnar.Chunk:
+    return ANEleColumnar.Chunk(
+        np.array([event["event"] for event in events]),
+        collection(events, "Electron", STD),
+        collection(events, "LowPtElectron", LOWPT),
+    )
+
+
+def per_event(coll: ANEleColumnar.Collection, attr: str) -> list[list]:
+    values = coll[attr] if attr != "index" else coll.index
+    return [
+        list(values[start:stop])
+        for start, stop in zip(coll.offsets[:-1], coll.offsets[1:])
+    ]
+
+
+@pytest.mark.parametrize("objtype", ["Std", "LowpT", "comb"])
+def test_columnar_selection(objtype):
+    events = make_events()
+    tree = Tree(events)
+    ane = ANEle.ANEle(tree, objtype, "Std")
+    expected = []
+    for entry in range(len(events)):
+        tree.GetEntry(entry)
+        expected.append(ane.getANEleIdx())
+
+    the_chunk = chunk(events)
+    std = ANEleColumnar.std_select(the_chunk)
+    lowpt = ANEleColumnar.lowpt_select(the_chunk)
+    if objtype == "Std":
+        result = std
+        types = [["Electron"] * n for n in std.counts]
+    elif objtype == "LowpT":
+        result = lowpt
+        types = [["LowPtElectron"] * n for n in lowpt.counts]
+    else:
+        result = ANEleColumnar.comb_select(std, lowpt, "Std")
+        # Some low pT electrons are paired with a standard one and dropped
+        assert result.offsets[-1] < std.offsets[-1] + lowpt.offsets[-1]
+        names = {
+            ANEleColumnar.TYPE_STD: "Electron",
+            ANEleColumnar.TYPE_LOWPT: "LowPtElectron",
+        }
+        types = [[names[t] for t in event] for event in per_event(result, "type")]
+
+    indices = per_event(result, "index")
+    assert [list(zip(i, t)) for i, t in zip(indices, types)] == expected
+    assert sum(len(e) for e in expected) > EVENTS / 4
+
+
+def test_ele_vid():
+    rng = random.Random(2)
+    vids = [bitmap(rng) for _ in range(1000)]
+    for removed in [(), ("pfRelIso03_all",), ("pt", "hoe")]:
+        for level in range(5):
+            expected = [VarCalc.eleVID(v, level, list(removed)) for v in vids]
+            result = ANEleColumnar.ele_vid(np.array(vids), level, removed)
+            assert list(result) == expected
+
+
+def test_memoized_per_event():
+    events = make_events()
+    tree = Tree(events)
+    shared = ANEle.ANEle(tree, "comb", "Std")
+    for entry in range(len(events)):
+        tree.GetEntry(entry)
+        fresh = ANEle.ANEle(tree, "comb", "Std")
+        assert shared.getANEleVar() == fresh.getANEleVar()
+
+
+def test_cache_stats():
+    tree = Tree(make_events())
+    tree.GetEntry(0)
+    ane = ANEle.ANEle(tree, "comb", "Std")
+    ANEle.ANEle.reset_cache_stats()
+    # Std and LowpT are selected once, and read again by SelectPairIdx
+    ane.CombEleIdx()
+    assert ANEle.ANEle.cache_stats() == {"evaluated": 2, "saved": 2}
+    tree.GetEntry(1)
+    ane.StdselectEleIdx()
+    assert ANEle.ANEle.cache_stats() == {"evaluated": 3, "saved": 2}
+
+
+def test_cached_copy():
+    tree = Tree(make_events())
+    tree.GetEntry(0)
+    ane = ANEle.ANEle(tree, "Std", "Std")
+    ane.StdselectEleIdx().append((99, "Electron"))
+    assert (99, "Electron") not in ane.StdselectEleIdx()
@@ -0,0 +1,142 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("ROOT")
+pytest.importorskip("mrtools")
+
+from tools import backend  # noqa: E402
+from tools import samples  # noqa: E402
+
+SPEC = backend.AnalysisSpec("analysis01", [])
+
+# Entries of the files of a sample, uneven and with an empty file
+ENTRIES = [30, 0, 7, 50, 13]
+
+
+def make_task(task_id: int, end: int = 10) -> backend.Task:
+    sample = {"name": "TTJets", "period": "Run2016", "type": "mc"}
+    return backend.Task(task_id, sample, [f"file{task_id}.root"], 0, end)
+
+
+def manifest_sample(directory) -> samples.Sample:
+    directory.mkdir()
+    manifest = {}
+    for i, entries in enumerate(ENTRIES):
+        path = directory / f"Sample_{i}.root"
+        path.write_bytes(b"x" * (i + 1))
+        stat = path.stat()
+        manifest[path.name] = {
+            "name": path.name,
+            "entries": entries,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+    return samples.Sample("Sample", "mc", "Run2016", directory, manifest=manifest)
+
+
+def claim_as(queue: backend.Queue, pid: int) -> None:
+    task, claimed = queue.claim()
+    claimed.rename(claimed.with_name(f"{task.id}.{socket.gethostname()}.{pid}.json"))
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_resume(tmp_path):
+    tasks = [make_task(0), make_task(1)]
+    queue = backend.Queue(tmp_path)
+    queue.create(SPEC, tasks)
+    assert queue.pending() == 2
+    assert queue.tasks() == tasks
+
+    task, claimed = queue.claim()
+    queue.fail(task, claimed, "error")
+    queue.create(SPEC, tasks)
+    assert queue.pending() == 2
+    assert queue.failures() == {}
+
+
+def test_resume_other_tasks(tmp_path):
+    queue = backend.Queue(tmp_path)
+    queue.create(SPEC, [make_task(0), make_task(1)])
+    with pytest.raises(ValueError, match="other tasks"):
+        queue.create(SPEC, [make_task(0), make_task(1, end=20)])
+    with pytest.raises(ValueError, match="another analysis"):
+        queue.create(backend.AnalysisSpec("analysis02", []), [make_task(0)])
+
+
+def test_heartbeat(tmp_path):
+    queue = backend.Queue(tmp_path)
+    queue.create(SPEC, [make_task(0)])
+    claim_as(queue, os.getpid())
+    (claimed,) = (tmp_path / "running").iterdir()
+    os.utime(claimed, (0, 0))
+    queue.heartbeat()
+    assert claimed.stat().st_mtime > 0
+    assert queue.requeue_stale(60) == 0
+
+
+def test_release_dead(tmp_path):
+    queue = backend.Queue(tmp_path)
+    queue.create(SPEC, [make_task(0)])
+    pid = dead_pid()
+    for _ in range(backend.CRASHES - 1):
+        claim_as(queue, pid)
+        assert queue.release_dead() == 1
+        assert queue.pending() == 1
+    claim_as(queue, pid)
+    assert queue.release_dead() == 0
+    assert queue.pending() == 0
+    assert list(queue.failures()) == [0]
+
+
+def test_release_alive(tmp_path):
+    queue = backend.Queue(tmp_path)
+    queue.create(SPEC, [make_task(0)])
+    claim_as(queue, os.getpid())
+    assert queue.release_dead() == 0
+    assert not list((tmp_path / "tasks").iterdir())
+
+
+def test_merge_stored_tasks(tmp_path):
+    queue = backend.Queue(tmp_path)
+    queue.create(SPEC, [make_task(0), make_task(1)])
+    results = {0: {"MET": {"nominal": 1}}, 1: {"MET": {"nominal": 2}}}
+    partials = backend.merge(queue.tasks(), results)
+    assert partials == {"Run2016/TTJets": {"MET": [{"nominal": 1}, {"nominal": 2}]}}
+    assert json.loads(queue.tasks_path.read_text())[1]["id"] == 1
+
+
+@pytest.mark.parametrize("task_entries", [1000, 100, 33, 10, 1])
+def test_make_tasks(tmp_path, task_entries):
+    sample = manifest_sample(tmp_path / "Sample")
+    tasks = backend.make_tasks([sample], task_entries)
+    assert len(tasks) == max(round(sum(ENTRIES) / task_entries), 1)
+    assert [t.id for t in tasks] == list(range(len(tasks)))
+
+    # Global entries of the tasks, from the files they cover
+    offsets = {}
+    total = 0
+    for file, entries in zip(sample.files(), ENTRIES):
+        offsets[file] = total
+        total += entries
+    covered = []
+    for task in tasks:
+        assert task.sample_key == "Run2016/Sample"
+        entries = [ENTRIES[sample.files().index(f)] for f in task.files]
+        assert 0 not in entries
+        assert 0 <= task.begin < entries[0]
+        assert sum(entries[:-1]) < task.end <= sum(entries)
+        assert task.entries == task.end - task.begin
+        assert set(task.sample["manifest"]) == {os.path.basename(f) for f in task.files}
+        begin = offsets[task.files[0]]
+        covered += range(begin + task.begin, begin + task.end)
+    assert sorted(covered) == list(range(sum(ENTRIES)))
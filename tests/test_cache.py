@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("ROOT")
+pytest.importorskip("ruamel.yaml")
+
+from tools import cache  # noqa: E402
+from tools import samples  # noqa: E402
+
+
+def test_analysis_key_inputs(tmp_path):
+    module = tmp_path / "analysis.py"
+    module.write_text("")
+    table = tmp_path / "sf.yaml"
+    table.write_text("GoodMuon: []\n")
+    key = cache.analysis_key(module, ["--loose"], [table])
+    assert key == cache.analysis_key(module, ["--loose"], [table])
+    assert key != cache.analysis_key(module, ["--loose"])
+
+    # Same path, other content
+    table.write_text("GoodElec: []\n")
+    assert key != cache.analysis_key(module, ["--loose"], [table])
+
+
+def test_file_id_friend(tmp_path):
+    directory = tmp_path / "Sample"
+    directory.mkdir()
+    path = directory / "Sample_0.root"
+    path.write_bytes(b"data")
+    plain = cache.file_id(str(path))
+
+    friend = samples.friend_path(path)
+    friend.parent.mkdir()
+    friend.write_bytes(b"friend")
+    with_friend = cache.file_id(str(path))
+    assert with_friend.startswith(plain) and with_friend != plain
+
+    friend.write_bytes(b"friend, fixed again")
+    assert cache.file_id(str(path)) != with_friend
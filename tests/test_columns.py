@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("ROOT")
+pytest.importorskip("mrtools")
+pytest.importorskip("ruamel.yaml")
+
+from tools import columns  # noqa: E402
+
+
+class Node:
+    """Dataframe node with only the calls the tracer forwards."""
+
+    def __init__(self, names: list[str]) -> None:
+        self.names = names
+
+    def GetColumnNames(self) -> list[str]:
+        return self.names
+
+    def Define(self, name: str, expression: str) -> "Node":
+        return Node(self.names + [name])
+
+    def Redefine(self, name: str, expression: str) -> "Node":
+        return Node(self.names)
+
+    def Filter(self, expression: str, name: str = "") -> "Node":
+        return Node(self.names)
+
+    def Histo1D(self, model: object, *names: str) -> str:
+        return "histo"
+
+
+INPUTS = ["Muon_pt", "Muon_eta", "Jet_pt", "MET_pt", "weight", "Friends.fixed"]
+
+
+def test_required():
+    tracer = columns.Tracer(Node(INPUTS))
+    df = tracer.Define("good", "Muon_pt > 10 && abs(Muon_eta) < 2.4")
+    df = df.Define("nGood", "Sum(good)")
+    df = df.Define("unused", "Jet_pt[0]")
+    df = df.Filter("nGood > 0 && fixed", "one muon")
+    assert df.Histo1D(("h", "", 10, 0.0, 100.0), "MET_pt", "weight") == "histo"
+
+    assert isinstance(df, columns.Tracer)
+    assert tracer.required() == ["MET_pt", "Muon_eta", "Muon_pt", "fixed", "weight"]
+    assert "Jet_pt" in tracer.required(extra=["unused"])
+
+
+def test_redefined():
+    tracer = columns.Tracer(Node(INPUTS))
+    df = tracer.Redefine("MET_pt", "MET_pt * Jet_pt[0]")
+    df.Filter("MET_pt > 200")
+    assert tracer.required() == ["Jet_pt", "MET_pt"]
+
+
+def test_recorded():
+    # Compiled functors record their column lists themselves
+    tracer = columns.Tracer(Node(INPUTS))
+    tracer.define("mask", ["Muon_pt", "Muon_eta"])
+    tracer.use(("mask",))
+    assert tracer.required() == ["Muon_eta", "Muon_pt"]
+
+
+def test_identifiers():
+    # Qualified and member names are not identifiers of their own
+    assert columns.identifiers("ROOT::VecOps::abs(x.y) < z_1 && f(w)") == {
+        "ROOT",
+        "x",
+        "z_1",
+        "f",
+        "w",
+    }
+    assert columns.identifiers(["a", ("b + c",)]) == {"a", "b", "c"}
+    assert columns.identifiers(iter(["d"])) == {"d"}
+    assert columns.identifiers(3.0) == set()
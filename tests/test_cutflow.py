@@ -0,0 +1,52 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+pytest.importorskip("ruamel.yaml")
+
+from tools import cutflow  # noqa: E402
+from tools import samples  # noqa: E402
+
+SELECTION = ["x % 2 == 0", "x < 10"]
+
+
+@pytest.fixture
+def sample(tmp_path):
+    directory = tmp_path / "Sample"
+    directory.mkdir()
+    for i in range(3):
+        df = ROOT.RDataFrame(100).Define("x", f"int(rdfentry_) + {100 * i}")
+        df.Snapshot(samples.TREE, str(directory / f"Sample_{i}.root"))
+    return samples.Sample("Sample", "mc", "Run2016", directory)
+
+
+def test_measure_cuts():
+    df = ROOT.RDataFrame(1000).Define("x", "int(rdfentry_)")
+    stats = cutflow.measure_cuts(df, SELECTION, 100)
+
+    passed = {s.cut: s.passed for s in stats}
+    assert passed == pytest.approx({"x % 2 == 0": 0.5, "x < 10": 0.1})
+
+
+def test_first_entries(sample):
+    df = samples.first_entries(sample, 50)
+    assert df.Count().GetValue() == 50
+    assert df.Max("x").GetValue() == 49
+
+
+def test_first_entries_mt(sample):
+    ROOT.EnableImplicitMT(2)
+    try:
+        df = samples.first_entries(sample, 50)
+        assert ROOT.IsImplicitMTEnabled()
+        assert df.Count().GetValue() == 50
+        # Only the first file is read, without a manifest
+        assert df.Max("x").GetValue() < 100
+    finally:
+        ROOT.DisableImplicitMT()
+
+
+def test_def_selection_first_entries(sample):
+    df = samples.dataframe(sample)
+    first = samples.first_entries(sample, 100)
+    df = cutflow.def_selection(df, "Sample", SELECTION, None, True, False, first)
+    assert df.Count().GetValue() == 5
@@ -0,0 +1,74 @@
+import pathlib
+import random
+import sys
+
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+
+# The helpers are imported as Helper by the scripts in test_leptons
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / "test_leptons"))
+
+from Helper import VarCalc  # noqa: E402
+from tools import leptons  # noqa: E402
+
+# removedCuts of VarCalc.eleVID and the cut masks of ElectronVid
+REMOVED = {
+    (): [],
+    ("pfRelIso03_all",): ["GsfEleRelPFIsoScaledCut"],
+    ("pt", "hoe"): ["MinPtCut", "GsfEleHadronicOverEMEnergyScaledCut"],
+}
+
+HELPERS = """
+int TestVidPass1(unsigned int vid) { return ElectronVid::Pass<1>(vid); }
+int TestVidPass1NoIso(unsigned int vid)
+{
+    return ElectronVid::Pass<1, ElectronVid::GsfEleRelPFIsoScaledCut>(vid);
+}
+int TestVidLevel(unsigned int vid, unsigned int mask) { return ElectronVid::Level(vid, mask); }
+"""
+
+
+@pytest.fixture(scope="module")
+def vid():
+    leptons.init()
+    ROOT.gInterpreter.Declare(HELPERS)
+    return ROOT
+
+
+def bitmaps(seed: int, n: int = 2000) -> list[int]:
+    """Random bitmaps, half of them with most cuts passing level 1."""
+    rng = random.Random(seed)
+    result = [rng.getrandbits(30) for _ in range(n // 2)]
+    for _ in range(n - n // 2):
+        bitmap = 0
+        for _ in range(10):
+            bitmap = bitmap << 3 | rng.choice([0, 2, 3, 4, 7] + [1] * 10)
+        result.append(bitmap)
+    return result
+
+
+def mask(vid, removed: tuple[str, ...]) -> int:
+    result = 0
+    for cut in REMOVED[removed]:
+        result |= getattr(vid.ElectronVid, cut)
+    return result
+
+
+@pytest.mark.parametrize("removed", list(REMOVED))
+def test_eval(vid, removed):
+    cut_mask = mask(vid, removed)
+    for bitmap in bitmaps(1):
+        for level in range(5):
+            expected = VarCalc.eleVID(bitmap, level, list(removed))
+            assert vid.ElectronVid.Eval(bitmap, level, cut_mask) == expected
+        highest = max(v for v in range(5) if VarCalc.eleVID(bitmap, v, list(removed)))
+        assert vid.TestVidLevel(bitmap, cut_mask) == highest
+
+
+def test_pass(vid):
+    for bitmap in bitmaps(2):
+        assert vid.TestVidPass1(bitmap) == VarCalc.eleVID(bitmap, 1)
+        assert vid.TestVidPass1NoIso(bitmap) == VarCalc.eleVID(
+            bitmap, 1, ["pfRelIso03_all"]
+        )
@@ -0,0 +1,103 @@
+import dataclasses
+import json
+import os
+import pathlib
+
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+
+from tools import fileinfo  # noqa: E402
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "Sample_0.root"
+    df = ROOT.RDataFrame(10).Define("weight", "2.").Define("x", "1.f")
+    df.Snapshot("Events", str(path), ["weight", "x"])
+    options = ROOT.RDF.RSnapshotOptions()
+    options.fMode = "UPDATE"
+    ROOT.RDataFrame(3).Define("y", "1").Snapshot("Friends", str(path), ["y"], options)
+    return str(path)
+
+
+@pytest.fixture
+def plain(tmp_path):
+    path = tmp_path / "plain.root"
+    path.write_bytes(b"root")
+    return str(path)
+
+
+def stat(path: str, tree: str, entries: int) -> fileinfo.FileInfo:
+    st = os.stat(path)
+    return fileinfo.FileInfo(path, st.st_size, st.st_mtime_ns, entries, tree=tree)
+
+
+def test_read_info_tree(path):
+    events = fileinfo.read_info(path, weights=True, schema=True)
+    friends = fileinfo.read_info(path, schema=True, tree="Friends")
+
+    assert (events.tree, events.entries, events.sum_weights) == ("Events", 10, 20.0)
+    assert set(events.schema) == {"weight", "x"}
+    assert (friends.tree, friends.entries) == ("Friends", 3)
+    assert friends.schema == {"y": "Int_t"}
+
+
+def test_cache_key_tree(tmp_path, plain):
+    cache = fileinfo.FileCache(tmp_path / "fileinfo.json")
+    cache.put(stat(plain, "Events", 10))
+    cache.put(stat(plain, "Friends", 3))
+    cache.save()
+
+    cache = fileinfo.FileCache(tmp_path / "fileinfo.json")
+    assert cache.get(plain).entries == 10
+    assert cache.get(plain, tree="Friends").entries == 3
+    assert cache.get(plain, tree="Other") is None
+
+
+def test_cache_without_tree(tmp_path, plain):
+    data = dataclasses.asdict(stat(plain, "Events", 10))
+    del data["tree"]
+    (tmp_path / "fileinfo.json").write_text(json.dumps([data]))
+
+    cache = fileinfo.FileCache(tmp_path / "fileinfo.json")
+    assert cache.get(plain).entries == 10
+    assert cache.get(plain, tree="Friends") is None
+
+
+def test_scan_tree(tmp_path, path):
+    cache = fileinfo.FileCache(tmp_path / "fileinfo.json")
+    infos = fileinfo.scan([path], workers=1, cache=cache, tree="Friends")
+    assert infos[path].entries == 3
+    assert cache.get(path, tree="Friends").entries == 3
+    assert cache.get(path) is None
+
+
+def test_scan_weights(tmp_path, path, plain):
+    cache = fileinfo.FileCache(tmp_path / "fileinfo.json")
+    infos = fileinfo.scan([path, plain], weights=True, workers=2, cache=cache)
+    assert (infos[path].entries, infos[path].sum_weights) == (10, 20.0)
+    assert infos[path].sum_weights2 == 40.0
+    assert isinstance(infos[plain], OSError)
+
+    # Read from the cache the second time, the failed file again
+    infos = fileinfo.scan([path, plain], weights=True, workers=1, cache=cache)
+    assert infos[path] is cache.get(path, weights=True)
+    assert isinstance(infos[plain], OSError)
+
+
+def test_scan_entries_only(tmp_path, path):
+    cache = fileinfo.FileCache(tmp_path / "fileinfo.json")
+    infos = fileinfo.scan([path], workers=1, cache=cache)
+    assert infos[path].entries == 10
+    assert infos[path].sum_weights is None
+    assert cache.get(path, weights=True) is None
+
+
+def test_check_files(monkeypatch, tmp_path, capsys, path, plain):
+    check_files = pytest.importorskip("check_files")
+    monkeypatch.setattr(fileinfo.compiled, "CACHE_DIR", tmp_path)
+    check_files.check_files([pathlib.Path(path), pathlib.Path(plain)], 1)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].endswith("Sample_0.root - events 10 - weights 20.0")
+    assert lines[1].startswith(f"{pathlib.Path(plain).parent.name}/plain.root - error")
@@ -0,0 +1,92 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+
+from tools import leptons  # noqa: E402
+
+ATTRS = ["pt", "eta", "phi", "charge"]
+SELECT_ONE = ["Electron_pt > 6"]
+SELECT_TWO = ["LowPtElectron_pt > 5"]
+
+
+def electrons():
+    """Electrons ordered by pt, the second low pT one near the first one."""
+    leptons.init()
+    return (
+        ROOT.RDataFrame(6)
+        .Define("Electron_pt", "ROOT::RVecF{30.f, 12.f, 5.f + rdfentry_}")
+        .Define("Electron_eta", "ROOT::RVecF{0.1f, -1.f, 2.f}")
+        .Define("Electron_phi", "ROOT::RVecF{0.f, 1.f, -2.f}")
+        .Define("Electron_charge", "ROOT::RVecI{1, -1, 1}")
+        .Define("LowPtElectron_pt", "ROOT::RVecF{20.f - rdfentry_, 8.f, 4.f}")
+        .Define("LowPtElectron_eta", "ROOT::RVecF{1.f, 0.12f, -2.f}")
+        .Define("LowPtElectron_phi", "ROOT::RVecF{2.f, 0.01f, 1.f}")
+        .Define("LowPtElectron_charge", "ROOT::RVecI{-1, 1, 1}")
+    )
+
+
+def take(df, name):
+    takes = {
+        attr: df.Take[df.GetColumnType(f"{name}_{attr}")](f"{name}_{attr}")
+        for attr in ATTRS
+    }
+    return {attr: [list(v) for v in t.GetValue()] for attr, t in takes.items()}
+
+
+@pytest.mark.parametrize(
+    "merge, combine",
+    [
+        ("pt", leptons.def_combined_leptons),
+        ("dr", leptons.define_combined_electrons),
+    ],
+)
+def test_fused_leptons(merge, combine):
+    df = electrons()
+    df = leptons.def_vector_obj(df, "GoodElectron", SELECT_ONE, "Electron", ATTRS)
+    df = leptons.def_vector_obj(
+        df, "GoodLowPtElectron", SELECT_TWO, "LowPtElectron", ATTRS
+    )
+    df = combine(df, "CombElectron", "GoodElectron", "GoodLowPtElectron", ATTRS)
+    df = leptons.def_fused_leptons(
+        df,
+        "FusedElectron",
+        "Electron",
+        SELECT_ONE,
+        "LowPtElectron",
+        SELECT_TWO,
+        ATTRS,
+        merge=merge,
+    )
+
+    expected = take(df, "CombElectron")
+    assert take(df, "FusedElectron") == expected
+    assert df.Sum("nFusedElectron").GetValue() == sum(map(len, expected["pt"]))
+
+
+def test_merged_by_pt():
+    df = leptons.def_fused_leptons(
+        electrons(),
+        "FusedElectron",
+        "Electron",
+        SELECT_ONE,
+        "LowPtElectron",
+        SELECT_TWO,
+        ATTRS,
+    )
+    pts = df.Take["ROOT::RVecF"]("FusedElectron_pt").GetValue()
+    assert [list(pt) for pt in pts][0] == [30.0, 20.0, 12.0, 8.0]
+    assert all(list(pt) == sorted(pt, reverse=True) for pt in pts)
+
+
+def test_unknown_merge():
+    with pytest.raises(ValueError):
+        leptons.def_fused_leptons(
+            electrons(),
+            "F",
+            "Electron",
+            SELECT_ONE,
+            "LowPtElectron",
+            SELECT_TWO,
+            ATTRS,
+            merge="x",
+        )
@@ -0,0 +1,114 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+pytest.importorskip("ruamel.yaml")
+
+from tools import histos  # noqa: E402
+
+DEFINITIONS = [
+    {
+        "dataframe": "main",
+        "weight": "w",
+        "Histo1D": [{"name": "x", "title": "", "bins": [2, 0.0, 2.0]}],
+        "Histo2D": [
+            {
+                "name": "x_vs_y",
+                "title": "",
+                "bins": [2, 0.0, 2.0, 2, 0.0, 2.0],
+                "var": ["x", "y"],
+                "overflow": True,
+            }
+        ],
+    },
+    {
+        "dataframe": "other",
+        "Histo1D": [{"name": "y", "title": "", "bins": [2, 0.0, 2.0]}],
+    },
+]
+
+
+def contents(histo):
+    return [[histo.GetBinContent(ix, iy) for iy in range(4)] for ix in range(4)]
+
+
+def test_fold_overflow_2d():
+    histo = ROOT.TH2D("fold_2d", "", 2, 0.0, 2.0, 2, 0.0, 2.0)
+    histo.Sumw2()
+    for x, y, w in [
+        (0.5, 0.5, 1.0),
+        (5.0, 0.5, 1.0),
+        (0.5, 5.0, 1.0),
+        (1.5, 1.5, 1.0),
+        (5.0, 5.0, 2.0),
+        (-1.0, 0.5, 1.0),
+    ]:
+        histo.Fill(x, y, w)
+    histos.fold_overflow(histo)
+
+    # Overflows in the last bins, the underflow is kept
+    assert contents(histo) == [
+        [0.0, 1.0, 0.0, 0.0],
+        [0.0, 1.0, 1.0, 0.0],
+        [0.0, 1.0, 3.0, 0.0],
+        [0.0, 0.0, 0.0, 0.0],
+    ]
+    assert histo.GetBinError(2, 2) == pytest.approx(5**0.5)
+
+
+def test_fold_overflow_1d():
+    histo = ROOT.TH1D("fold_1d", "", 2, 0.0, 2.0)
+    for x in [0.5, 1.5, 2.5, 3.5, -0.5]:
+        histo.Fill(x)
+    histos.fold_overflow(histo)
+    assert [histo.GetBinContent(i) for i in range(4)] == [1.0, 1.0, 3.0, 0.0]
+
+
+def test_split_definitions():
+    single = histos.split_definitions(DEFINITIONS)
+    assert list(single) == ["x", "x_vs_y", "y"]
+    assert single["x_vs_y"] == {
+        "dataframe": "main",
+        "weight": "w",
+        "Histo2D": DEFINITIONS[0]["Histo2D"],
+    }
+    assert single["y"] == DEFINITIONS[1]
+
+
+def test_book_histos_2d():
+    df = (
+        ROOT.RDataFrame(4)
+        .Define("x", "0.5 * rdfentry_")
+        .Define("y", "2.5 - 0.5 * rdfentry_")
+        .Define("w", "2.")
+    )
+    booked = histos.book_histos(df, DEFINITIONS[0], variations=False)
+    assert booked["x_vs_y"].overflow and not booked["x"].overflow
+    histo = booked["x_vs_y"].nominal.GetValue()
+    assert histo.GetDimension() == 2
+    assert histo.Integral(0, 3, 0, 3) == 8.0
+    assert booked["x"].nominal.GetValue().Integral() == 8.0
+
+
+def test_split_by_file(tmp_path):
+    files = []
+    for i in range(3):
+        path = str(tmp_path / f"Sample_{i}.root")
+        df = ROOT.RDataFrame(5 + i).Define("x", f"0.5 * rdfentry_ + {i}")
+        df.Define("w", "2.").Snapshot("Events", path, ["x", "w"])
+        files.append(path)
+
+    df = histos.def_file_index(ROOT.RDataFrame("Events", files), "i_", files, "Events")
+    definition = histos.split_definitions(DEFINITIONS)["x"]
+    booked = histos.book_histos(df, definition, False, by_file=("i_", len(files)))
+    by_file = histos.split_by_file(booked["x"], definition, [0, 2])
+
+    for partial, file in zip(by_file, [files[0], files[2]]):
+        expected = histos.book_histos(
+            ROOT.RDataFrame("Events", file), definition, False
+        )["x"].nominal.GetValue()
+        histo = partial["nominal"]
+        # Flow bins included
+        assert [histo.GetBinContent(i) for i in range(4)] == [
+            expected.GetBinContent(i) for i in range(4)
+        ]
+        assert histo.GetBinError(3) == pytest.approx(expected.GetBinError(3))
@@ -0,0 +1,52 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+
+from tools import integrity  # noqa: E402
+
+
+def write(path, tree="Events", entries=1000):
+    df = ROOT.RDataFrame(entries).Define("x", "float(rdfentry_)").Define("y", "1")
+    options = ROOT.RDF.RSnapshotOptions()
+    options.fAutoFlush = 100
+    df.Snapshot(tree, str(path), ["x", "y"], options)
+    return path
+
+
+@pytest.fixture
+def sample(tmp_path):
+    directory = tmp_path / "Sample"
+    directory.mkdir()
+    good = write(directory / "Sample_0.root")
+    truncated = directory / "Sample_1.root"
+    data = good.read_bytes()
+    truncated.write_bytes(data[: len(data) // 2])
+    (directory / "Sample_2.root").write_bytes(b"not a root file")
+    write(directory / "Sample_3.root", tree="Friends")
+    return directory
+
+
+def test_check_file(sample):
+    report = integrity.check_file(str(sample / "Sample_0.root"))
+    assert report["ok"] and report["errors"] == []
+    assert (report["entries"], report["branches"]) == (1000, 2)
+
+
+def test_bad_files(sample):
+    truncated = integrity.check_file(str(sample / "Sample_1.root"))
+    assert not truncated["ok"] and truncated["errors"]
+    garbage = integrity.check_file(str(sample / "Sample_2.root"))
+    assert garbage == {"ok": False, "errors": ["cannot be opened"], "recovered": False}
+    other_tree = integrity.check_file(str(sample / "Sample_3.root"))
+    assert other_tree["errors"] == ["no Events in keys"]
+
+
+def test_scan_report(tmp_path, sample):
+    files = integrity.scan([sample], workers=2)
+    assert sorted(files) == [str(sample / f"Sample_{i}.root") for i in range(4)]
+
+    report = tmp_path / "integrity.json"
+    integrity.write_report(report, files)
+    assert integrity.bad_files(report) == {
+        str(sample / f"Sample_{i}.root") for i in (1, 2, 3)
+    }
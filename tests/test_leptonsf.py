@@ -0,0 +1,59 @@
+import pathlib
+
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+pytest.importorskip("ruamel.yaml")
+
+from tools import leptons  # noqa: E402
+from tools import leptonsf  # noqa: E402
+from tools import weights  # noqa: E402
+
+FIXTURE = pathlib.Path(__file__).parent / "data" / "lepton_sf.json"
+CONFIG = {"GoodMuon": [{"json": str(FIXTURE)}]}
+
+# As analysis02 with --lepton-sf
+FACTOR = weights.Factor(
+    "new_reweightLeptonSF",
+    "new_reweightLeptonSFDown",
+    "new_reweightLeptonSFUp",
+    "reweightLeptonSF",
+)
+
+
+def muons():
+    return (
+        ROOT.RDataFrame(1)
+        .Define("Muon_pt", "ROOT::RVecF{10.f, 30.f, 100.f}")
+        .Define("Muon_eta", "ROOT::RVecF{0.5f, -2.f, 3.f}")
+        .Define("Muon_tight", "ROOT::RVecI{1, 1, 0}")
+    )
+
+
+@pytest.mark.parametrize("view", [False, True])
+def test_lepton_sf_weight(view):
+    leptons.init()
+    df = leptons.def_vector_obj(
+        muons(), "GoodMuon", ["Muon_tight != 0"], "Muon", ["pt", "eta"], view
+    )
+    df = leptonsf.def_lepton_sf(df, FACTOR.nominal, CONFIG)
+    df = weights.def_weight(df, "the_weight", [FACTOR])
+    histo = df.Histo1D(("n", "", 1, 0.0, 10.0), "nGoodMuon", "the_weight")
+    varied = ROOT.RDF.Experimental.VariationsFor(histo)
+
+    assert varied["nominal"].Integral() == pytest.approx(0.9 * 0.95)
+    assert varied["reweightLeptonSF:up"].Integral() == pytest.approx(1.0 * 1.0)
+    assert varied["reweightLeptonSF:down"].Integral() == pytest.approx(0.8 * 0.9)
+
+
+def test_outside_table():
+    df = muons().Define("GoodMuon_pt", "Muon_pt").Define("GoodMuon_eta", "Muon_eta")
+    df = leptonsf.def_lepton_sf(df, "sf", CONFIG)
+    # The last lepton is beyond both axes and gets the last bin
+    assert df.Sum("sf").GetValue() == pytest.approx(0.9 * 0.95 * 0.95)
+
+
+def test_table_loaded_once():
+    assert leptonsf.load_table(CONFIG["GoodMuon"][0]) == leptonsf.load_table(
+        {"json": str(FIXTURE)}
+    )
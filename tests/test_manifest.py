@@ -0,0 +1,87 @@
+import os
+import pathlib
+
+from tools import manifest
+
+
+def convert(input: str, output: str) -> None:
+    pathlib.Path(output).write_bytes(pathlib.Path(input).read_bytes() * 2)
+
+
+def flaky(marker: str, input: str, output: str) -> None:
+    """Fails the first time."""
+    if not os.path.exists(marker):
+        pathlib.Path(marker).touch()
+        raise RuntimeError("first attempt")
+    convert(input, output)
+
+
+def crashing(marker: str, input: str, output: str) -> None:
+    """Kills its worker the first time."""
+    if not os.path.exists(marker):
+        pathlib.Path(marker).touch()
+        os._exit(1)
+    convert(input, output)
+
+
+def failing(input: str, output: str) -> None:
+    raise OSError(f"cannot read {input}")
+
+
+def job(tmp_path: pathlib.Path, function, *args: str) -> manifest.Job:
+    input = tmp_path / "input.root"
+    input.write_bytes(b"data")
+    output = str(tmp_path / "out" / "output.root")
+    return manifest.Job(str(input), output, function, args + (str(input), output))
+
+
+def test_retry(tmp_path):
+    the_job = job(tmp_path, flaky, str(tmp_path / "marker"))
+    the_manifest = manifest.Manifest(tmp_path / "manifest.json")
+    assert manifest.run(the_manifest, [the_job], workers=1, backoff=0.0)
+
+    task = manifest.Manifest(tmp_path / "manifest.json").tasks[the_job.output]
+    assert (task.state, task.attempts, task.error) == (manifest.DONE, 2, None)
+    assert (task.input_bytes, task.output_bytes) == (4, 8)
+    assert task.checksum == manifest.checksum(the_job.output)
+
+
+def test_crash(tmp_path):
+    the_job = job(tmp_path, crashing, str(tmp_path / "marker"))
+    the_manifest = manifest.Manifest(tmp_path / "manifest.json")
+    assert manifest.run(the_manifest, [the_job], workers=1, backoff=0.0)
+    assert the_manifest.tasks[the_job.output].state == manifest.DONE
+
+
+def test_give_up(tmp_path):
+    the_job = job(tmp_path, failing)
+    the_manifest = manifest.Manifest(tmp_path / "manifest.json")
+    assert not manifest.run(the_manifest, [the_job], workers=1, retries=2, backoff=0.0)
+
+    task = manifest.Manifest(tmp_path / "manifest.json").tasks[the_job.output]
+    assert (task.state, task.attempts) == (manifest.FAILED, 2)
+    assert task.error == f"cannot read {the_job.input}"
+    assert manifest.Manifest(tmp_path / "manifest.json").summary()["failed"] == 1
+
+
+def test_resume(tmp_path):
+    the_job = job(tmp_path, convert)
+    path = tmp_path / "manifest.json"
+    assert manifest.run(manifest.Manifest(path), [the_job], workers=1)
+
+    # Done tasks are skipped, failing would show otherwise
+    skipped = manifest.Job(the_job.input, the_job.output, failing, the_job.args)
+    assert manifest.run(manifest.Manifest(path), [skipped], workers=1)
+    assert manifest.Manifest(path).tasks[the_job.output].attempts == 1
+
+    # Same size, other content: only found with verify
+    pathlib.Path(the_job.output).write_bytes(b"atadatad")
+    assert manifest.Manifest(path).finished(the_job.output)
+    assert not manifest.Manifest(path).finished(the_job.output, verify=True)
+    assert manifest.run(manifest.Manifest(path), [the_job], workers=1, verify=True)
+    assert pathlib.Path(the_job.output).read_bytes() == b"datadata"
+
+    # A removed output is written again
+    os.remove(the_job.output)
+    assert manifest.run(manifest.Manifest(path), [the_job], workers=1)
+    assert manifest.Manifest(path).tasks[the_job.output].attempts == 3
@@ -0,0 +1,36 @@
+import pathlib
+
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+pytest.importorskip("correctionlib")
+
+from tools import pog  # noqa: E402
+
+FIXTURE = pathlib.Path(__file__).parent / "data" / "puWeights.json"
+
+
+def test_pileup_weight():
+    df = ROOT.RDataFrame(4).Define("nTrueInt", "float(rdfentry_ * 10 + 5)")
+    df = pog.def_pileup_weight(df, "puWeight", "Run2016preVFP", "nTrueInt", FIXTURE)
+    columns = ["puWeight", "puWeightUp", "puWeightDown"]
+    values = {c: list(df.Take["double"](c).GetValue()) for c in columns}
+
+    assert values["puWeight"] == pytest.approx([0.5, 1.0, 2.0, 2.0])
+    assert values["puWeightUp"] == pytest.approx([0.6, 1.1, 2.2, 2.2])
+    assert values["puWeightDown"] == pytest.approx([0.4, 0.9, 1.8, 1.8])
+
+
+def test_evaluator_cached():
+    first = pog.evaluator(FIXTURE, "Collisions16_UltraLegacy_goldenJSON", 1)
+    second = pog.evaluator(FIXTURE, "Collisions16_UltraLegacy_goldenJSON", 1)
+    assert first == second
+
+
+def test_fixture_matches_correctionlib():
+    import correctionlib
+
+    correction = correctionlib.CorrectionSet.from_file(str(FIXTURE))[
+        "Collisions16_UltraLegacy_goldenJSON"
+    ]
+    assert correction.evaluate(12.0, "up") == pytest.approx(1.1)
@@ -0,0 +1,44 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+
+from tools import precision  # noqa: E402
+
+
+def test_parse_rules():
+    assert precision.parse_rules(["*_pt=16", "MET_phi=8"]) == {
+        "*_pt": 16,
+        "MET_phi": 8,
+    }
+    for rule in ["*_pt", "*_pt=0", "*_pt=24", "*_pt=x"]:
+        with pytest.raises(ValueError):
+            precision.parse_rules([rule])
+
+
+def test_reduced_columns():
+    schema = {
+        "Muon_eta": "ROOT::VecOps::RVec<Float_t>",
+        "Muon_charge": "ROOT::VecOps::RVec<Int_t>",
+        "MET_phi": "Float_t",
+        "MET_pt": "Float_t",
+    }
+    rules = {"MET_phi": 8} | precision.PRECISION
+    assert precision.reduced_columns(schema, rules) == {"Muon_eta": 12, "MET_phi": 8}
+
+
+def test_truncate():
+    precision.init()
+    for x in [1.0, 3.14159, -2.71828, 1e-20, 123456.0]:
+        for bits in [4, 10, 16]:
+            truncated = ROOT.Precision.Truncate(x, bits)
+            assert abs(truncated - x) <= abs(x) * 2.0 ** -(bits + 1)
+    assert ROOT.Precision.Truncate(1.5, 23) == 1.5
+    assert ROOT.Precision.Truncate(float("inf"), 4) == float("inf")
+
+
+def test_def_reduced():
+    df = ROOT.RDataFrame(1).Define("x", "3.14159f").Define("y", "3.14159f")
+    schema = {"x": "float", "y": "float"}
+    df = precision.def_reduced(df, schema, {"x": 4})
+    assert df.Sum("x").GetValue() == 3.125
+    assert df.Sum("y").GetValue() == pytest.approx(3.14159)
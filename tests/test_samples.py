@@ -0,0 +1,62 @@
+import pathlib
+
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+pytest.importorskip("ruamel.yaml")
+
+from tools import samples  # noqa: E402
+
+
+def sample(directory: pathlib.Path) -> samples.Sample:
+    return samples.Sample("Sample", "mc", "Run2016", directory)
+
+
+def test_friend_path():
+    path = "/data/Met/Sample/Sample_3.root"
+    assert samples.friend_path(path) == pathlib.Path(
+        "/data/Met/Sample_friend/Sample_3_friend.root"
+    )
+
+
+def test_friends(tmp_path):
+    directory = tmp_path / "Sample"
+    directory.mkdir()
+    for i in range(2):
+        (directory / f"Sample_{i}.root").write_bytes(b"")
+    the_sample = sample(directory)
+    assert the_sample.friends() is None
+
+    friends = samples.friend_directory(directory)
+    friends.mkdir()
+    (friends / "Sample_0_friend.root").write_bytes(b"")
+    with pytest.raises(FileNotFoundError, match="1 friend files missing"):
+        the_sample.friends()
+    assert the_sample.friends(the_sample.files()[:1]) == [
+        str(friends / "Sample_0_friend.root")
+    ]
+
+    (friends / "Sample_1_friend.root").write_bytes(b"")
+    assert the_sample.friends() == [
+        str(friends / f"Sample_{i}_friend.root") for i in range(2)
+    ]
+
+
+def test_dataframe_with_friends(tmp_path):
+    directory = tmp_path / "Sample"
+    friends = samples.friend_directory(directory)
+    directory.mkdir()
+    friends.mkdir()
+    for i in range(2):
+        df = ROOT.RDataFrame(5).Define("x", f"int(rdfentry_) + {10 * i}")
+        df.Snapshot(samples.TREE, str(directory / f"Sample_{i}.root"), ["x"])
+        df = ROOT.RDataFrame(5).Define("fixed", f"2 * (int(rdfentry_) + {10 * i})")
+        df.Snapshot(
+            samples.FRIEND_TREE, str(friends / f"Sample_{i}_friend.root"), ["fixed"]
+        )
+
+    df = samples.dataframe(sample(directory))
+    assert f"{samples.FRIEND_TREE}.fixed" in map(str, df.GetColumnNames())
+    # The friend entries are those of the same input file
+    assert df.Filter("fixed != 2 * x").Count().GetValue() == 0
+    assert df.Count().GetValue() == 10
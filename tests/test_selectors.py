@@ -0,0 +1,70 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+
+from tools import leptons  # noqa: E402
+
+MUON_TYPES = {
+    "Muon_pt": "ROOT::VecOps::RVec<Float_t>",
+    "Muon_eta": "ROOT::VecOps::RVec<Float_t>",
+    "Muon_looseId": "ROOT::VecOps::RVec<Bool_t>",
+}
+
+# Random electrons, the same for the jitted and the compiled selections
+ELECTRONS = {
+    "Electron_pt": ("ROOT::RVecF", "gRandom->Uniform(0., 40.)"),
+    "Electron_eta": ("ROOT::RVecF", "gRandom->Uniform(-2.7, 2.7)"),
+    "Electron_deltaEtaSC": ("ROOT::RVecF", "gRandom->Uniform(-0.1, 0.1)"),
+    "Electron_pfRelIso03_all": ("ROOT::RVecF", "gRandom->Uniform(0., 0.3)"),
+    "Electron_dxy": ("ROOT::RVecF", "gRandom->Uniform(-0.03, 0.03)"),
+    "Electron_dz": ("ROOT::RVecF", "gRandom->Uniform(-0.15, 0.15)"),
+    "Electron_vidNestedWPBitmap": ("ROOT::RVecI", "gRandom->Integer(1 << 30)"),
+}
+
+
+def test_selector_columns():
+    columns = set(MUON_TYPES) | {"Muon_dz"}
+    select = leptons.MUON_SELECT + ["ROOT::VecOps::abs(Muon_pt) > 1"]
+    assert leptons.selector_columns(select, columns) == list(MUON_TYPES)
+
+
+def test_fused_source():
+    source = leptons.selector_functor("Sel", leptons.MUON_SELECT, MUON_TYPES)
+    assert "for (std::size_t i = 0; i < n; ++i)" in source
+    assert "(Muon_pt[i] > 3.5) &&" in source
+    assert "(std::abs(Muon_eta[i]) < 2.4) &&" in source
+    assert "(Muon_looseId[i]);" in source
+
+
+def test_unfused_source():
+    body = "Muon_pt > 3.5 && abs(Muon_eta) < 2.4 && Muon_looseId"
+    source = leptons.selector_functor(
+        "Sel", leptons.MUON_SELECT, MUON_TYPES, fused=False
+    )
+    assert f"return {body};" in source
+    # Without vector columns there is nothing to loop over
+    scalars = {c: "Float_t" for c in ("Muon_pt", "Muon_eta", "Muon_looseId")}
+    source = leptons.selector_functor("Sel", leptons.MUON_SELECT, scalars)
+    assert f"return {body};" in source
+
+
+def electrons():
+    leptons.init()
+    ROOT.gRandom.SetSeed(1)
+    df = ROOT.RDataFrame(1000).Define("nElectron", "gRandom->Integer(5)")
+    for column, (column_type, value) in ELECTRONS.items():
+        expr = f"{column_type} v(nElectron); for (auto &x : v) x = {value}; return v;"
+        df = df.Define(column, expr)
+    return df
+
+
+@pytest.mark.parametrize(
+    "select", [leptons.ELEC_SELECT, leptons.ELEC_SELECT_HYBRID_ISO]
+)
+def test_fused_selector(select):
+    df = electrons().Define("jitted", " && ".join(select))
+    df = leptons.def_selector(df, "compiled", select)
+    differences = df.Sum("Sum(jitted != compiled)")
+    selected = df.Sum("Sum(compiled)")
+    assert differences.GetValue() == 0
+    assert selected.GetValue() > 0
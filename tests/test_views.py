@@ -0,0 +1,58 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+pytest.importorskip("ruamel.yaml")
+
+from tools import histos  # noqa: E402
+from tools import leptons  # noqa: E402
+
+DEFINITION = {
+    "dataframe": "main",
+    "weight": "the_weight",
+    "Histo1D": [
+        {"name": "GoodMuon_pt", "title": "", "bins": [4, 0.0, 40.0]},
+        {
+            "name": "GoodMuon_pt_wide",
+            "title": "",
+            "bins": [1, 0.0, 40.0],
+            "var": "GoodMuon_pt",
+        },
+    ],
+}
+
+
+def muons() -> ROOT.RDF.RNode:
+    leptons.init()
+    return (
+        ROOT.RDataFrame(10)
+        .Define("Muon_pt", "ROOT::RVecF{10.f, 20.f, 30.f}")
+        .Define("Muon_eta", "ROOT::RVecF{0.f, 1.f, -1.f}")
+        .Define("the_weight", "2.")
+    )
+
+
+@pytest.mark.parametrize("view", [False, True])
+def test_histo_of_view(view):
+    df = leptons.def_vector_obj(
+        muons(), "GoodMuon", ["Muon_pt > 15"], "Muon", ["pt", "eta"], view
+    )
+    booked = histos.book_histos(df, DEFINITION, False)
+    histo = booked["GoodMuon_pt"].nominal.GetValue()
+
+    assert histo.GetEntries() == 20
+    assert [histo.GetBinContent(i) for i in range(1, 5)] == [0, 0, 20, 20]
+    assert booked["GoodMuon_pt_wide"].nominal.GetValue().Integral() == 40
+
+
+def test_gathered_once():
+    df = leptons.def_vector_obj(
+        muons(), "GoodMuon", ["Muon_pt > 15"], "Muon", ["pt"], True
+    )
+    df, columns = histos.def_gathered(df, ["GoodMuon_pt", "the_weight"])
+    assert columns == ["GoodMuon_pt_gathered", "the_weight"]
+    df, columns = histos.def_gathered(df, ["GoodMuon_pt"])
+    assert columns == ["GoodMuon_pt_gathered"]
+    assert list(df.Take["ROOT::RVecF"]("GoodMuon_pt_gathered").GetValue()[0]) == [
+        20.0,
+        30.0,
+    ]
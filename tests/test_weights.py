@@ -0,0 +1,41 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+
+from tools import weights  # noqa: E402
+
+
+def test_variations():
+    df = (
+        ROOT.RDataFrame(10)
+        .Define("x", "0.5f")
+        .Define("a", "2.f")
+        .Define("aDown", "1.f")
+        .Define("aUp", "3.f")
+        .Define("b", "0.5f")
+    )
+    factors = [weights.Factor("a", "aDown", "aUp"), weights.Factor("b")]
+    df = weights.def_weight(df, "weight", factors)
+    histo = df.Histo1D(("x", "", 1, 0.0, 1.0), "x", "weight")
+    varied = ROOT.RDF.Experimental.VariationsFor(histo)
+
+    assert str(df.GetColumnType("weight")) == "double"
+    assert varied["nominal"].Integral() == pytest.approx(10.0)
+    assert varied["a:down"].Integral() == pytest.approx(5.0)
+    assert varied["a:up"].Integral() == pytest.approx(15.0)
+
+
+def test_missing_variants():
+    df = ROOT.RDataFrame(4).Define("x", "0.5f").Define("a", "2.f")
+    df = weights.def_weight(df, "weight", [weights.Factor("a", "aDown", "aUp")])
+    histo = df.Histo1D(("x", "", 1, 0.0, 1.0), "x", "weight")
+    varied = ROOT.RDF.Experimental.VariationsFor(histo)
+
+    assert list(varied.GetKeys()) == ["nominal"]
+    assert varied["nominal"].Integral() == pytest.approx(8.0)
+
+
+def test_data():
+    df = ROOT.RDataFrame(3)
+    df = weights.def_weight(df, "weight", weights.FACTORS, is_data=True)
+    assert df.Sum("weight").GetValue() == 3
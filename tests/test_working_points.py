@@ -0,0 +1,43 @@
+import pytest
+
+ROOT = pytest.importorskip("ROOT")
+
+from tools import leptons  # noqa: E402
+
+WORKING_POINTS = {
+    "PtMuon": ["Muon_pt > 15"],
+    "CentralMuon": ["Muon_pt > 15", "abs(Muon_eta) < 0.5"],
+    "SameMuon": ["Muon_pt > 15"],
+}
+
+
+def muons():
+    leptons.init()
+    return (
+        ROOT.RDataFrame(4)
+        .Define("Muon_pt", "ROOT::RVecF{10.f, 20.f, 30.f, float(rdfentry_)}")
+        .Define("Muon_eta", "ROOT::RVecF{0.f, 1.f, -0.2f, 0.1f}")
+    )
+
+
+def counts(df):
+    sums = {name: df.Sum(f"n{name}") for name in WORKING_POINTS}
+    return {name: s.GetValue() for name, s in sums.items()}
+
+
+@pytest.mark.parametrize("functor", [True, False])
+def test_working_points(functor):
+    df = leptons.def_working_points(
+        muons(), "Muon", WORKING_POINTS, ["pt", "eta"], functor=functor
+    )
+    assert counts(df) == {"PtMuon": 8, "CentralMuon": 4, "SameMuon": 8}
+    assert ("Muon_wp" in map(str, df.GetColumnNames())) == functor
+
+
+def test_fallback(monkeypatch):
+    def broken(df, working_points):
+        raise RuntimeError("Failed to compile")
+
+    monkeypatch.setattr(leptons, "make_working_points", broken)
+    df = leptons.def_working_points(muons(), "Muon", WORKING_POINTS, ["pt"])
+    assert counts(df) == {"PtMuon": 8, "CentralMuon": 4, "SameMuon": 8}
@@ -0,0 +1,538 @@
+"""Multi-process execution of an analysis over entry ranges.
+
+The samples are split into tasks of about TASK_ENTRIES events, across file
+boundaries, from the entries in the dataset manifest (see tools.samples) or
+from the TTree headers. Every task runs the analysis single threaded in a
+worker process, on a chain of the files it covers restricted with Range, and
+returns its partial histograms (see tools.cache.Partial) by histogram name.
+The caller merges the partials of each sample.
+
+run_local runs the tasks in a process pool on this machine. A Queue spreads
+them over several machines (e.g. SLURM tasks) through a shared filesystem:
+
+    queue/spec.json           the analysis, module and options
+    queue/tasks.json          all tasks, a resumed queue must have the same
+    queue/tasks/<id>.json     tasks to run
+    queue/running/<id>.*.json claimed by renaming, atomic on one filesystem
+    queue/results/<id>.pkl    pickled partials
+    queue/failed/<id>.json    error of a failed task
+    queue/crashed/<id>        number of worker processes died on the task
+
+Tasks are idempotent. The process running the pool of a job refreshes the
+claims of its workers every HEARTBEAT seconds, a claim not refreshed within
+the stale timeout (e.g. of a killed job) is put back and run again. The
+claims of workers that died are put back at once, a task on which CRASHES
+workers died fails.
+
+Example:
+    from tools import backend
+
+    tasks = backend.make_tasks(the_samples)
+    results = backend.run_local(spec, tasks, workers=10)
+"""
+
+import concurrent.futures
+import dataclasses
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import pickle
+import socket
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+
+import ROOT
+
+from mrtools import datasets
+from tools import cache
+from tools import fileinfo
+from tools import histos
+from tools import samples
+
+log = logging.getLogger("mrtools.tools")
+
+TASK_ENTRIES = 1_000_000
+STALE_AFTER = 600.0
+HEARTBEAT = 60.0
+POLL = 30.0
+CRASHES = 3
+
+# Partials by histogram name
+Result = dict[str, cache.Partial]
+
+
+@dataclass
+class AnalysisSpec:
+    """Analysis module, its options and histograms."""
+
+    module: str
+    args: list[str]
+    histos_def: str | None = None
+    systematics: bool = False
+
+
+@dataclass
+class Task:
+    """Entries [begin, end) of the chain of files of a sample."""
+
+    id: int
+    sample: dict[str, Any]
+    files: list[str]
+    begin: int
+    end: int
+
+    @property
+    def sample_key(self) -> str:
+        return f"{self.sample['period']}/{self.sample['name']}"
+
+    @property
+    def entries(self) -> int:
+        return self.end - self.begin
+
+
+def _sample_state(sample: samples.Sample, manifest: dict[str, Any]) -> dict[str, Any]:
+    state = {f.name: getattr(sample, f.name) for f in dataclasses.fields(sample)}
+    state["directory"] = str(sample.directory)
+    state["groups"] = list(sample.groups)
+    state["manifest"] = manifest
+    return state
+
+
+def _restore_sample(state: dict[str, Any]) -> samples.Sample:
+    state = dict(state)
+    state["directory"] = pathlib.Path(state["directory"])
+    state["groups"] = tuple(state["groups"])
+    return samples.Sample(**state)
+
+
+def make_tasks(
+    the_samples: list[samples.Sample],
+    task_entries: int = TASK_ENTRIES,
+    workers: int | None = None,
+) -> list[Task]:
+    """Split the samples into tasks of about task_entries events."""
+    manifests: dict[str, dict[str, Any]] = {}
+    unknown = []
+    for s in the_samples:
+        for file in s.files():
+            entry = s.manifest_entry(file)
+            if entry is None:
+                unknown.append(file)
+            else:
+                manifests[file] = entry
+    if unknown:
+        log.info("Reading the entries of %d files", len(unknown))
+        for file, info in fileinfo.scan(unknown, workers=workers).items():
+            if isinstance(info, Exception):
+                raise info
+            manifests[file] = {
+                "name": os.path.basename(file),
+                "entries": info.entries,
+                "size": info.size,
+                "mtime_ns": info.mtime_ns,
+            }
+
+    tasks = []
+    for s in the_samples:
+        files = [f for f in s.files() if manifests[f]["entries"] > 0]
+        offsets = [0]
+        for file in files:
+            offsets.append(offsets[-1] + manifests[file]["entries"])
+        total = offsets[-1]
+        nr_tasks = max(round(total / task_entries), 1)
+        bounds = [total * i // nr_tasks for i in range(nr_tasks + 1)]
+        for begin, end in zip(bounds[:-1], bounds[1:]):
+            if begin == end:
+                continue
+            first = next(i for i in range(len(files)) if offsets[i + 1] > begin)
+            last = next(i for i in range(len(files)) if offsets[i + 1] >= end)
+            task_files = files[first : last + 1]
+            manifest = {
+                os.path.basename(f): manifests[f] for f in task_files if f in manifests
+            }
+            tasks.append(
+                Task(
+                    len(tasks),
+                    _sample_state(s, manifest),
+                    task_files,
+                    begin - offsets[first],
+                    end - offsets[first],
+                )
+            )
+
+    log.info(
+        "%d tasks of %d samples, %d events",
+        len(tasks),
+        len(the_samples),
+        sum(t.entries for t in tasks),
+    )
+    return tasks
+
+
+# Analysis and histogram definitions of a worker process, by spec
+_loaded: dict[str, tuple[Callable, list[dict[str, Any]]]] = {}
+
+
+def _load(spec: AnalysisSpec) -> tuple[Callable, list[dict[str, Any]]]:
+    key = json.dumps(dataclasses.asdict(spec), sort_keys=True)
+    if key not in _loaded:
+        ROOT.gROOT.SetBatch()
+        analysis_module = importlib.import_module(spec.module)
+        analysis = analysis_module.get_analysis.main(
+            list(spec.args), standalone_mode=False
+        )
+        definitions = histos.read_definitions(
+            pathlib.Path(spec.histos_def or analysis_module.HISTOS_DEF)
+        )
+        _loaded[key] = (analysis, definitions)
+    return _loaded[key]
+
+
+def run_task(spec: AnalysisSpec, task: Task) -> Result:
+    """Partial histograms of one task, single threaded."""
+    analysis, definitions = _load(spec)
+    # The dataframes of the previous task are gone
+    samples.release()
+    sample = _restore_sample(task.sample)
+    # Range needs the implicit multi-threading off, as in the workers
+    df = samples.dataframe(sample, task.files).Range(task.begin, task.end)
+    dataset_type = datasets.DatasetType[sample.type.upper()]
+    dfs = analysis(df, sample.name, dataset_type, sample.period)
+    booked: dict[str, histos.Booked] = {}
+    for definition in definitions:
+        df = dfs[definition["dataframe"]]
+        booked |= histos.book_histos(df, definition, spec.systematics)
+    ROOT.RDF.RunGraphs([b.nominal for b in booked.values()])
+
+    result = {}
+    for name, b in booked.items():
+        partial = {}
+        for variation, histo in b.items():
+            partial[variation] = histo.Clone()
+            partial[variation].SetDirectory(ROOT.nullptr)
+        result[name] = partial
+    return result
+
+
+def _progress(done: int, total: int, entries: int, start: float) -> None:
+    seconds = time.monotonic() - start
+    log.info("%d/%d tasks, %.0f events/s", done, total, entries / max(seconds, 1e-9))
+
+
+def run_local(
+    spec: AnalysisSpec, tasks: list[Task], workers: int | None = None
+) -> dict[int, Result]:
+    """Run the tasks in a process pool.
+
+    Raises:
+        RuntimeError: some tasks failed.
+    """
+    results = {}
+    failed = []
+    entries = 0
+    start = time.monotonic()
+    # ROOT may already run threads, do not fork
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(workers, context) as executor:
+        futures = {executor.submit(run_task, spec, t): t for t in tasks}
+        for future in concurrent.futures.as_completed(futures):
+            task = futures[future]
+            try:
+                results[task.id] = future.result()
+            except Exception as e:
+                log.error("Task %d of %s failed: %s", task.id, task.sample_key, e)
+                failed.append(task.id)
+                continue
+            entries += task.entries
+            _progress(len(results), len(tasks), entries, start)
+    if failed:
+        raise RuntimeError(f"{len(failed)} tasks failed")
+    return results
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _tasks_json(tasks: list[Task]) -> str:
+    return json.dumps([dataclasses.asdict(t) for t in tasks], sort_keys=True)
+
+
+class Queue:
+    """Tasks and results in a directory on a shared filesystem."""
+
+    directory: pathlib.Path
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self.directory = directory
+        for sub in ("tasks", "running", "results", "failed", "crashed"):
+            (directory / sub).mkdir(parents=True, exist_ok=True)
+
+    @property
+    def spec_path(self) -> pathlib.Path:
+        return self.directory / "spec.json"
+
+    @property
+    def tasks_path(self) -> pathlib.Path:
+        return self.directory / "tasks.json"
+
+    def _write(self, path: pathlib.Path, data: bytes) -> None:
+        tmp = path.with_name(f".{path.name}.{socket.gethostname()}.{os.getpid()}")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    def create(self, spec: AnalysisSpec, tasks: list[Task]) -> None:
+        """Add the tasks, or check that the queue has the same analysis and tasks.
+
+        Raises:
+            ValueError: the queue has another analysis or other tasks, e.g.
+                the files of a sample changed.
+        """
+        spec_json = json.dumps(dataclasses.asdict(spec), sort_keys=True)
+        tasks_json = _tasks_json(tasks)
+        if self.spec_path.exists():
+            if self.spec_path.read_text() != spec_json:
+                raise ValueError(f"{self.directory} is a queue of another analysis")
+            if self.tasks_path.read_text() != tasks_json:
+                raise ValueError(f"{self.directory} is a queue of other tasks")
+            log.info("Resuming queue %s", self.directory)
+            for task in tasks:
+                failed = self.directory / "failed" / f"{task.id}.json"
+                if failed.exists():
+                    data = json.dumps(dataclasses.asdict(task)).encode()
+                    self._write(self.directory / "tasks" / f"{task.id}.json", data)
+                    failed.unlink()
+            return
+        for task in tasks:
+            data = json.dumps(dataclasses.asdict(task)).encode()
+            self._write(self.directory / "tasks" / f"{task.id}.json", data)
+        self._write(self.tasks_path, tasks_json.encode())
+        # Last, workers only start once all tasks are there
+        self._write(self.spec_path, spec_json.encode())
+        log.info("Queue %s with %d tasks", self.directory, len(tasks))
+
+    def spec(self) -> AnalysisSpec:
+        return AnalysisSpec(**json.loads(self.spec_path.read_text()))
+
+    def tasks(self) -> list[Task]:
+        """All tasks of the queue."""
+        return [Task(**t) for t in json.loads(self.tasks_path.read_text())]
+
+    def pending(self) -> int:
+        return sum(1 for _ in (self.directory / "tasks").glob("*.json"))
+
+    def claim(self) -> tuple[Task, pathlib.Path] | None:
+        """Take a task to run, None if there are none left."""
+        claim_id = f"{socket.gethostname()}.{os.getpid()}"
+        for path in sorted((self.directory / "tasks").glob("*.json")):
+            claimed = self.directory / "running" / f"{path.stem}.{claim_id}.json"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                # Taken by another worker
+                continue
+            claimed.touch()
+            return Task(**json.loads(claimed.read_text())), claimed
+        return None
+
+    def finish(self, task: Task, claimed: pathlib.Path, result: Result) -> None:
+        self._write(self.directory / "results" / f"{task.id}.pkl", pickle.dumps(result))
+        claimed.unlink(missing_ok=True)
+
+    def fail(self, task: Task, claimed: pathlib.Path, error: str) -> None:
+        data = json.dumps({"task": task.id, "error": error}).encode()
+        self._write(self.directory / "failed" / f"{task.id}.json", data)
+        claimed.unlink(missing_ok=True)
+
+    def _claims(self) -> list[tuple[pathlib.Path, int]]:
+        # Claims of processes on this host, with their pid
+        result = []
+        host = socket.gethostname()
+        for path in (self.directory / "running").glob(f"*.{host}.*.json"):
+            pid = path.name.rsplit(".", 2)[-2]
+            if pid.isdigit():
+                result.append((path, int(pid)))
+        return result
+
+    def heartbeat(self) -> None:
+        """Refresh the claims of the live processes on this host."""
+        for path, pid in self._claims():
+            if _alive(pid):
+                try:
+                    path.touch()
+                except FileNotFoundError:
+                    continue
+
+    def release_dead(self) -> int:
+        """Put back the tasks claimed by dead processes on this host.
+
+        A task on which CRASHES processes died fails instead.
+        """
+        released = 0
+        for path, pid in self._claims():
+            if _alive(pid):
+                continue
+            task_id = path.name.split(".", 1)[0]
+            crashed = self.directory / "crashed" / task_id
+            crashes = int(crashed.read_text()) + 1 if crashed.exists() else 1
+            try:
+                if crashes >= CRASHES:
+                    task = Task(**json.loads(path.read_text()))
+                    error = f"{crashes} worker processes died running the task"
+                    log.error("Task %s: %s", task_id, error)
+                    self.fail(task, path, error)
+                    continue
+                os.rename(path, self.directory / "tasks" / f"{task_id}.json")
+            except FileNotFoundError:
+                continue
+            self._write(crashed, str(crashes).encode())
+            log.warning("The worker of task %s died, requeued", task_id)
+            released += 1
+        return released
+
+    def requeue_stale(self, stale_after: float = STALE_AFTER) -> int:
+        """Put back the tasks claimed longer than stale_after seconds ago."""
+        requeued = 0
+        for path in (self.directory / "running").glob("*.json"):
+            try:
+                if time.time() - path.stat().st_mtime < stale_after:
+                    continue
+                task_id = path.name.split(".", 1)[0]
+                os.rename(path, self.directory / "tasks" / f"{task_id}.json")
+            except FileNotFoundError:
+                continue
+            log.warning("Task %s was claimed too long ago, requeued", task_id)
+            requeued += 1
+        return requeued
+
+    def result_ids(self) -> set[int]:
+        return {int(p.stem) for p in (self.directory / "results").glob("*.pkl")}
+
+    def failures(self) -> dict[int, str]:
+        result = {}
+        for path in (self.directory / "failed").glob("*.json"):
+            data = json.loads(path.read_text())
+            result[data["task"]] = data["error"]
+        return result
+
+    def results(self) -> dict[int, Result]:
+        result = {}
+        for path in (self.directory / "results").glob("*.pkl"):
+            with open(path, "rb") as inp:
+                result[int(path.stem)] = pickle.load(inp)
+        return result
+
+
+def work(directory: pathlib.Path) -> int:
+    """Run tasks of a queue until none are left, returns the number run."""
+    queue = Queue(directory)
+    spec = queue.spec()
+    done = 0
+    while claim := queue.claim():
+        task, claimed = claim
+        log.debug("Task %d of %s", task.id, task.sample_key)
+        try:
+            result = run_task(spec, task)
+        except Exception:
+            log.error("Task %d of %s failed", task.id, task.sample_key)
+            queue.fail(task, claimed, traceback.format_exc())
+            continue
+        queue.finish(task, claimed, result)
+        done += 1
+    return done
+
+
+def work_local(directory: pathlib.Path, workers: int | None = None) -> int:
+    """Run tasks of a queue in a process pool until none are left.
+
+    The claims of the workers are refreshed while they run. If a worker
+    process dies, its claim is put back and a new pool is started.
+    """
+    workers = workers or os.cpu_count() or 1
+    queue = Queue(directory)
+    while not queue.spec_path.exists():
+        log.info("Waiting for the tasks of %s", directory)
+        time.sleep(POLL)
+    context = multiprocessing.get_context("spawn")
+    done = 0
+    while queue.pending():
+        with concurrent.futures.ProcessPoolExecutor(workers, context) as executor:
+            futures = [executor.submit(work, directory) for _ in range(workers)]
+            # The workers hold the GIL in the event loop, refresh from here
+            while concurrent.futures.wait(futures, HEARTBEAT).not_done:
+                queue.heartbeat()
+        for future in futures:
+            try:
+                done += future.result()
+            except concurrent.futures.process.BrokenProcessPool:
+                continue
+        queue.release_dead()
+    log.info("%d tasks run on %s", done, socket.gethostname())
+    return done
+
+
+def run_queue(
+    directory: pathlib.Path,
+    spec: AnalysisSpec,
+    tasks: list[Task],
+    workers: int | None = None,
+    stale_after: float = STALE_AFTER,
+    poll: float = POLL,
+) -> tuple[list[Task], dict[int, Result]]:
+    """Create or resume a queue, work on it and wait for all results.
+
+    Failed tasks of a resumed queue are run again.
+
+    Returns:
+        The tasks stored in the queue and their results.
+
+    Raises:
+        ValueError: the queue has another analysis or other tasks.
+        RuntimeError: some tasks failed.
+    """
+    queue = Queue(directory)
+    queue.create(spec, tasks)
+    tasks = queue.tasks()
+    ids = {t.id for t in tasks}
+    start = time.monotonic()
+    while True:
+        if queue.pending():
+            work_local(directory, workers)
+        missing = ids - queue.result_ids()
+        if not missing:
+            break
+        failures = queue.failures()
+        failed = missing & failures.keys()
+        if failed:
+            for task_id in sorted(failed):
+                log.error("Task %d failed:\n%s", task_id, failures[task_id])
+            raise RuntimeError(f"{len(failed)} tasks failed, see {directory}/failed")
+        entries = sum(t.entries for t in tasks if t.id not in missing)
+        _progress(len(ids) - len(missing), len(ids), entries, start)
+        if not queue.requeue_stale(stale_after):
+            time.sleep(poll)
+    return tasks, queue.results()
+
+
+def merge(
+    tasks: list[Task], results: dict[int, Result]
+) -> dict[str, dict[str, list[cache.Partial]]]:
+    """Partials by sample key and histogram name."""
+    partials: dict[str, dict[str, list[cache.Partial]]] = {}
+    for task in tasks:
+        sample_partials = partials.setdefault(task.sample_key, {})
+        for name, partial in results[task.id].items():
+            sample_partials.setdefault(name, []).append(partial)
+    return partials
@@ -0,0 +1,155 @@
+"""Content-addressed cache of per-file histograms.
+
+A partial histogram, with all its variations, is stored for every input file
+and histogram, keyed by a hash of
+
+- the analysis: the source of the analysis module and of tools/, the
+  analysis options (selection, weights, object definitions), and the
+  contents of its input files (e.g. scale factor tables and corrections),
+- the histogram definition (its YAML entry, dataframe and weight),
+- the identity of the file and of its friend tree file (path, size and
+  modification time).
+
+A rerun only processes the files for which some histogram is missing, and
+merges the new partials with the cached ones. The cache is bounded in size,
+the least recently used entries are evicted first.
+
+The cache directory is results/ in tools.compiled.CACHE_DIR.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import pickle
+from typing import Any
+
+import ROOT
+
+from tools import compiled
+from tools import samples
+
+log = logging.getLogger("mrtools.tools")
+
+TOOLS_PATH = pathlib.Path(__file__).parent
+
+MAX_BYTES = int(os.environ.get("STOPS_RESULT_CACHE_BYTES", 4 * 1024**3))
+
+# Histograms of one file by variation
+Partial = dict[str, ROOT.TH1]
+
+
+def analysis_key(
+    module_path: pathlib.Path,
+    options: list[str],
+    inputs: list[pathlib.Path] | None = None,
+) -> str:
+    """Hash of the analysis module, tools/, the options and the input files."""
+    digest = hashlib.sha256()
+    sources = [module_path] + sorted(
+        p for p in TOOLS_PATH.iterdir() if p.suffix in (".py", ".hxx", ".cxx")
+    )
+    for source in sources:
+        digest.update(source.name.encode())
+        digest.update(source.read_bytes())
+    digest.update(json.dumps(options).encode())
+    for path in inputs or []:
+        digest.update(str(path).encode())
+        digest.update(path.read_bytes() if path.exists() else b"missing")
+    return digest.hexdigest()
+
+
+def file_id(path: str) -> str:
+    """Identity of an input file, with its friend tree file if any."""
+    stat = os.stat(path)
+    result = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    friend = samples.friend_path(path)
+    if friend.exists():
+        result += f" {file_id(str(friend))}"
+    return result
+
+
+class ResultCache:
+    """Per-file partial histograms on disk, with LRU eviction."""
+
+    directory: pathlib.Path
+    max_bytes: int
+    hits: int
+    misses: int
+
+    def __init__(
+        self, directory: pathlib.Path | None = None, max_bytes: int = MAX_BYTES
+    ) -> None:
+        self.directory = directory or compiled.CACHE_DIR / "results"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, analysis: str, definition: dict[str, Any], path: str) -> str:
+        digest = hashlib.sha256(analysis.encode())
+        digest.update(json.dumps(definition, sort_keys=True).encode())
+        digest.update(file_id(path).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> Partial | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as inp:
+                partial = pickle.load(inp)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        # The modification time orders the entries for the eviction
+        path.touch()
+        self.hits += 1
+        return partial
+
+    def put(self, key: str, partial: Partial) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as out:
+            pickle.dump(partial, out)
+        tmp.replace(path)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries above max_bytes."""
+        entries = []
+        for path in self.directory.glob("*/*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            log.info("Evicted %d cached results", removed)
+
+    def report(self) -> None:
+        log.info("Result cache: %d hits, %d misses", self.hits, self.misses)
+
+
+def merge(partials: list[Partial]) -> Partial:
+    """Sum of partial histograms, variation by variation."""
+    result: Partial = {}
+    for partial in partials:
+        for key, histo in partial.items():
+            if key in result:
+                result[key].Add(histo)
+            else:
+                result[key] = histo.Clone()
+                result[key].SetDirectory(ROOT.nullptr)
+    return result
@@ -0,0 +1,140 @@
+"""Columns used by an analysis.
+
+Tracer is a proxy of an RDataFrame node that forwards every call and records
+the expressions and column lists it is given. From the defined columns, the
+filters and the booked results it works out the set of input columns the
+analysis actually reads.
+
+Example:
+    from tools import columns
+
+    tracer = columns.Tracer(ROOT.RDataFrame("Events", files))
+    dfs = analysis(tracer, dataset_name, dataset_type, period)
+    histos.book_dataset(dfs, definitions, dataset_name)
+    used = tracer.required()
+
+analysis_columns does this for a sample.
+"""
+
+import re
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+
+from mrtools import datasets
+from tools import histos
+from tools import samples
+
+RDataFrame = Any
+
+IDENTIFIER = re.compile(r"(?<![\w:.])[A-Za-z_]\w*")
+
+# Methods whose first argument is the name of a column they define
+DEFINES = {"Define", "Redefine", "DefineSlot", "DefineSlotEntry", "Vary"}
+
+
+def identifiers(value: Any) -> set[str]:
+    """Identifiers in a string, or in a list of strings."""
+    if isinstance(value, str):
+        return set(IDENTIFIER.findall(value))
+    if isinstance(value, (list, tuple)):
+        result: set[str] = set()
+        for v in value:
+            result |= identifiers(v)
+        return result
+    try:
+        # std::vector<std::string> and similar
+        return identifiers([str(v) for v in value])
+    except TypeError:
+        return set()
+
+
+@dataclass
+class _Trace:
+    inputs: set[str]
+    defines: dict[str, set[str]] = field(default_factory=dict)
+    roots: set[str] = field(default_factory=set)
+
+
+class Tracer:
+    """Proxy of a RDataFrame node recording the columns used."""
+
+    node: RDataFrame
+    _trace: _Trace
+
+    def __init__(self, node: RDataFrame, trace: _Trace | None = None) -> None:
+        self.node = node
+        if trace is None:
+            inputs = set(str(c) for c in node.GetColumnNames())
+            # Columns of friend trees are listed as Friends.name
+            inputs |= {c.partition(".")[2] for c in inputs if "." in c}
+            trace = _Trace(inputs)
+        self._trace = trace
+
+    def wrap(self, node: RDataFrame) -> "Tracer":
+        """Tracer of a node derived from this one."""
+        return Tracer(node, self._trace)
+
+    def define(self, name: str, columns: Any) -> None:
+        """Record that name is defined from columns."""
+        self._trace.defines.setdefault(name, set()).update(identifiers(columns))
+
+    def use(self, columns: Any) -> None:
+        """Record that columns are read."""
+        self._trace.roots.update(identifiers(columns))
+
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self.node, attr)
+        if not callable(value):
+            return value
+        return self._traced(attr, value)
+
+    def _traced(self, attr: str, method: Callable) -> Callable:
+        def traced(*args: Any, **kwargs: Any) -> Any:
+            if attr in DEFINES and args:
+                self.define(str(args[0]), list(args[1:]))
+            else:
+                self.use(list(a for a in args if isinstance(a, str)))
+                self.use([a for a in args if isinstance(a, (list, tuple))])
+            result = method(*args, **kwargs)
+            if hasattr(result, "Define") and hasattr(result, "Filter"):
+                return self.wrap(result)
+            return result
+
+        return traced
+
+    def required(self, extra: list[str] | None = None) -> list[str]:
+        """Input columns needed by the recorded filters and results.
+
+        Args:
+            extra: further columns to be read, e.g. those of histograms that
+                were not booked on the tracer.
+        """
+        trace = self._trace
+        todo = set(trace.roots) | identifiers(extra or [])
+        seen: set[str] = set()
+        while todo:
+            name = todo.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            todo |= trace.defines.get(name, set())
+        return sorted(c for c in seen if c in trace.inputs)
+
+
+def analysis_columns(
+    analysis: Callable,
+    sample: samples.Sample,
+    definitions: list[dict[str, Any]],
+    files: list[str] | None = None,
+) -> list[str]:
+    """Input columns read by the analysis and its histograms for a sample."""
+    files = files or sample.files()
+    # A separate graph, never run
+    tracer = Tracer(samples.dataframe(sample, files[:1]))
+    dataset_type = datasets.DatasetType[sample.type.upper()]
+    dfs = analysis(tracer, sample.name, dataset_type, sample.period)
+    for definition in definitions:
+        histos.book_histos(dfs[definition["dataframe"]], definition, False)
+    return tracer.required()
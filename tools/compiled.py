@@ -0,0 +1,97 @@
+"""Compiled C++ libraries for RDataFrame.
+
+C++ sources are compiled once with ACLiC into a shared library, which is
+cached on disk keyed by a hash of the sources, the compiler flags and the
+ROOT version. Later processes only load the library.
+
+The cache directory is $STOPS_CACHE_DIR or ~/.cache/StopsCompressed.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import pathlib
+import time
+from typing import Iterator
+
+import ROOT
+
+log = logging.getLogger("mrtools.tools")
+
+CACHE_DIR = pathlib.Path(
+    os.environ.get(
+        "STOPS_CACHE_DIR", pathlib.Path.home() / ".cache" / "StopsCompressed"
+    )
+)
+
+FLAGS_OPT = "-O3"
+
+_loaded: dict[pathlib.Path, pathlib.Path] = {}
+
+
+@contextlib.contextmanager
+def lock(path: pathlib.Path) -> Iterator[None]:
+    """Exclusive lock on path, between processes."""
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def library_key(sources: list[pathlib.Path]) -> str:
+    """Hash of the sources, the compiler flags and the ROOT version."""
+    digest = hashlib.sha256()
+    digest.update(ROOT.gROOT.GetVersion().encode())
+    digest.update(FLAGS_OPT.encode())
+    for source in sources:
+        digest.update(source.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def load_library(
+    source: pathlib.Path, depends: list[pathlib.Path] | None = None
+) -> pathlib.Path:
+    """Load the library compiled from source, building it if needed.
+
+    Args:
+        source: C++ source file.
+        depends: headers included by source, part of the cache key.
+
+    Returns:
+        Path of the shared library.
+
+    Raises:
+        RuntimeError: if the library could not be built or loaded.
+    """
+    source = source.resolve()
+    if source in _loaded:
+        return _loaded[source]
+
+    key = library_key([source] + (depends or []))
+    build_dir = CACHE_DIR / f"{source.stem}_{key}"
+    build_dir.mkdir(parents=True, exist_ok=True)
+    library = build_dir / f"{source.stem}.so"
+
+    with lock(build_dir / ".lock"):
+        if not library.exists():
+            log.info("Compiling %s ...", source.name)
+            start = time.perf_counter()
+            ROOT.gSystem.SetFlagsOpt(FLAGS_OPT)
+            ROOT.gSystem.AddIncludePath(f"-I{source.parent}")
+            if not ROOT.gSystem.CompileMacro(
+                str(source), "kO", str(library), str(build_dir)
+            ):
+                raise RuntimeError(f"Failed to compile {source}")
+            log.info("Compiled %s in %.1f s", library, time.perf_counter() - start)
+        else:
+            start = time.perf_counter()
+            if ROOT.gSystem.Load(str(library)) < 0:
+                raise RuntimeError(f"Failed to load {library}")
+            log.debug("Loaded %s in %.3f s", library, time.perf_counter() - start)
+
+    _loaded[source] = library
+    return library
@@ -0,0 +1,216 @@
+"""Cut flows for RDataFrame.
+
+Each cut of a selection is booked as a named Filter, followed by a Count and
+a Sum of the event weight, so the unweighted and weighted cut flow are filled
+in the same event loop as the histograms.
+
+Optionally the cuts are reordered first, using the pass fraction and the
+cost of each cut measured on a sample of the entries. Cuts are sorted by
+cost / (1 - pass fraction), which minimises the expected cost per entry for
+independent cuts: cheap cuts that reject a lot run first. With implicit MT
+the sample should be a separate dataframe of only the first files (see
+tools.samples.first_entries), else every measurement loop reads the whole
+dataset.
+
+Example:
+    from tools import cutflow
+
+    order = cutflow.measure_cuts(df, SELECTION)
+    df = cutflow.def_cut_flow(df, dataset_name, order, "the_weight")
+
+    # or both in one call, measured on the first entries
+    first = define_columns(samples.first_entries(sample, cutflow.SAMPLE_ENTRIES))
+    df = cutflow.def_selection(
+        df, dataset_name, SELECTION, "the_weight", True, first_entries=first
+    )
+
+    atexit.register(cutflow.report)
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+
+import ROOT
+
+log = logging.getLogger("mrtools.tools")
+
+RDataFrame = Any
+RResultPtr = Any
+
+SAMPLE_ENTRIES = 10000
+
+
+@dataclass
+class CutStats:
+    """Pass fraction and cost in seconds per entry of a cut."""
+
+    cut: str
+    passed: float
+    cost: float
+
+    @property
+    def rank(self) -> float:
+        return self.cost / max(1.0 - self.passed, 1e-6)
+
+
+@dataclass
+class CutFlow:
+    """Booked cut flow of one dataset."""
+
+    name: str
+    cuts: list[str] = field(default_factory=list)
+    counts: list[RResultPtr] = field(default_factory=list)
+    sums: list[RResultPtr] = field(default_factory=list)
+
+    def ready(self) -> bool:
+        return all(r.IsReady() for r in self.counts + self.sums)
+
+    def table(self) -> str:
+        """Unweighted and weighted cut flow, with relative efficiencies."""
+        lines = [
+            f"Cut flow {self.name}",
+            f"{'cut':<30} {'entries':>12} {'eff':>7} {'weighted':>14} {'eff':>7}",
+        ]
+        last_count = last_sum = None
+        for cut, count, sum_ in zip(self.cuts, self.counts, self.sums):
+            count, sum_ = count.GetValue(), sum_.GetValue()
+            eff = count / last_count if last_count else 1.0
+            weff = sum_ / last_sum if last_sum else 1.0
+            lines.append(
+                f"{cut:<30} {count:>12} {eff:>7.3f} {sum_:>14.2f} {weff:>7.3f}"
+            )
+            last_count, last_sum = count, sum_
+        return "\n".join(lines)
+
+
+_cut_flows: list[CutFlow] = []
+
+
+def _sample(df: RDataFrame, entries: int | None) -> RDataFrame:
+    if entries is None:
+        return df
+    if ROOT.IsImplicitMTEnabled():
+        # Range is not supported in multi-threaded runs
+        log.warning("Measuring the cuts on the first entries reads all entries")
+        return df.Filter(f"rdfentry_ < {entries}")
+    return df.Range(entries)
+
+
+def measure_cuts(
+    df: RDataFrame, selection: list[str], entries: int | None = SAMPLE_ENTRIES
+) -> list[CutStats]:
+    """Measure the cuts on a sample of entries and sort them.
+
+    A first event loop evaluates every cut independently, giving the pass
+    fractions and JIT-ing the expressions. Then every cut is timed in its own
+    loop, against a loop without cuts.
+
+    Args:
+        df: input dataframe.
+        selection: cuts.
+        entries: number of first entries to measure on, None for all entries
+            of an already bounded dataframe.
+
+    Returns:
+        Statistics of the cuts, in the order they should be applied.
+    """
+    sample = _sample(df, entries)
+    filters = [sample.Filter(cut) for cut in selection]
+    total = sample.Count()
+    counts = [f.Count() for f in filters]
+    nr_entries = total.GetValue()
+    if nr_entries == 0:
+        log.warning("No entries to measure the cuts, keeping their order")
+        return [CutStats(cut, 1.0, 0.0) for cut in selection]
+
+    def timed(node: RDataFrame) -> float:
+        start = time.perf_counter()
+        node.Count().GetValue()
+        return time.perf_counter() - start
+
+    baseline = timed(sample)
+    stats = []
+    for cut, f, count in zip(selection, filters, counts):
+        cost = max(timed(f) - baseline, 0.0) / nr_entries
+        stats.append(CutStats(cut, count.GetValue() / nr_entries, cost))
+
+    stats.sort(key=lambda s: s.rank)
+    for s in stats:
+        log.debug("Cut %-30s pass %6.3f cost %8.1f ns", s.cut, s.passed, s.cost * 1e9)
+    return stats
+
+
+def def_cut_flow(
+    df: RDataFrame,
+    name: str,
+    selection: list[str] | list[CutStats],
+    weight: str | None = None,
+) -> RDataFrame:
+    """Apply the selection as named filters and book its cut flow.
+
+    Args:
+        df: input dataframe.
+        name: name of the cut flow, usually the dataset.
+        selection: cuts, or the result of measure_cuts.
+        weight: column with the event weight, if any.
+
+    Returns:
+        Dataframe after all cuts.
+    """
+    cut_flow = CutFlow(name)
+    cuts = [s.cut if isinstance(s, CutStats) else s for s in selection]
+    stages = [("all", df)]
+    for cut in cuts:
+        log.debug('Filter("%s", "%s")', cut, cut)
+        df = df.Filter(cut, cut)
+        stages.append((cut, df))
+
+    for cut, node in stages:
+        cut_flow.cuts.append(cut)
+        cut_flow.counts.append(node.Count())
+        if weight is None:
+            cut_flow.sums.append(cut_flow.counts[-1])
+        else:
+            cut_flow.sums.append(node.Sum(weight))
+
+    _cut_flows.append(cut_flow)
+    return df
+
+
+def def_selection(
+    df: RDataFrame,
+    name: str,
+    selection: list[str],
+    weight: str | None = None,
+    reorder: bool = False,
+    book: bool = True,
+    first_entries: RDataFrame | None = None,
+) -> RDataFrame:
+    """Apply the selection, optionally reordered and with its cut flow.
+
+    The cuts are measured on first_entries, a bounded dataframe with the same
+    columns as df, if given, else on the first entries of df.
+    """
+    if reorder:
+        if first_entries is None:
+            stats = measure_cuts(df, selection)
+        else:
+            stats = measure_cuts(first_entries, selection, None)
+        selection = [s.cut for s in stats]
+        log.info("%s: cut order %s", name, " && ".join(selection))
+    if book:
+        return def_cut_flow(df, name, selection, weight)
+    log.debug('Filter("%s")', " && ".join(selection))
+    return df.Filter(" && ".join(selection))
+
+
+def report() -> None:
+    """Log the cut flows whose event loop has run."""
+    for cut_flow in _cut_flows:
+        if cut_flow.ready():
+            log.info("%s", cut_flow.table())
+        else:
+            log.debug("Cut flow %s was not filled", cut_flow.name)
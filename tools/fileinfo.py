@@ -0,0 +1,228 @@
+"""Entries, schema and weight sums of ntuple files.
+
+The number of entries and the schema (column names and types) are read from
+the TTree header, without an event loop.
+Weight sums need one pass over the weight branch, done for many files
+concurrently in a process pool. Results are cached in fileinfo.json in
+tools.compiled.CACHE_DIR, keyed by tree name and path and valid while the
+size and the modification time of the file are unchanged.
+
+Example:
+    from tools import fileinfo
+
+    infos = fileinfo.scan(paths, weights=True)
+    print(infos[paths[0]].entries, infos[paths[0]].sum_weights)
+"""
+
+import concurrent.futures
+import dataclasses
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+from dataclasses import dataclass
+from typing import Iterable
+
+import ROOT
+
+from tools import compiled
+
+log = logging.getLogger("mrtools.tools")
+
+TREE = "Events"
+WEIGHT = "weight"
+
+
+@dataclass
+class FileInfo:
+    """Entries, schema and weight sums of a tree, with the file size and mtime."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    entries: int | None = None
+    sum_weights: float | None = None
+    sum_weights2: float | None = None
+    schema: dict[str, str] | None = None
+    tree: str = TREE
+
+    def valid(self) -> bool:
+        """Whether the file is unchanged since the information was taken."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+
+def _stat(path: str, tree: str) -> FileInfo:
+    stat = os.stat(path)
+    return FileInfo(path, stat.st_size, stat.st_mtime_ns, tree=tree)
+
+
+def read_entries(path: str, tree: str = TREE) -> int:
+    """Number of entries from the TTree header."""
+    root_file = ROOT.TFile.Open(path)
+    if not root_file or root_file.IsZombie():
+        raise OSError(f"Cannot open {path}")
+    try:
+        the_tree = root_file.Get(tree)
+        if not the_tree:
+            raise OSError(f"No {tree} in {path}")
+        return the_tree.GetEntries()
+    finally:
+        root_file.Close()
+
+
+def read_schema(path: str, tree: str = TREE) -> dict[str, str]:
+    """Column types from the TTree header, named as RDataFrame does."""
+    root_file = ROOT.TFile.Open(path)
+    if not root_file or root_file.IsZombie():
+        raise OSError(f"Cannot open {path}")
+    try:
+        the_tree = root_file.Get(tree)
+        if not the_tree:
+            raise OSError(f"No {tree} in {path}")
+        schema = {}
+        for leaf in the_tree.GetListOfLeaves():
+            column_type = leaf.GetTypeName()
+            if leaf.GetLeafCount() or leaf.GetLenStatic() > 1:
+                column_type = f"ROOT::VecOps::RVec<{column_type}>"
+            schema[leaf.GetName()] = column_type
+        return schema
+    finally:
+        root_file.Close()
+
+
+def read_branch_sizes(path: str, tree: str = TREE) -> dict[str, int]:
+    """Compressed bytes of the top-level branches, from the TTree header."""
+    root_file = ROOT.TFile.Open(path)
+    if not root_file or root_file.IsZombie():
+        raise OSError(f"Cannot open {path}")
+    try:
+        the_tree = root_file.Get(tree)
+        if not the_tree:
+            raise OSError(f"No {tree} in {path}")
+        return {b.GetName(): b.GetZipBytes("*") for b in the_tree.GetListOfBranches()}
+    finally:
+        root_file.Close()
+
+
+def read_info(
+    path: str, weights: bool = False, schema: bool = False, tree: str = TREE
+) -> FileInfo:
+    """Information of one file, with one pass over the weights if requested."""
+    info = _stat(path, tree)
+    info.entries = read_entries(path, tree)
+    if schema:
+        info.schema = read_schema(path, tree)
+    if weights:
+        df = ROOT.RDataFrame(tree, path)
+        df = df.Define("weight2_", f"{WEIGHT}*{WEIGHT}")
+        sum_weights = df.Sum(WEIGHT)
+        sum_weights2 = df.Sum("weight2_")
+        info.sum_weights = sum_weights.GetValue()
+        info.sum_weights2 = sum_weights2.GetValue()
+    return info
+
+
+class FileCache:
+    """File information cached on disk."""
+
+    path: pathlib.Path
+    infos: dict[tuple[str, str], FileInfo]
+
+    def __init__(self, path: pathlib.Path | None = None) -> None:
+        self.path = path or compiled.CACHE_DIR / "fileinfo.json"
+        self.infos = self._load()
+
+    def _load(self) -> dict[tuple[str, str], FileInfo]:
+        infos = {}
+        try:
+            with open(self.path, "r") as inp:
+                for data in json.load(inp):
+                    info = FileInfo(**data)
+                    infos[info.tree, info.path] = info
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            log.warning("Ignoring file cache %s: %s", self.path, e)
+        return infos
+
+    def get(
+        self, path: str, weights: bool = False, schema: bool = False, tree: str = TREE
+    ) -> FileInfo | None:
+        info = self.infos.get((tree, path))
+        if info is None or not info.valid():
+            return None
+        if weights and info.sum_weights is None:
+            return None
+        if schema and info.schema is None:
+            return None
+        return info
+
+    def put(self, info: FileInfo) -> None:
+        """Add information, keeping what is known of the same file version."""
+        old = self.infos.get((info.tree, info.path))
+        if old and (old.size, old.mtime_ns) == (info.size, info.mtime_ns):
+            for f in dataclasses.fields(info):
+                if getattr(info, f.name) is None:
+                    setattr(info, f.name, getattr(old, f.name))
+        self.infos[info.tree, info.path] = info
+
+    def save(self) -> None:
+        """Write the cache, merged with entries written by other processes."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with compiled.lock(self.path.with_suffix(".lock")):
+            self.infos = self._load() | self.infos
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as out:
+                json.dump([dataclasses.asdict(i) for i in self.infos.values()], out)
+            tmp.replace(self.path)
+
+
+def scan(
+    paths: Iterable[str | pathlib.Path],
+    weights: bool = False,
+    workers: int | None = None,
+    cache: FileCache | None = None,
+    schema: bool = False,
+    tree: str = TREE,
+) -> dict[str, FileInfo | Exception]:
+    """Information of a tree in many files, from the cache or read in parallel.
+
+    Returns:
+        Information by path, or the exception raised reading the file.
+    """
+    cache = cache or FileCache()
+    result: dict[str, FileInfo | Exception] = {}
+    todo = []
+    for path in map(str, paths):
+        info = cache.get(path, weights, schema, tree)
+        if info is None:
+            todo.append(path)
+        else:
+            result[path] = info
+
+    log.info("%d files cached, %d to read", len(result), len(todo))
+    if todo:
+        # ROOT may already run threads, do not fork
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(workers, context) as executor:
+            futures = {
+                executor.submit(read_info, p, weights, schema, tree): p for p in todo
+            }
+            for future in concurrent.futures.as_completed(futures):
+                path = futures[future]
+                try:
+                    info = future.result()
+                except Exception as e:
+                    log.error("Failed to read %s: %s", path, e)
+                    result[path] = e
+                    continue
+                cache.put(info)
+                result[path] = info
+        cache.save()
+
+    return result
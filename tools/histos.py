@@ -0,0 +1,302 @@
+"""Histograms booked from the analysis YAML definitions.
+
+The definitions are lists of dataframes, with the weight column and the
+histograms to book:
+
+    - dataframe: main
+      weight: the_weight
+      Histo1D:
+        - name: l1_pt
+          title: p_{T}(l_{1}) [GeV]
+          bins: [ 40, 0., 200.]
+          var: l1_pt        # optional, defaults to name
+          overflow: true    # optional, fold the overflow into the last bin
+      Histo2D:
+        - name: met_vs_ht
+          title: MET vs HT
+          bins: [ 20, 200., 1200., 20, 300., 1300.]
+          var: [ met_pt, HT ]
+
+Histo3D entries are the same, with three variables. Overflow folding
+matches VarCalc.Fill1D: values beyond the upper edge of an axis are counted
+in its last bin, underflows are kept.
+
+With variations=True the histograms include all systematic variations of
+the dataframe (see tools.weights), filled in the same event loop. Varied
+histograms are written as name__variation, e.g. l1_pt__reweightPU:up.
+
+Indexed views (see tools.leptons) are not containers for RDataFrame
+actions, they are gathered into name_gathered RVec columns first.
+
+For per-file results (see tools.cache) the histograms are booked once with
+the file index as a further axis (see def_file_index), and split into one
+histogram per file after the event loop (see split_by_file).
+"""
+
+import array
+import logging
+import pathlib
+from dataclasses import dataclass
+from typing import Any
+
+import ROOT
+import ruamel.yaml
+
+log = logging.getLogger("mrtools.tools")
+
+TOOLS_PATH = pathlib.Path(__file__).parent
+
+RDataFrame = Any
+RResultPtr = Any
+
+
+@dataclass
+class Booked:
+    """Booked histogram, with its variations if any."""
+
+    nominal: RResultPtr
+    varied: Any = None
+    overflow: bool = False
+
+    def items(self) -> list[tuple[str, Any]]:
+        """Histograms by variation name."""
+        if self.varied is None:
+            return [("nominal", self.nominal.GetPtr())]
+        return [(str(k), self.varied[k]) for k in self.varied.GetKeys()]
+
+
+def read_definitions(path: pathlib.Path) -> list[dict[str, Any]]:
+    with open(path, "r") as inp:
+        return ruamel.yaml.YAML(typ="safe").load(inp)
+
+
+MODELS = {
+    "Histo1D": ROOT.RDF.TH1DModel,
+    "Histo2D": ROOT.RDF.TH2DModel,
+    "Histo3D": ROOT.RDF.TH3DModel,
+}
+
+# Kind with the file index as a further axis
+BY_FILE = {"Histo1D": "Histo2D", "Histo2D": "Histo3D", "Histo3D": "HistoND"}
+
+VIEW_TYPE = "IndexedView<"
+
+_initialized = False
+
+
+def init() -> None:
+    """Load the C++ routines."""
+    global _initialized
+    if _initialized:
+        return
+    log.debug("Load histos C++ routines.")
+    ROOT.gInterpreter.AddIncludePath(str(TOOLS_PATH))
+    ROOT.gInterpreter.Declare('#include "histos_inc.hxx"')
+    _initialized = True
+
+
+def def_gathered(df: RDataFrame, columns: list[str]) -> tuple[RDataFrame, list[str]]:
+    """Define RVec copies of the indexed view columns.
+
+    Returns:
+        The dataframe and the columns with the views replaced by their copies.
+    """
+    defined = set(str(c) for c in df.GetDefinedColumnNames())
+    result = []
+    for column in columns:
+        if str(df.GetColumnType(column)).startswith(VIEW_TYPE):
+            gathered = f"{column}_gathered"
+            if gathered not in defined:
+                log.debug('Define("%s", "%s.gather()")', gathered, column)
+                df = df.Define(gathered, f"{column}.gather()")
+                defined.add(gathered)
+            column = gathered
+        result.append(column)
+    return df, result
+
+
+def def_file_index(
+    df: RDataFrame, name: str, files: list[str], tree: str
+) -> RDataFrame:
+    """Define the index in files of the file of each entry.
+
+    The index is looked up once per file and slot in a map of the sample
+    ids (see histos_inc.hxx).
+    """
+    init()
+    index_map = ROOT.ByFile.AddMap([f"{file}/{tree}" for file in files])
+    expr = f"ByFile::Index({index_map}, rdfsampleinfo_)"
+    log.debug('DefinePerSample("%s", "%s")', name, expr)
+    return df.DefinePerSample(name, expr)
+
+
+def _book_by_file(
+    df: RDataFrame, kind: str, histo: dict[str, Any], columns: list[str], nr: int
+) -> RResultPtr:
+    """Book a histogram with the file index of columns as the last axis."""
+    bins = list(histo["bins"]) + [nr, 0.0, float(nr)]
+    kind = BY_FILE[kind]
+    log.debug("%s(%s, %s)", kind, histo["name"], ", ".join(columns))
+    if kind != "HistoND":
+        model = MODELS[kind](histo["name"], histo["title"], *bins)
+        return getattr(df, kind)(model, *columns)
+    model = ROOT.RDF.THnDModel(
+        histo["name"],
+        histo["title"],
+        len(bins) // 3,
+        array.array("i", bins[0::3]),
+        array.array("d", bins[1::3]),
+        array.array("d", bins[2::3]),
+    )
+    return df.HistoND(model, columns)
+
+
+def book_histos(
+    df: RDataFrame,
+    definition: dict[str, Any],
+    variations: bool = True,
+    by_file: tuple[str, int] | None = None,
+) -> dict[str, Booked]:
+    """Book the histograms of one dataframe definition.
+
+    Args:
+        by_file: index column and number of files, to book the histograms
+            with the file index as a further axis (see split_by_file).
+    """
+    weight = definition.get("weight")
+    results = {}
+    for kind, model_class in MODELS.items():
+        for histo in definition.get(kind, []):
+            name = histo["name"]
+            var = histo.get("var", name)
+            columns = var if isinstance(var, list) else [var]
+            if by_file:
+                columns = columns + [by_file[0]]
+            if weight:
+                columns = columns + [weight]
+            df, columns = def_gathered(df, columns)
+            if by_file:
+                result = _book_by_file(df, kind, histo, columns, by_file[1])
+            else:
+                model = model_class(name, histo["title"], *histo["bins"])
+                log.debug("%s(%s, %s)", kind, name, ", ".join(columns))
+                result = getattr(df, kind)(model, *columns)
+            booked = Booked(result, overflow=histo.get("overflow", False))
+            if variations:
+                booked.varied = ROOT.RDF.Experimental.VariationsFor(result)
+            results[name] = booked
+
+    return results
+
+
+def split_by_file(
+    booked: Booked, definition: dict[str, Any], indices: list[int]
+) -> list[dict[str, ROOT.TH1]]:
+    """Histograms by variation of the files at indices.
+
+    Args:
+        booked: histogram of a single histogram definition, booked by file.
+        definition: the definition, see split_definitions.
+        indices: indices of the files, as given to def_file_index.
+    """
+    init()
+    kind = next(k for k in MODELS if k in definition)
+    histo = definition[kind][0]
+    model = MODELS[kind](histo["name"], histo["title"], *histo["bins"]).GetHistogram()
+    items = booked.items()
+    return [
+        {key: ROOT.ByFile.Slice(by_file, model, index + 1) for key, by_file in items}
+        for index in indices
+    ]
+
+
+def fold_overflow(histo: ROOT.TH1) -> None:
+    """Move the overflow of every axis into its last bin."""
+    axes = [histo.GetXaxis(), histo.GetYaxis(), histo.GetZaxis()]
+    nbins = [a.GetNbins() for a in axes[: histo.GetDimension()]]
+    nbins += [0] * (3 - len(nbins))
+    for ix in range(nbins[0] + 2):
+        for iy in range(nbins[1] + 2 if nbins[1] else 1):
+            for iz in range(nbins[2] + 2 if nbins[2] else 1):
+                folded = [min(i, n) if n else i for i, n in zip((ix, iy, iz), nbins)]
+                if folded == [ix, iy, iz]:
+                    continue
+                source = histo.GetBin(ix, iy, iz)
+                target = histo.GetBin(*folded)
+                content = histo.GetBinContent(target) + histo.GetBinContent(source)
+                error2 = histo.GetBinError(target) ** 2 + histo.GetBinError(source) ** 2
+                histo.SetBinContent(target, content)
+                histo.SetBinError(target, error2**0.5)
+                histo.SetBinContent(source, 0.0)
+                histo.SetBinError(source, 0.0)
+
+
+def write_histo(
+    output: ROOT.TDirectory,
+    name: str,
+    items: list[tuple[str, ROOT.TH1]],
+    overflow: bool = False,
+) -> None:
+    """Write a histogram, its variations as name__variation."""
+    for key, histo in items:
+        if overflow:
+            fold_overflow(histo)
+        if key == "nominal":
+            output.WriteObject(histo, name)
+        else:
+            output.WriteObject(histo, f"{name}__{key}")
+
+
+def write_histos(output: ROOT.TDirectory, results: dict[str, Booked]) -> None:
+    """Write booked histograms, the variations as name__variation."""
+    for name, booked in results.items():
+        write_histo(output, name, booked.items(), booked.overflow)
+
+
+def split_definitions(definitions: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """One definition for each histogram, by histogram name."""
+    result = {}
+    for definition in definitions:
+        for kind in MODELS:
+            for histo in definition.get(kind, []):
+                single = {k: v for k, v in definition.items() if k not in MODELS}
+                single[kind] = [histo]
+                result[histo["name"]] = single
+    return result
+
+
+_booked: dict[str, dict[str, Booked]] = {}
+
+
+def book_dataset(
+    dfs: dict[str, RDataFrame],
+    definitions: list[dict[str, Any]],
+    dataset_name: str,
+    variations: bool = True,
+) -> None:
+    """Book the histograms of a dataset, to be written by save."""
+    results = {}
+    for definition in definitions:
+        df = dfs[definition["dataframe"]]
+        results |= book_histos(df, definition, variations=variations)
+    _booked[dataset_name] = results
+
+
+def handles() -> list[RResultPtr]:
+    """Nominal results of all booked histograms, e.g. for RunGraphs."""
+    return [b.nominal for results in _booked.values() for b in results.values()]
+
+
+def save(path: pathlib.Path) -> None:
+    """Write the filled histograms of all datasets, one directory each."""
+    output = ROOT.TFile.Open(str(path), "RECREATE")
+    try:
+        for dataset_name, results in _booked.items():
+            if not all(b.nominal.IsReady() for b in results.values()):
+                log.warning("Histograms of %s were not filled", dataset_name)
+                continue
+            directory = output.mkdir(dataset_name, "", True)
+            write_histos(directory, results)
+    finally:
+        output.Close()
+    log.info("Histograms written to %s", path)
@@ -0,0 +1,91 @@
+#ifndef HISTOS_INC_HXX
+#define HISTOS_INC_HXX
+
+#include "ROOT/RDF/RSampleInfo.hxx"
+#include "TH1.h"
+#include "THnBase.h"
+
+#include <deque>
+#include <stdexcept>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+namespace ByFile
+{
+    /// Index by sample id ("file/tree") of the files of each graph.
+    ///
+    /// A deque, so that the maps stay in place while further graphs add
+    /// theirs.
+    inline std::deque<std::unordered_map<std::string, int>> &Maps()
+    {
+        static std::deque<std::unordered_map<std::string, int>> maps;
+        return maps;
+    }
+
+    /// Store the index of each sample id, returns the number of the map.
+    inline unsigned int AddMap(const std::vector<std::string> &ids)
+    {
+        auto &map = Maps().emplace_back();
+        for (std::size_t i = 0; i < ids.size(); ++i)
+        {
+            map.emplace(ids[i], i);
+        }
+        return Maps().size() - 1;
+    }
+
+    /// Index of the file of a sample, once per file and slot.
+    inline int Index(unsigned int map, const ROOT::RDF::RSampleInfo &info)
+    {
+        const auto &files = Maps()[map];
+        auto it = files.find(info.AsString());
+        if (it != files.end())
+        {
+            return it->second;
+        }
+        // The chain may have resolved the file name, e.g. with a prefix
+        for (const auto &[id, index] : files)
+        {
+            if (info.Contains(id))
+            {
+                return index;
+            }
+        }
+        throw std::runtime_error("No file index for " + info.AsString());
+    }
+
+    /// Copy of model with the cells of bin of the last axis of histo.
+    inline TH1 *Slice(const TH1 &histo, const TH1 &model, int bin)
+    {
+        auto result = static_cast<TH1 *>(model.Clone());
+        result->SetDirectory(nullptr);
+        int ix, iy, iz;
+        for (int cell = 0; cell < result->GetNcells(); ++cell)
+        {
+            result->GetBinXYZ(cell, ix, iy, iz);
+            const int source = result->GetDimension() == 1 ? histo.GetBin(ix, bin)
+                                                           : histo.GetBin(ix, iy, bin);
+            result->SetBinContent(cell, histo.GetBinContent(source));
+            result->SetBinError(cell, histo.GetBinError(source));
+        }
+        result->ResetStats();
+        return result;
+    }
+
+    inline TH1 *Slice(const THnBase &histo, const TH1 &model, int bin)
+    {
+        auto result = static_cast<TH1 *>(model.Clone());
+        result->SetDirectory(nullptr);
+        int index[4] = {0, 0, 0, bin};
+        for (int cell = 0; cell < result->GetNcells(); ++cell)
+        {
+            result->GetBinXYZ(cell, index[0], index[1], index[2]);
+            const Long64_t source = histo.GetBin(index);
+            result->SetBinContent(cell, histo.GetBinContent(source));
+            result->SetBinError(cell, histo.GetBinError(source));
+        }
+        result->ResetStats();
+        return result;
+    }
+} // namespace ByFile
+#endif
@@ -0,0 +1,163 @@
+"""Structural integrity checks of ntuple files.
+
+Much cheaper than reading the files: each file is opened, its key list,
+the TTree header and the basket index of every branch are checked for
+consistency, recovered files are flagged, and only a few baskets per branch
+are read to confirm they decompress.
+
+The report is a JSON file:
+
+    {
+        "files": {
+            "/path/to/file.root": {"ok": false, "errors": ["..."], ...},
+            ...
+        }
+    }
+
+create_yaml.py --exclude-report uses it to exclude the bad files.
+"""
+
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import random
+from typing import Any
+from typing import Iterable
+
+import ROOT
+
+log = logging.getLogger("mrtools.tools")
+
+TREE = "Events"
+BASKETS_PER_BRANCH = 2
+
+
+def _branches(tree: ROOT.TTree) -> Iterable[ROOT.TBranch]:
+    todo = list(tree.GetListOfBranches())
+    while todo:
+        branch = todo.pop()
+        todo.extend(branch.GetListOfBranches())
+        yield branch
+
+
+def _check_branch(
+    branch: ROOT.TBranch,
+    entries: int,
+    end: int,
+    baskets: int,
+    rng: random.Random,
+) -> list[str]:
+    name = branch.GetName()
+    errors = []
+    if branch.GetEntries() != entries:
+        errors.append(f"{name}: {branch.GetEntries()} entries, tree has {entries}")
+
+    nr_baskets = branch.GetWriteBasket()
+    basket_entry = branch.GetBasketEntry()
+    basket_bytes = branch.GetBasketBytes()
+    last = -1
+    for i in range(nr_baskets):
+        first = basket_entry[i]
+        if first <= last or first >= max(entries, 1):
+            errors.append(f"{name}: basket {i} starts at entry {first}")
+        last = first
+        seek = branch.GetBasketSeek(i)
+        if seek <= 0 or seek + basket_bytes[i] > end:
+            errors.append(f"{name}: basket {i} at {seek} outside the file")
+    if errors:
+        return errors
+
+    for i in rng.sample(range(nr_baskets), min(baskets, nr_baskets)):
+        if not branch.GetBasket(i):
+            errors.append(f"{name}: basket {i} does not decompress")
+    return errors
+
+
+def check_file(
+    path: str, tree: str = TREE, baskets: int = BASKETS_PER_BRANCH
+) -> dict[str, Any]:
+    """Check the structure of a file.
+
+    Returns:
+        Report of the file, with ok, errors, recovered, entries and the
+        number of baskets read.
+    """
+    report: dict[str, Any] = {"ok": False, "errors": [], "recovered": False}
+    errors = report["errors"]
+    size = os.stat(path).st_size
+    root_file = ROOT.TFile.Open(path)
+    if not root_file or root_file.IsZombie():
+        errors.append("cannot be opened")
+        return report
+
+    try:
+        report["recovered"] = root_file.TestBit(ROOT.TFile.kRecovered)
+        if report["recovered"]:
+            errors.append("needed recovery")
+        end = root_file.GetEND()
+        if end > size:
+            errors.append(f"truncated, END {end} > size {size}")
+        keys = [k.GetName() for k in root_file.GetListOfKeys()]
+        if tree not in keys:
+            errors.append(f"no {tree} in keys")
+            return report
+
+        the_tree = root_file.Get(tree)
+        if not the_tree:
+            errors.append(f"cannot read {tree} header")
+            return report
+        entries = the_tree.GetEntries()
+        report["entries"] = entries
+
+        rng = random.Random(path)
+        nr_branches = 0
+        for branch in _branches(the_tree):
+            errors.extend(_check_branch(branch, entries, end, baskets, rng))
+            nr_branches += 1
+        report["branches"] = nr_branches
+    finally:
+        root_file.Close()
+
+    report["ok"] = not errors
+    return report
+
+
+def scan(
+    directories: Iterable[pathlib.Path],
+    workers: int | None = None,
+    baskets: int = BASKETS_PER_BRANCH,
+) -> dict[str, dict[str, Any]]:
+    """Check all ROOT files of the directories in parallel."""
+    paths = [str(p) for d in directories for p in sorted(d.glob("*.root"))]
+    log.info("Checking %d files", len(paths))
+    result = {}
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(workers, context) as executor:
+        futures = {executor.submit(check_file, p, TREE, baskets): p for p in paths}
+        for future in concurrent.futures.as_completed(futures):
+            path = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                report = {"ok": False, "errors": [f"check failed: {e}"]}
+            if not report["ok"]:
+                log.warning("%s: %s", path, "; ".join(report["errors"][:3]))
+            result[path] = report
+    return result
+
+
+def write_report(path: pathlib.Path, files: dict[str, dict[str, Any]]) -> None:
+    with open(path, "w") as out:
+        json.dump({"files": files}, out, indent=1, sort_keys=True)
+    bad = sum(1 for r in files.values() if not r["ok"])
+    log.info("Report %s: %d files, %d bad", path, len(files), bad)
+
+
+def bad_files(path: pathlib.Path) -> set[str]:
+    """Paths of the files that failed the checks of a report."""
+    with open(path, "r") as inp:
+        files = json.load(inp)["files"]
+    return {p for p, r in files.items() if not r["ok"]}
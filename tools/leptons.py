@@ -15,7 +15,7 @@ Example:
         elec_attrs = leptons.ELEC_ATTRS
         lowpt_elec_attrs = leptons.LOWPT_ELEC_ATTRS
         comb_elec_attrs = leptons.COMB_ELEC_ATTRS
-   
+
     df = leptons.define_vector_object(
         df, "GoodElectron", leptons.ELEC_SELECT_HYBRID_ISO, "Electron", elec_attrs
     )
@@ -31,14 +31,33 @@ Example:
         df, "CombElectron", "GoodElectron", "GoodLowPtElectron", comb_elec_attrs
     )
 
+    # or select and merge in one pass
+    df = leptons.def_fused_leptons(
+        df,
+        "CombElectron",
+        "Electron",
+        leptons.ELEC_SELECT_HYBRID_ISO,
+        "LowPtElectron",
+        leptons.LOWPT_ELEC_SELECT_HYBRID_ISO,
+        comb_elec_attrs,
+        merge="dr",
+    )
+
 """
 
+import hashlib
+import os
 import pathlib
+import re
 from typing import Any
+from typing import Callable
 import logging
 
 import ROOT
 
+from tools import compiled
+from tools.columns import Tracer
+
 log = logging.getLogger("mrtools.user")
 
 RDataFrame = Any
@@ -55,7 +74,7 @@ MC_ATTRS = ["genPartIdx", "genPartFlav"]
 
 COMB_ELEC_ATTRS = ["pt", "eta", "deltaEtaSC", "phi", "dxy", "dz", "charge"]
 
-MUON_SELECT = ["Muon_pt > 3.5", "abs(Muon_eta) < 2.4", "Muon_looseID"]
+MUON_SELECT = ["Muon_pt > 3.5", "abs(Muon_eta) < 2.4", "Muon_looseId"]
 
 MUON_SELECT_HYBRID_ISO = [
     "Muon_pt > 3.5",
@@ -69,7 +88,7 @@ MUON_SELECT_HYBRID_ISO = [
 MUON_SELECT_LOOSE_HYBRID_ISO = [
     "Muon_pt > 3.5",
     "abs(Muon_eta) < 2.4",
-    "Muon_looseID",
+    "Muon_looseId",
     "HybridIso(Muon_pt,Muon_pfRelIso03_all,20.,0.8)",
     "abs(Muon_dxy) < 0.1",
     "abs(Muon_dz) < 0.5",
@@ -79,7 +98,7 @@ ELEC_SELECT = [
     "Electron_pt > 5.",
     "abs(Electron_eta) < 2.5",
     "ECalGap(Electron_eta, Electron_deltaEtaSC)",
-    "ElectronVid(Electron_vidNestedWPBitmap,1)",
+    "ElectronVid::Pass<1>(Electron_vidNestedWPBitmap)",
 ]
 
 ELEC_SELECT_HYBRID_ISO = [
@@ -89,7 +108,7 @@ ELEC_SELECT_HYBRID_ISO = [
     "HybridIso(Electron_pt,Electron_pfRelIso03_all,5.0,0.2)",
     "abs(Electron_dxy) < 0.02",
     "abs(Electron_dz) < 0.1",
-    "ElectronVid::Eval(Electron_vidNestedWPBitmap,1,ElectronVid::GsfEleRelPFIsoScaledCut)",
+    "ElectronVid::Pass<1,ElectronVid::GsfEleRelPFIsoScaledCut>(Electron_vidNestedWPBitmap)",
 ]
 
 ELEC_SELECT_LOOSE_HYBRID_ISO = [
@@ -99,13 +118,13 @@ ELEC_SELECT_LOOSE_HYBRID_ISO = [
     "HybridIso(Electron_pt,Electron_pfRelIso03_all,20.0,0.8)",
     "abs(Electron_dxy) < 0.1",
     "abs(Electron_dz) < 0.5",
-    "ElectronVid::Eval(Electron_vidNestedWPBitmap,1,ElectronVid::GsfEleRelPFIsoScaledCut)",
+    "ElectronVid::Pass<1,ElectronVid::GsfEleRelPFIsoScaledCut>(Electron_vidNestedWPBitmap)",
 ]
 
 LOWPT_ELEC_SELECT = [
     "LowPtElectron_pt > 3.",
     "abs(LowPtElectron_eta) < 2.5",
-    "EcalGap(LowPtElectron_eta, LowPtElectron_deltaEtaSC)",
+    "ECalGap(LowPtElectron_eta, LowPtElectron_deltaEtaSC)",
     "LowPtElectron_ID > 0",
 ]
 
@@ -129,33 +148,420 @@ LOWPT_ELEC_SELECT_LOOSE_HYBRID_ISO = [
     "LowPtElectron_ID > 0",
 ]
 
+# Working points, evaluated together by def_working_points
+MUON_WORKING_POINTS = {
+    "Tight": MUON_SELECT_HYBRID_ISO,
+    "Loose": MUON_SELECT_LOOSE_HYBRID_ISO,
+    "Plain": MUON_SELECT,
+}
+
+ELEC_WORKING_POINTS = {
+    "Tight": ELEC_SELECT_HYBRID_ISO,
+    "Loose": ELEC_SELECT_LOOSE_HYBRID_ISO,
+    "Plain": ELEC_SELECT,
+}
+
+LOWPT_ELEC_WORKING_POINTS = {
+    "Tight": LOWPT_ELEC_SELECT_HYBRID_ISO,
+    "Loose": LOWPT_ELEC_SELECT_LOOSE_HYBRID_ISO,
+    "Plain": LOWPT_ELEC_SELECT,
+}
+
+TOOLS_PATH = pathlib.Path(__file__).parent
 
-def init():
+
+def init(precompiled: bool = True):
+    """Load the leptons C++ routines.
+
+    By default the routines come from a shared library compiled from
+    leptons_lib.cxx and cached on disk (see tools.compiled), so only the
+    first process pays for the compilation. With precompiled=False, or if
+    the library cannot be built, the header is parsed and JIT-ed by Cling.
+    """
     log.debug("Load leptons C++ routines.")
-    ROOT.gInterpreter.AddIncludePath(str(pathlib.Path(__file__).parent))
+    ROOT.gInterpreter.AddIncludePath(str(TOOLS_PATH))
+    if precompiled:
+        try:
+            compiled.load_library(
+                TOOLS_PATH / "leptons_lib.cxx", [TOOLS_PATH / "leptons_inc.hxx"]
+            )
+            return
+        except RuntimeError as e:
+            log.warning("%s, using the interpreter", e)
     ROOT.gROOT.ProcessLine('#include "leptons_inc.hxx"')
 
 
+SELECTOR_HEADER = """\
+// Generated by tools/leptons.py, do not edit.
+#include "{header}"
+#include "ROOT/RDataFrame.hxx"
+"""
+
+SELECTOR_FUNCTOR = """
+struct {functor}
+{{
+    auto operator()({arguments}) const
+    {{
+        return {body};
+    }}
+}};
+"""
+
+FUSED_SELECTOR_FUNCTOR = """
+struct {functor}
+{{
+    ROOT::RVecI operator()({arguments}) const
+    {{
+        const std::size_t n = {size}.size();
+        ROOT::RVecI mask(n);
+        for (std::size_t i = 0; i < n; ++i)
+        {{
+            mask[i] = {body};
+        }}
+        return mask;
+    }}
+}};
+"""
+
+WORKING_POINTS_FUNCTOR = """
+struct {functor}
+{{
+    ROOT::RVec<unsigned char> operator()({arguments}) const
+    {{
+        const std::size_t n = {size}.size();
+        ROOT::RVec<unsigned char> bits(n);
+        for (std::size_t i = 0; i < n; ++i)
+        {{
+            if (!({common}))
+            {{
+                bits[i] = 0;
+                continue;
+            }}
+            unsigned char b = 0;
+{working_points}
+            bits[i] = b;
+        }}
+        return bits;
+    }}
+}};
+"""
+
+SELECTOR_DEFINE = """
+ROOT::RDF::RNode Define{functor}(ROOT::RDF::RNode df, const std::string &name, const std::vector<std::string> &columns)
+{{
+    return df.Define(name, {functor}{{}}, columns);
+}}
+"""
+
+_selectors: dict[str, tuple[str, list[str]]] = {}
+
+
+def _is_rvec(column_type: str) -> bool:
+    match = re.fullmatch(r"ROOT::(?:VecOps::)?RVec(?:<.+>|[A-Z]\w*)", column_type)
+    return match is not None
+
+
+def selector_columns(select: list[str], all_columns: set[str]) -> list[str]:
+    """Columns read by a selection, in order of appearance."""
+    names = re.findall(r"(?<![\w:.])[A-Za-z_]\w*", " && ".join(select))
+    return list(dict.fromkeys(c for c in names if c in all_columns))
+
+
+def _element_cut(cut: str, vectors: list[str]) -> str:
+    def element(match: re.Match) -> str:
+        name = match.group(0)
+        if name in vectors:
+            return f"{name}[i]"
+        if name == "abs":
+            return "std::abs"
+        return name
+
+    return "(" + re.sub(r"(?<![\w:.])[A-Za-z_]\w*", element, cut) + ")"
+
+
+def selector_functor(
+    functor: str, select: list[str], columns: dict[str, str], fused: bool = True
+) -> str:
+    """C++ source of a selector functor.
+
+    Args:
+        functor: name of the functor struct.
+        select: list of cuts, combined with &&.
+        columns: C++ type of each column read by the selection.
+        fused: evaluate all cuts element by element in a single loop, with
+            short-circuiting and no temporaries beyond the output mask, using
+            the scalar overloads of the selection functions. Otherwise the
+            expression is evaluated on whole RVecs as in a jitted Define.
+    """
+    arguments = ", ".join(f"const {t} &{c}" for c, t in columns.items())
+    vectors = [c for c, t in columns.items() if _is_rvec(t)]
+    if not fused or not vectors:
+        return SELECTOR_FUNCTOR.format(
+            functor=functor, arguments=arguments, body=" && ".join(select)
+        )
+
+    return FUSED_SELECTOR_FUNCTOR.format(
+        functor=functor,
+        arguments=arguments,
+        size=vectors[0],
+        body=" &&\n                      ".join(
+            _element_cut(cut, vectors) for cut in select
+        ),
+    )
+
+
+def working_points_functor(
+    functor: str, working_points: list[list[str]], columns: dict[str, str]
+) -> str:
+    """C++ source of a functor evaluating several working points at once.
+
+    It returns a per-element bitmask, bit k set if the element passes
+    working_points[k]. Cuts common to all working points are evaluated once.
+    """
+    arguments = ", ".join(f"const {t} &{c}" for c, t in columns.items())
+    vectors = [c for c, t in columns.items() if _is_rvec(t)]
+    common = [
+        cut for cut in working_points[0] if all(cut in wp for wp in working_points)
+    ]
+    lines = []
+    for k, wp in enumerate(working_points):
+        cuts = [_element_cut(cut, vectors) for cut in wp if cut not in common]
+        if cuts:
+            lines.append(f"            if ({' && '.join(cuts)})")
+            lines.append(f"                b |= {1 << k};")
+        else:
+            lines.append(f"            b |= {1 << k};")
+
+    return WORKING_POINTS_FUNCTOR.format(
+        functor=functor,
+        arguments=arguments,
+        size=vectors[0],
+        common=" && ".join(_element_cut(cut, vectors) for cut in common) or "true",
+        working_points="\n".join(lines),
+    )
+
+
+def _compile_functor(
+    prefix: str, key_text: str, types: dict[str, str], source: Callable[[str], str]
+) -> str:
+    digest = hashlib.sha256(key_text.encode())
+    for column, column_type in types.items():
+        digest.update(f"{column}:{column_type};".encode())
+    functor = f"{prefix}_{digest.hexdigest()[:16]}"
+    if functor in _selectors:
+        return functor
+
+    path = compiled.CACHE_DIR / "selectors" / f"{functor}.cxx"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Other processes may generate the same functor
+    with compiled.lock(path.with_suffix(".lock")):
+        if not path.exists():
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as out:
+                out.write(SELECTOR_HEADER.format(header=TOOLS_PATH / "leptons_inc.hxx"))
+                out.write(source(functor))
+                out.write(SELECTOR_DEFINE.format(functor=functor))
+            tmp.replace(path)
+    log.debug("Functor %s: %s", functor, key_text)
+    compiled.load_library(path, [TOOLS_PATH / "leptons_inc.hxx"])
+
+    _selectors[functor] = (functor, list(types))
+    return functor
+
+
+def make_selector(
+    df: RDataFrame, select: list[str], fused: bool = True
+) -> tuple[str, list[str]]:
+    """Generate a typed C++ functor for a selection.
+
+    The functor takes the columns used by the selection (its attribute list)
+    with their types, and returns the mask. It is compiled into a library
+    cached by tools.compiled, so identical selections are shared between
+    datasets and processes. See selector_functor for fused.
+
+    Returns:
+        Name of the functor and the columns it reads.
+    """
+    columns = selector_columns(select, set(df.GetColumnNames()))
+    types = {c: df.GetColumnType(c) for c in columns}
+    functor = _compile_functor(
+        "LeptonSelector",
+        f"{' && '.join(select)}; fused={fused}",
+        types,
+        lambda name: selector_functor(name, select, types, fused),
+    )
+    return _selectors[functor]
+
+
+def make_working_points(
+    df: RDataFrame, working_points: list[list[str]]
+) -> tuple[str, list[str]]:
+    """Generate a typed C++ functor for several working points.
+
+    See working_points_functor and make_selector.
+    """
+    if len(working_points) > 8:
+        raise ValueError(f"At most 8 working points, got {len(working_points)}")
+    all_columns = set(df.GetColumnNames())
+    columns = selector_columns([c for wp in working_points for c in wp], all_columns)
+    types = {c: df.GetColumnType(c) for c in columns}
+    functor = _compile_functor(
+        "LeptonWorkingPoints",
+        " || ".join(" && ".join(wp) for wp in working_points),
+        types,
+        lambda name: working_points_functor(name, working_points, types),
+    )
+    return _selectors[functor]
+
+
+def _define_functor(
+    df: RDataFrame, name: str, functor: str, columns: list[str]
+) -> RDataFrame:
+    log.debug("Define(%s, %s{}, %s)", name, functor, columns)
+    define = getattr(ROOT, f"Define{functor}")
+    if isinstance(df, Tracer):
+        df.define(name, columns)
+        return df.wrap(define(ROOT.RDF.AsRNode(df.node), name, columns))
+    return define(ROOT.RDF.AsRNode(df), name, columns)
+
+
+def def_selector(df: RDataFrame, name: str, select: list[str]) -> RDataFrame:
+    """Define a mask column with a compiled selector, without jitting."""
+    return _define_functor(df, name, *make_selector(df, select))
+
+
+def def_working_points(
+    df: RDataFrame,
+    old: str,
+    working_points: dict[str, list[str]],
+    attrs: list[str],
+    view: bool = False,
+    functor: bool = True,
+) -> RDataFrame:
+    """Define collections for several working points in one pass.
+
+    The column old_wp holds a bitmask per element of old, with one bit per
+    distinct selection in working_points. The collection named by each key
+    of working_points is then defined from its bit with def_vector_obj.
+
+    With functor=False, or if the functor cannot be compiled, every working
+    point is a jitted expression instead, evaluated separately.
+
+    Example:
+        df = leptons.def_working_points(
+            df,
+            "Muon",
+            {f"{wp}Muon": s for wp, s in leptons.MUON_WORKING_POINTS.items()},
+            leptons.MUON_ATTRS,
+        )
+    """
+    selections: list[list[str]] = []
+    for select in working_points.values():
+        if select not in selections:
+            selections.append(select)
+    if functor:
+        try:
+            wp_functor, columns = make_working_points(df, selections)
+        except RuntimeError as e:
+            log.warning("%s, using jitted working points", e)
+            functor = False
+    if not functor:
+        for name, select in working_points.items():
+            df = def_vector_obj(df, name, select, old, attrs, view)
+        return df
+    df = _define_functor(df, f"{old}_wp", wp_functor, columns)
+    for name, select in working_points.items():
+        bit = 1 << selections.index(select)
+        df = def_vector_obj(df, name, [f"({old}_wp & {bit}) != 0"], old, attrs, view)
+    return df
+
+
 def def_vector_obj(
-    df: RDataFrame, name: str, select: list[str], old: str, attrs: list[str]
+    df: RDataFrame,
+    name: str,
+    select: list[str],
+    old: str,
+    attrs: list[str],
+    view: bool = False,
+    functor: bool = False,
 ) -> Any:
-    filter = " && ".join(select)
-    log.debug('Define("%s_mask", "%s")', name, filter)
-    df = df.Define(f"{name}_mask", filter)
+    """Define a collection of the selected elements of old.
+
+    With view=True, name_idx holds the selected indices and the name_attr
+    columns are IndexedView objects on the original branches, which gather
+    elements only when they are read. Views can be used in C++ expressions,
+    but are not containers for RDataFrame actions: call gather() on them to
+    get a RVec, histos.book_histos does so for histograms.
+
+    With functor=True, the mask is computed by a compiled selector (see
+    make_selector) instead of a jitted expression, if it can be compiled.
+    """
+    if functor:
+        try:
+            df = def_selector(df, f"{name}_mask", select)
+        except RuntimeError as e:
+            log.warning("%s, using a jitted selection", e)
+            functor = False
+    if not functor:
+        filter = " && ".join(select)
+        log.debug('Define("%s_mask", "%s")', name, filter)
+        df = df.Define(f"{name}_mask", filter)
 
     log.debug('Define("n%s", "Sum(%s_mask)")', name, name)
     df = df.Define(f"n{name}", f"Sum({name}_mask)")
 
+    if view:
+        log.debug('Define("%s_idx", "MaskIndex(%s_mask)")', name, name)
+        df = df.Define(f"{name}_idx", f"MaskIndex({name}_mask)")
+
+    for attr in attrs:
+        if view:
+            expr = f"MakeView({name}_idx,{old}_{attr})"
+        else:
+            expr = f"{old}_{attr}[{name}_mask]"
+        log.debug('Define("%s_%s","%s")', name, attr, expr)
+        df = df.Define(f"{name}_{attr}", expr)
+
+    return df
+
+
+def _def_merged_attrs(
+    df: RDataFrame, name: str, one: str, two: str, attrs: list[str], view: bool
+) -> RDataFrame:
+    if view:
+        log.debug(
+            'Define("%s_vidx","ComposeIndex(%s_idx,%s_idx,%s_idx)")',
+            name,
+            name,
+            one,
+            two,
+        )
+        df = df.Define(f"{name}_vidx", f"ComposeIndex({name}_idx,{one}_idx,{two}_idx)")
+
     for attr in attrs:
-        log.debug('Define("%s_%s","%s_%s[%s_mask]")', name, attr, old, attr, name)
-        df = df.Define(f"{name}_{attr}", f"{old}_{attr}[{name}_mask]")
+        if view:
+            expr = f"MakeView({name}_vidx,{one}_{attr}.source(),{two}_{attr}.source())"
+        else:
+            expr = f"MergeCopy({name}_idx,{one}_{attr},{two}_{attr})"
+        log.debug('Define("%s_%s","%s")', name, attr, expr)
+        df = df.Define(f"{name}_{attr}", expr)
 
     return df
 
 
 def define_combined_electrons(
-    df: RDataFrame, name: str, one: str, two: str, attrs: list[str]
+    df: RDataFrame,
+    name: str,
+    one: str,
+    two: str,
+    attrs: list[str],
+    view: bool = False,
 ) -> RDataFrame:
+    """Merge two electron collections with DeltaR overlap removal.
+
+    With view=True, one and two must have been defined with view=True and
+    the merged attributes are views on the original branches as well.
+    """
     log.debug(
         'Define("%s_idx","ElectronMerge(%s_eta,%s_phi,%s_eta,%s_phi)")',
         name,
@@ -167,42 +573,104 @@ def define_combined_electrons(
     df = df.Define(
         f"{name}_idx", f"ElectronMerge({one}_eta,{one}_phi,{two}_eta,{two}_phi)"
     )
-    for attr in attrs:
-        log.debug(
-            'Define("%s_%s","MergeCopy(%s_idx,%s_%s,%s_%s)")',
-            name,
-            attr,
-            name,
-            one,
-            attr,
-            two,
-            attr,
-        )
-        df = df.Define(
-            f"{name}_{attr}", f"MergeCopy({name}_idx,{one}_{attr},{two}_{attr})"
-        )
-    return df
+    return _def_merged_attrs(df, name, one, two, attrs, view)
 
 
 def def_combined_leptons(
-    df: RDataFrame, name: str, one: str, two: str, attrs: list[str]
+    df: RDataFrame,
+    name: str,
+    one: str,
+    two: str,
+    attrs: list[str],
+    view: bool = False,
 ):
+    """Merge two lepton collections ordered by pt.
+
+    With view=True, one and two must have been defined with view=True and
+    the merged attributes are views on the original branches as well.
+    """
     log.debug('Define("%s","LeptonMerge(%s_pt, %s_pt)")', name, one, two)
     df = df.Define(f"{name}_idx", f"LeptonMerge({one}_pt,{two}_pt)")
 
+    return _def_merged_attrs(df, name, one, two, attrs, view)
+
+
+def _element_type(column_type: str) -> str:
+    match = re.fullmatch(r"ROOT::(?:VecOps::)?RVec<(.+)>", column_type)
+    if match is None:
+        raise ValueError(f"Column type {column_type} is not a RVec")
+    return match.group(1)
+
+
+def def_fused_leptons(
+    df: RDataFrame,
+    name: str,
+    one: str,
+    select_one: list[str],
+    two: str,
+    select_two: list[str],
+    attrs: list[str],
+    merge: str = "pt",
+) -> RDataFrame:
+    """Select and merge two collections in one pass.
+
+    Equivalent to def_vector_obj for both collections followed by
+    def_combined_leptons (merge="pt") or define_combined_electrons (merge="dr"),
+    but all attributes of the same type are copied in a single traversal into
+    one buffer, and the name_attr columns are views into it. The number of
+    allocations per event does not depend on the number of attributes.
+
+    Unlike the two step version, name_idx indexes the original collections.
+    """
+    for old, select in ((one, select_one), (two, select_two)):
+        filter = " && ".join(select)
+        log.debug('Define("%s_%s_mask", "%s")', name, old, filter)
+        df = df.Define(f"{name}_{old}_mask", filter)
+
+    mask_one = f"{name}_{one}_mask"
+    mask_two = f"{name}_{two}_mask"
+    if merge == "pt":
+        merge_expr = f"LeptonSelectMerge({mask_one},{one}_pt,{mask_two},{two}_pt)"
+    elif merge == "dr":
+        merge_expr = (
+            f"ElectronSelectMerge({mask_one},{one}_eta,{one}_phi,"
+            f"{mask_two},{two}_eta,{two}_phi)"
+        )
+    else:
+        raise ValueError(f"Unknown merge {merge}")
+    log.debug('Define("%s_idx", "%s")', name, merge_expr)
+    df = df.Define(f"{name}_idx", merge_expr)
+
+    log.debug('Define("n%s", "%s_idx.size()")', name, name)
+    df = df.Define(f"n{name}", f"static_cast<int>({name}_idx.size())")
+
+    groups: dict[tuple[str, str], list[str]] = {}
     for attr in attrs:
-        log.debug(
-            'Define("%s_%s","MergeCopy(%s_idx, %s_%s, %s_%s))',
-            name,
-            attr,
-            name,
-            one,
-            attr,
-            two,
-            attr,
+        types = (
+            _element_type(df.GetColumnType(f"{one}_{attr}")),
+            _element_type(df.GetColumnType(f"{two}_{attr}")),
         )
-        df = df.Define(
-            f"{name}_{attr}", f"MergeCopy({name}_idx,{one}_{attr},{two}_{attr})"
+        groups.setdefault(types, []).append(attr)
+
+    for g, ((type_one, type_two), group_attrs) in enumerate(groups.items()):
+        ptr_one = ",".join(f"&{one}_{attr}" for attr in group_attrs)
+        ptr_two = ",".join(f"&{two}_{attr}" for attr in group_attrs)
+        gather = (
+            f"LeptonGather<{type_one},{type_two}>"
+            f"({name}_idx,{{{ptr_one}}},{{{ptr_two}}})"
         )
+        log.debug('Define("%s_soa%d", "%s")', name, g, gather)
+        df = df.Define(f"{name}_soa{g}", gather)
+        for k, attr in enumerate(group_attrs):
+            log.debug(
+                'Define("%s_%s", "SoAColumn(%s_soa%d,n%s,%d)")',
+                name,
+                attr,
+                name,
+                g,
+                name,
+                k,
+            )
+            df = df.Define(f"{name}_{attr}", f"SoAColumn({name}_soa{g},n{name},{k})")
 
     return df
@@ -4,10 +4,30 @@
 #include "ROOT/RVec.hxx"
 #include <algorithm>
 #include <cmath>
+#include <initializer_list>
+#include <iterator>
 
-ROOT::RVecB ECalGap(const ROOT::RVecF &eta, const ROOT::RVecF &deltaEtaSC)
+// This header is compiled into the leptons library and into every generated
+// selector library, so functions that are not templates must be inline.
+
+// Scalar overloads of the selection functions are used by the fused
+// selectors generated in leptons.py, which evaluate all cuts element by
+// element without RVec temporaries.
+
+inline bool ECalGap(float eta, float deltaEtaSC)
+{
+    float scEta = std::abs(eta + deltaEtaSC);
+    return scEta < 1.4442 || scEta > 1.566;
+}
+
+inline ROOT::RVecB ECalGap(const ROOT::RVecF &eta, const ROOT::RVecF &deltaEtaSC)
 {
-    return abs(eta + deltaEtaSC) < 1.4442 || abs(eta + deltaEtaSC) > 1.566;
+    ROOT::RVecB result(eta.size());
+    for (std::size_t i = 0; i < eta.size(); ++i)
+    {
+        result[i] = ECalGap(eta[i], deltaEtaSC[i]);
+    }
+    return result;
 };
 
 namespace ElectronVid
@@ -23,74 +43,121 @@ namespace ElectronVid
     const unsigned long GsfEleSCEtaMultiRangeCut = 00000000070;
     const unsigned long MinPtCut = 00000000007;
 
-    ROOT::RVecB Eval(const ROOT::RVecU &vid, int level, unsigned int mask = 0)
+    // The ten 3-bit cut fields are split into the even and the odd ones, so
+    // that each field gets a 6-bit slot. Adding 8 - level to every slot sets
+    // its carry bit (3) exactly if the field is >= level, without overflowing
+    // into the next slot, so all fields are tested with a few word operations.
+    const unsigned int FieldMask = 00707070707;
+    const unsigned int FieldOne = 00101010101;
+    const unsigned int FieldCarry = 01010101010;
+
+    constexpr unsigned int Addend(int level) { return (8 - level) * FieldOne; }
+
+    inline bool PassAddend(unsigned int vid, unsigned int addend)
+    {
+        unsigned int even = (vid & FieldMask) + addend;
+        unsigned int odd = ((vid >> 3) & FieldMask) + addend;
+        return (even & odd & FieldCarry) == FieldCarry;
+    };
+
+    /// Whether all cuts of vid not in mask pass level (0-4).
+    template <int level, unsigned int mask = 0>
+    inline bool Pass(unsigned int vid)
     {
-        ROOT::RVecB result;
-        result.reserve(vid.size());
+        static_assert(level >= 0 && level <= 4, "level must be 0-4");
+        return PassAddend(vid | mask, Addend(level));
+    };
 
-        auto vid1 = vid | mask;
-        std::transform(
-            vid1.begin(),
-            vid1.end(),
-            std::back_inserter(result),
-            [level](unsigned int v)
-            {
-                unsigned int v1 = v;
-                bool flag = true;
-                for (unsigned int i = 0; i < 10; ++i)
-                {
-                    flag &= (v & 07) >= level;
-                    v >>= 3;
-                }
-                return flag;
-            });
+    template <int level, unsigned int mask = 0, class T>
+    ROOT::RVecB Pass(const ROOT::RVec<T> &vid)
+    {
+        ROOT::RVecB result(vid.size());
+        for (std::size_t i = 0; i < vid.size(); ++i)
+        {
+            result[i] = Pass<level, mask>(vid[i]);
+        }
+        return result;
+    };
+
+    /// Highest level (0-4) passed by all cuts of vid not in mask.
+    inline unsigned char Level(unsigned int vid, unsigned int mask = 0)
+    {
+        unsigned int v = vid | mask;
+        return PassAddend(v, Addend(1)) + PassAddend(v, Addend(2)) +
+               PassAddend(v, Addend(3)) + PassAddend(v, Addend(4));
+    };
+
+    template <class T>
+    ROOT::RVec<unsigned char> Level(const ROOT::RVec<T> &vid, unsigned int mask = 0)
+    {
+        ROOT::RVec<unsigned char> result(vid.size());
+        for (std::size_t i = 0; i < vid.size(); ++i)
+        {
+            result[i] = Level(vid[i], mask);
+        }
+        return result;
+    };
+
+    inline bool Eval(unsigned int vid, int level, unsigned int mask = 0)
+    {
+        return PassAddend(vid | mask, Addend(level));
+    };
+
+    template <class T>
+    ROOT::RVecB Eval(const ROOT::RVec<T> &vid, int level, unsigned int mask = 0)
+    {
+        const unsigned int addend = Addend(level);
+        ROOT::RVecB result(vid.size());
+        for (std::size_t i = 0; i < vid.size(); ++i)
+        {
+            result[i] = PassAddend(vid[i] | mask, addend);
+        }
         return result;
     };
 };
 
-float square(float x) { return x * x; };
+inline float square(float x) { return x * x; }
 
-ROOT::RVecB HybridIso(const ROOT::RVecF &pt, ROOT::RVecF &iso, float f1 = 5.0, float f2 = 0.2, bool miniIsolation = false)
+inline bool HybridIso(float pt, float iso, float f1 = 5.0, float f2 = 0.2, bool miniIsolation = false)
 {
-    ROOT::RVecB result;
-    result.reserve(iso.size());
-
-    std::transform(
-        iso.begin(),
-        iso.end(),
-        pt.begin(),
-        std::back_inserter(result),
-        [f1, f2, miniIsolation](float iso, float pt)
+    float isolationWeight = 1.;
+    if (miniIsolation)
+    {
+        if (pt < 50.)
         {
-            float isolationWeight = 1.;
-            if (miniIsolation)
-            {
-                if (pt < 50.)
-                {
-                    isolationWeight = 0.42942652;
-                }
-                else if (pt < 200.)
-                {
-                    isolationWeight = square(tan(10.0 / pt) / tan(0.3));
-                }
-                else
-                {
-                    isolationWeight = 0.02616993;
-                }
-            }
-            if (pt <= 25.)
-            {
-                return (iso * pt) < f1 * isolationWeight;
-            }
-            else
-            {
-                return iso < f2 * isolationWeight;
-            }
-        });
+            isolationWeight = 0.42942652;
+        }
+        else if (pt < 200.)
+        {
+            isolationWeight = square(tan(10.0 / pt) / tan(0.3));
+        }
+        else
+        {
+            isolationWeight = 0.02616993;
+        }
+    }
+    if (pt <= 25.)
+    {
+        return (iso * pt) < f1 * isolationWeight;
+    }
+    else
+    {
+        return iso < f2 * isolationWeight;
+    }
+}
+
+inline ROOT::RVecB HybridIso(const ROOT::RVecF &pt, const ROOT::RVecF &iso, float f1 = 5.0, float f2 = 0.2, bool miniIsolation = false)
+{
+    ROOT::RVecB result(iso.size());
+    for (std::size_t i = 0; i < iso.size(); ++i)
+    {
+        result[i] = HybridIso(pt[i], iso[i], f1, f2, miniIsolation);
+    }
     return result;
 }
 
-ROOT::RVecI ElectronMerge(const ROOT::RVecF &eta1, const ROOT::RVecF &phi1, const ROOT::RVecF &eta2, const ROOT::RVecF &phi2)
+template <class V1, class V2>
+ROOT::RVecI ElectronMerge(const V1 &eta1, const V1 &phi1, const V2 &eta2, const V2 &phi2)
 {
     unsigned int n1 = eta1.size();
     unsigned int n2 = eta2.size();
@@ -100,7 +167,7 @@ ROOT::RVecI ElectronMerge(const ROOT::RVecF &eta1, const ROOT::RVecF &phi1, cons
         for (unsigned int i1 = 0; i1 < n1; ++i1)
         {
             float dphi = phi1[i1] - phi2[i2];
-            if (abs(dphi) > M_PI)
+            if (std::abs(dphi) > M_PI)
             {
                 dphi -= std::copysign(2 * M_PI, dphi);
             }
@@ -129,7 +196,8 @@ ROOT::RVecI ElectronMerge(const ROOT::RVecF &eta1, const ROOT::RVecF &phi1, cons
     return idx;
 }
 
-ROOT::RVecI LeptonMerge(const ROOT::RVecF &pt1, const ROOT::RVecF &pt2)
+template <class V1, class V2>
+ROOT::RVecI LeptonMerge(const V1 &pt1, const V2 &pt2)
 {
     unsigned int l1 = pt1.size();
     unsigned int l2 = pt2.size();
@@ -159,7 +227,7 @@ ROOT::RVecI LeptonMerge(const ROOT::RVecF &pt1, const ROOT::RVecF &pt2)
     }
     while (i2 < l2)
     {
-        idx.emplace_back(i2);
+        idx.emplace_back(i2 ^ 0xFFFFFFFF);
         ++i2;
     }
 
@@ -241,4 +309,242 @@ ROOT::RVec<T> ElectronMergeCopy(const ROOT::RVecI &idx, const T v1, const T v2)
     };
     return r;
 }
+
+// Indexed views
+//
+// An IndexedView refers to one or two original collections and an index list
+// (i for the first, i ^ 0xFFFFFFFF for the second). Elements are only read
+// when the view is iterated, so a derived collection costs one index list
+// per event instead of one copy per attribute. The referenced columns must
+// outlive the view, which holds within the processing of one entry.
+//
+// Views only have const iteration, so they are not data containers for
+// RDataFrame actions: gather() them into a RVec to fill histograms.
+
+template <class T>
+class IndexedView
+{
+private:
+    const ROOT::RVecI *idx_ = nullptr;
+    const ROOT::RVec<T> *v1_ = nullptr;
+    const ROOT::RVec<T> *v2_ = nullptr;
+
+public:
+    class const_iterator
+    {
+    private:
+        const IndexedView *view_;
+        std::size_t pos_;
+
+    public:
+        using iterator_category = std::forward_iterator_tag;
+        using value_type = T;
+        using difference_type = std::ptrdiff_t;
+        using pointer = const T *;
+        using reference = const T &;
+
+        const_iterator(const IndexedView *view, std::size_t pos) : view_(view), pos_(pos) {}
+        reference operator*() const { return (*view_)[pos_]; }
+        const_iterator &operator++()
+        {
+            ++pos_;
+            return *this;
+        }
+        const_iterator operator++(int)
+        {
+            auto it = *this;
+            ++pos_;
+            return it;
+        }
+        bool operator==(const const_iterator &other) const { return pos_ == other.pos_; }
+        bool operator!=(const const_iterator &other) const { return pos_ != other.pos_; }
+    };
+    using iterator = const_iterator;
+    using value_type = T;
+    using size_type = std::size_t;
+
+    IndexedView() = default;
+    IndexedView(const ROOT::RVecI &idx, const ROOT::RVec<T> &v1) : idx_(&idx), v1_(&v1) {}
+    IndexedView(const ROOT::RVecI &idx, const ROOT::RVec<T> &v1, const ROOT::RVec<T> &v2) : idx_(&idx), v1_(&v1), v2_(&v2) {}
+
+    std::size_t size() const { return idx_ ? idx_->size() : 0; }
+    bool empty() const { return size() == 0; }
+    const T &operator[](std::size_t i) const
+    {
+        int j = (*idx_)[i];
+        return j < 0 ? (*v2_)[j ^ 0xFFFFFFFF] : (*v1_)[j];
+    }
+    const_iterator begin() const { return const_iterator(this, 0); }
+    const_iterator end() const { return const_iterator(this, size()); }
+    const_iterator begin() { return const_iterator(this, 0); }
+    const_iterator end() { return const_iterator(this, size()); }
+
+    const ROOT::RVecI &index() const { return *idx_; }
+    const ROOT::RVec<T> &source() const { return *v1_; }
+
+    ROOT::RVec<T> gather() const
+    {
+        ROOT::RVec<T> r;
+        r.reserve(size());
+        for (std::size_t i = 0; i < size(); ++i)
+        {
+            r.emplace_back((*this)[i]);
+        }
+        return r;
+    }
+};
+
+template <class M>
+ROOT::RVecI MaskIndex(const ROOT::RVec<M> &mask)
+{
+    ROOT::RVecI idx;
+    idx.reserve(mask.size());
+    for (unsigned int i = 0; i < mask.size(); ++i)
+    {
+        if (mask[i])
+        {
+            idx.emplace_back(i);
+        }
+    }
+    return idx;
+}
+
+// Map merged indices into the selected collections to original indices
+inline ROOT::RVecI ComposeIndex(const ROOT::RVecI &idx, const ROOT::RVecI &idx1, const ROOT::RVecI &idx2)
+{
+    ROOT::RVecI r;
+    r.reserve(idx.size());
+    for (auto i : idx)
+    {
+        r.emplace_back(i < 0 ? idx2[i ^ 0xFFFFFFFF] ^ 0xFFFFFFFF : idx1[i]);
+    }
+    return r;
+}
+
+template <class T>
+IndexedView<T> MakeView(const ROOT::RVecI &idx, const ROOT::RVec<T> &v1)
+{
+    return IndexedView<T>(idx, v1);
+}
+
+template <class T>
+IndexedView<T> MakeView(const ROOT::RVecI &idx, const ROOT::RVec<T> &v1, const ROOT::RVec<T> &v2)
+{
+    return IndexedView<T>(idx, v1, v2);
+}
+
+// Fused selection and merge
+//
+// The *SelectMerge functions return the merged indices into the original
+// collections (i for the first, i ^ 0xFFFFFFFF for the second). LeptonGather
+// then copies all attributes of one type in a single traversal into one
+// buffer, attribute after attribute, and SoAColumn returns a non-owning view
+// of one attribute in that buffer.
+
+template <class M>
+unsigned int NextSelected(const ROOT::RVec<M> &mask, unsigned int i)
+{
+    while (i < mask.size() && !mask[i])
+    {
+        ++i;
+    }
+    return i;
+}
+
+template <class M1, class M2>
+ROOT::RVecI LeptonSelectMerge(const ROOT::RVec<M1> &mask1, const ROOT::RVecF &pt1, const ROOT::RVec<M2> &mask2, const ROOT::RVecF &pt2)
+{
+    unsigned int l1 = mask1.size();
+    unsigned int l2 = mask2.size();
+    ROOT::RVecI idx;
+    idx.reserve(l1 + l2);
+
+    unsigned int i1 = NextSelected(mask1, 0);
+    unsigned int i2 = NextSelected(mask2, 0);
+    while (i1 < l1 && i2 < l2)
+    {
+        if (pt1[i1] > pt2[i2])
+        {
+            idx.emplace_back(i1);
+            i1 = NextSelected(mask1, i1 + 1);
+        }
+        else
+        {
+            idx.emplace_back(i2 ^ 0xFFFFFFFF);
+            i2 = NextSelected(mask2, i2 + 1);
+        }
+    }
+    for (; i1 < l1; i1 = NextSelected(mask1, i1 + 1))
+    {
+        idx.emplace_back(i1);
+    }
+    for (; i2 < l2; i2 = NextSelected(mask2, i2 + 1))
+    {
+        idx.emplace_back(i2 ^ 0xFFFFFFFF);
+    }
+    return idx;
+}
+
+template <class M1, class M2>
+ROOT::RVecI ElectronSelectMerge(const ROOT::RVec<M1> &mask1, const ROOT::RVecF &eta1, const ROOT::RVecF &phi1,
+                                const ROOT::RVec<M2> &mask2, const ROOT::RVecF &eta2, const ROOT::RVecF &phi2)
+{
+    unsigned int n1 = mask1.size();
+    unsigned int n2 = mask2.size();
+    ROOT::RVecI idx;
+    idx.reserve(n1 + n2);
+    for (unsigned int i1 = NextSelected(mask1, 0); i1 < n1; i1 = NextSelected(mask1, i1 + 1))
+    {
+        idx.emplace_back(i1);
+    }
+    unsigned int nr1 = idx.size();
+    for (unsigned int i2 = NextSelected(mask2, 0); i2 < n2; i2 = NextSelected(mask2, i2 + 1))
+    {
+        bool ok = true;
+        for (unsigned int k = 0; k < nr1; ++k)
+        {
+            unsigned int i1 = idx[k];
+            float dphi = phi1[i1] - phi2[i2];
+            if (std::abs(dphi) > M_PI)
+            {
+                dphi -= std::copysign(2 * M_PI, dphi);
+            }
+            float deta = eta1[i1] - eta2[i2];
+            if (dphi * dphi + deta * deta < 0.1 * 0.1)
+            {
+                ok = false;
+                break;
+            }
+        }
+        if (ok)
+        {
+            idx.emplace_back(i2 ^ 0xFFFFFFFF);
+        }
+    }
+    return idx;
+}
+
+template <class T, class U>
+ROOT::RVec<T> LeptonGather(const ROOT::RVecI &idx, std::initializer_list<const ROOT::RVec<T> *> v1, std::initializer_list<const ROOT::RVec<U> *> v2)
+{
+    std::size_t n = idx.size();
+    ROOT::RVec<T> r(n * v1.size());
+    auto out = r.begin();
+    auto a2 = v2.begin();
+    for (auto a1 : v1)
+    {
+        for (auto i : idx)
+        {
+            *out++ = i < 0 ? static_cast<T>((**a2)[i ^ 0xFFFFFFFF]) : (*a1)[i];
+        }
+        ++a2;
+    }
+    return r;
+}
+
+template <class T>
+ROOT::RVec<T> SoAColumn(const ROOT::RVec<T> &buffer, std::size_t n, std::size_t k)
+{
+    return ROOT::RVec<T>(const_cast<T *>(buffer.data()) + k * n, n);
+}
 #endif
@@ -0,0 +1,38 @@
+// Source of the precompiled leptons library, see leptons.init()
+//
+// Explicit instantiations for the RVec element types of NanoAOD lepton
+// attributes (Float_t, Int_t, UChar_t, Short_t) and for the RVec<int> masks
+// returned by the selection expressions.
+
+#include "leptons_inc.hxx"
+
+#define LEPTONS_INSTANTIATE(T)                                                                                                    \
+    template ROOT::RVec<T> MergeCopy<T>(const ROOT::RVecI &, const ROOT::RVec<T> &, const ROOT::RVec<T>);                       \
+    template ROOT::RVec<T> LeptonGather<T, T>(const ROOT::RVecI &, std::initializer_list<const ROOT::RVec<T> *>,                \
+                                              std::initializer_list<const ROOT::RVec<T> *>);                                    \
+    template ROOT::RVec<T> SoAColumn<T>(const ROOT::RVec<T> &, std::size_t, std::size_t);                                       \
+    template class IndexedView<T>;                                                                                              \
+    template IndexedView<T> MakeView<T>(const ROOT::RVecI &, const ROOT::RVec<T> &);                                            \
+    template IndexedView<T> MakeView<T>(const ROOT::RVecI &, const ROOT::RVec<T> &, const ROOT::RVec<T> &);
+
+LEPTONS_INSTANTIATE(float)
+LEPTONS_INSTANTIATE(int)
+LEPTONS_INSTANTIATE(unsigned char)
+LEPTONS_INSTANTIATE(short)
+
+template ROOT::RVecI LeptonMerge<ROOT::RVecF, ROOT::RVecF>(const ROOT::RVecF &, const ROOT::RVecF &);
+template ROOT::RVecI LeptonMerge<IndexedView<float>, IndexedView<float>>(const IndexedView<float> &, const IndexedView<float> &);
+template ROOT::RVecI ElectronMerge<ROOT::RVecF, ROOT::RVecF>(const ROOT::RVecF &, const ROOT::RVecF &,
+                                                             const ROOT::RVecF &, const ROOT::RVecF &);
+template ROOT::RVecI ElectronMerge<IndexedView<float>, IndexedView<float>>(const IndexedView<float> &, const IndexedView<float> &,
+                                                                           const IndexedView<float> &, const IndexedView<float> &);
+template ROOT::RVecI LeptonSelectMerge<int, int>(const ROOT::RVecI &, const ROOT::RVecF &, const ROOT::RVecI &, const ROOT::RVecF &);
+template ROOT::RVecI ElectronSelectMerge<int, int>(const ROOT::RVecI &, const ROOT::RVecF &, const ROOT::RVecF &,
+                                                   const ROOT::RVecI &, const ROOT::RVecF &, const ROOT::RVecF &);
+template ROOT::RVecI MaskIndex<int>(const ROOT::RVecI &);
+
+// Electron_vidNestedWPBitmap is Int_t
+template ROOT::RVecB ElectronVid::Eval<int>(const ROOT::RVecI &, int, unsigned int);
+template ROOT::RVec<unsigned char> ElectronVid::Level<int>(const ROOT::RVecI &, unsigned int);
+template ROOT::RVecB ElectronVid::Pass<1, 0, int>(const ROOT::RVecI &);
+template ROOT::RVecB ElectronVid::Pass<1, ElectronVid::GsfEleRelPFIsoScaledCut, int>(const ROOT::RVecI &);
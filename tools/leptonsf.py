@@ -0,0 +1,169 @@
+"""Lepton scale factors for RDataFrame.
+
+Scale factors binned in pt and eta are loaded once into SFTable objects
+(see leptonsf_inc.hxx), from TH2 histograms or from JSON files, and looked
+up per selected lepton inside the event loop.
+
+The JSON format is:
+
+    {
+        "pt_edges": [5.0, 10.0, 20.0, 50.0],
+        "eta_edges": [0.0, 1.2, 2.4],
+        "values": [[...], ...],     # pt bins x eta bins
+        "errors": [[...], ...],
+        "abs_eta": true
+    }
+
+The configuration lists the tables for each collection:
+
+    GoodMuon:
+      - file: muon_sf.root
+        histogram: NUM_LooseID_DEN_TrackerMuons_abseta_pt
+        pt_axis: y
+        abs_eta: true
+    GoodElec:
+      - json: electron_sf.json
+
+Example:
+    from tools import leptonsf
+
+    config = leptonsf.read_config(path)
+    df = leptonsf.def_lepton_sf(df, "new_reweightLeptonSF", config)
+"""
+
+import json
+import logging
+import pathlib
+from typing import Any
+
+import ROOT
+import ruamel.yaml
+
+log = logging.getLogger("mrtools.tools")
+
+RDataFrame = Any
+
+TOOLS_PATH = pathlib.Path(__file__).parent
+
+_initialized = False
+
+# Index in LeptonSFTables by table definition
+_tables: dict[str, int] = {}
+
+
+def init() -> None:
+    """Load the C++ routines."""
+    global _initialized
+    if _initialized:
+        return
+    log.debug("Load lepton SF C++ routines.")
+    ROOT.gInterpreter.AddIncludePath(str(TOOLS_PATH))
+    ROOT.gInterpreter.Declare('#include "leptonsf_inc.hxx"')
+    _initialized = True
+
+
+def read_config(path: pathlib.Path) -> dict[str, list[dict[str, Any]]]:
+    with open(path, "r") as inp:
+        return ruamel.yaml.YAML(typ="safe").load(inp)
+
+
+def _from_histogram(
+    file: str, histogram: str, pt_axis: str
+) -> tuple[list[float], list[float], list[list[float]], list[list[float]]]:
+    root_file = ROOT.TFile.Open(file)
+    if not root_file or root_file.IsZombie():
+        raise FileNotFoundError(file)
+    histo = root_file.Get(histogram)
+    if not histo:
+        raise KeyError(f"{histogram} not in {file}")
+
+    x_axis, y_axis = histo.GetXaxis(), histo.GetYaxis()
+    x_edges = [x_axis.GetBinLowEdge(i) for i in range(1, x_axis.GetNbins() + 2)]
+    y_edges = [y_axis.GetBinLowEdge(i) for i in range(1, y_axis.GetNbins() + 2)]
+    values = [
+        [histo.GetBinContent(i, j) for j in range(1, y_axis.GetNbins() + 1)]
+        for i in range(1, x_axis.GetNbins() + 1)
+    ]
+    errors = [
+        [histo.GetBinError(i, j) for j in range(1, y_axis.GetNbins() + 1)]
+        for i in range(1, x_axis.GetNbins() + 1)
+    ]
+    root_file.Close()
+
+    if pt_axis == "x":
+        return x_edges, y_edges, values, errors
+    return (
+        y_edges,
+        x_edges,
+        [list(row) for row in zip(*values)],
+        [list(row) for row in zip(*errors)],
+    )
+
+
+def input_files(config: dict[str, list[dict[str, Any]]]) -> list[pathlib.Path]:
+    """Files of the tables of a configuration."""
+    return [
+        pathlib.Path(table.get("json") or table["file"])
+        for tables in config.values()
+        for table in tables
+    ]
+
+
+def load_table(definition: dict[str, Any]) -> int:
+    """Load a table once, returning its index in LeptonSFTables."""
+    init()
+    key = json.dumps(definition, sort_keys=True)
+    if key in _tables:
+        return _tables[key]
+
+    if "json" in definition:
+        with open(definition["json"], "r") as inp:
+            data = json.load(inp)
+        pt_edges, eta_edges = data["pt_edges"], data["eta_edges"]
+        values, errors = data["values"], data["errors"]
+        abs_eta = data.get("abs_eta", definition.get("abs_eta", True))
+    else:
+        pt_edges, eta_edges, values, errors = _from_histogram(
+            definition["file"], definition["histogram"], definition.get("pt_axis", "x")
+        )
+        abs_eta = definition.get("abs_eta", True)
+
+    shape = (len(pt_edges) - 1, len(eta_edges) - 1)
+    if len(values) != shape[0] or any(len(row) != shape[1] for row in values):
+        raise ValueError(f"Scale factor table {key} does not match its edges")
+
+    table = ROOT.SFTable(
+        ROOT.std.vector["double"](pt_edges),
+        ROOT.std.vector["double"](eta_edges),
+        ROOT.std.vector["float"]([v for row in values for v in row]),
+        ROOT.std.vector["float"]([e for row in errors for e in row]),
+        abs_eta,
+    )
+    ROOT.LeptonSFTables.push_back(table)
+    _tables[key] = ROOT.LeptonSFTables.size() - 1
+    log.info("Loaded lepton SF table %s", key)
+    return _tables[key]
+
+
+def def_lepton_sf(
+    df: RDataFrame, name: str, config: dict[str, list[dict[str, Any]]]
+) -> RDataFrame:
+    """Define the event lepton scale factor and its variations.
+
+    Defines name, nameUp and nameDown as the product over the collections
+    and tables of config of the scale factors of all leptons. The
+    variations shift all scale factors by their error.
+    """
+    for suffix, variation in [("", 0), ("Up", 1), ("Down", -1)]:
+        factors = []
+        for collection, definitions in config.items():
+            for definition in definitions:
+                index = load_table(definition)
+                factors.append(
+                    f"LeptonSF(LeptonSFTables[{index}], {collection}_pt, "
+                    f"{collection}_eta, {variation})"
+                )
+        expr = "*".join(factors) if factors else "1."
+        log.debug('Define("%s%s", "%s")', name, suffix, expr)
+        df = df.Define(f"{name}{suffix}", expr)
+    return df
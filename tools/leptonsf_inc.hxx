@@ -0,0 +1,63 @@
+#ifndef LEPTONSF_INC_HXX
+#define LEPTONSF_INC_HXX
+
+#include "ROOT/RVec.hxx"
+
+#include <algorithm>
+#include <cmath>
+#include <deque>
+#include <vector>
+
+/// Scale factors binned in pt and eta.
+///
+/// Values and errors are stored row-major in contiguous arrays, and bins are
+/// found by binary search on the edges. Leptons outside the table get the
+/// scale factor of the closest bin.
+class SFTable
+{
+private:
+    std::vector<double> ptEdges_;
+    std::vector<double> etaEdges_;
+    std::vector<float> values_;
+    std::vector<float> errors_;
+    bool absEta_;
+
+    static std::size_t Bin(const std::vector<double> &edges, double x)
+    {
+        auto it = std::upper_bound(edges.begin() + 1, edges.end() - 1, x);
+        return it - edges.begin() - 1;
+    }
+
+public:
+    SFTable(const std::vector<double> &ptEdges, const std::vector<double> &etaEdges,
+            const std::vector<float> &values, const std::vector<float> &errors, bool absEta)
+        : ptEdges_(ptEdges), etaEdges_(etaEdges), values_(values), errors_(errors), absEta_(absEta)
+    {
+    }
+
+    /// Scale factor, shifted by variation (-1, 0, +1) times its error.
+    float operator()(float pt, float eta, int variation = 0) const
+    {
+        std::size_t i = Bin(ptEdges_, pt) * (etaEdges_.size() - 1) + Bin(etaEdges_, absEta_ ? std::abs(eta) : eta);
+        return values_[i] + variation * errors_[i];
+    }
+};
+
+/// Tables registered by tools/leptonsf.py, a deque keeps references stable.
+std::deque<SFTable> LeptonSFTables;
+
+/// Product of the scale factors of all leptons of an event.
+///
+/// V is a RVec or an IndexedView.
+template <class V>
+double LeptonSF(const SFTable &table, const V &pt, const V &eta, int variation = 0)
+{
+    double sf = 1.;
+    for (std::size_t i = 0; i < pt.size(); ++i)
+    {
+        sf *= table(pt[i], eta[i], variation);
+    }
+    return sf;
+}
+
+#endif
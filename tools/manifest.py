@@ -0,0 +1,284 @@
+"""Resumable per-file tasks with a persistent manifest.
+
+Every task turns one input file into one output file. The manifest is a JSON
+file with the state of each task (pending, running, done or failed), its
+attempts, the last error, and the size and adler32 checksum of its output:
+
+    {
+        "tasks": {
+            "/path/to/output.root": {"input": "...", "state": "done", ...},
+            ...
+        }
+    }
+
+A rerun skips the tasks that are done and whose output is still there, and
+runs the others again. Failed tasks are retried with exponential backoff.
+Throughput (files/s and MB/s of input) is reported per worker process.
+
+Example:
+    from tools import manifest
+
+    jobs = [manifest.Job(input, output, convert, (input, output))]
+    manifest.run(manifest.Manifest(path), jobs, workers=10)
+"""
+
+import concurrent.futures
+import dataclasses
+import heapq
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+
+log = logging.getLogger("mrtools.tools")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+RETRIES = 3
+BACKOFF = 30.0
+SAVE_INTERVAL = 10.0
+CHUNK = 16 * 1024 * 1024
+
+
+@dataclass
+class Task:
+    """State of the task writing an output file."""
+
+    input: str
+    state: str = PENDING
+    attempts: int = 0
+    error: str | None = None
+    input_bytes: int | None = None
+    output_bytes: int | None = None
+    checksum: str | None = None
+    seconds: float | None = None
+
+
+@dataclass
+class Job:
+    """Task to run, function(*args) writes output from input."""
+
+    input: str
+    output: str
+    function: Callable
+    args: tuple[Any, ...] = ()
+
+
+@dataclass
+class _Throughput:
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+def checksum(path: str | pathlib.Path) -> str:
+    """Adler32 of a file, as hex digits."""
+    value = 1
+    with open(path, "rb") as inp:
+        while chunk := inp.read(CHUNK):
+            value = zlib.adler32(chunk, value)
+    return f"{value:08x}"
+
+
+class Manifest:
+    """Tasks by output path, saved to a JSON file."""
+
+    path: pathlib.Path
+    tasks: dict[str, Task]
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.tasks = {}
+        if path.exists():
+            with open(path, "r") as inp:
+                for output, data in json.load(inp)["tasks"].items():
+                    self.tasks[output] = Task(**data)
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as out:
+            tasks = {o: dataclasses.asdict(t) for o, t in self.tasks.items()}
+            json.dump({"tasks": tasks}, out, indent=1, sort_keys=True)
+        tmp.replace(self.path)
+
+    def finished(self, output: str, verify: bool = False) -> bool:
+        """Whether the task is done and its output unchanged."""
+        task = self.tasks.get(output)
+        if task is None or task.state != DONE:
+            return False
+        try:
+            if os.stat(output).st_size != task.output_bytes:
+                return False
+        except OSError:
+            return False
+        return not verify or checksum(output) == task.checksum
+
+    def summary(self) -> dict[str, int]:
+        result = {s: 0 for s in (PENDING, RUNNING, DONE, FAILED)}
+        for task in self.tasks.values():
+            result[task.state] += 1
+        return result
+
+
+def _run_job(function: Callable, args: tuple[Any, ...]) -> tuple[int, float]:
+    start = time.perf_counter()
+    function(*args)
+    return os.getpid(), time.perf_counter() - start
+
+
+def _report(throughput: dict[int, _Throughput], wall: float) -> None:
+    for pid, t in sorted(throughput.items()):
+        busy = t.seconds or 1e-9
+        log.info(
+            "Worker %d: %d files, %.2f files/s, %.1f MB/s, %.0f%% busy",
+            pid,
+            t.files,
+            t.files / busy,
+            t.bytes / busy / 1e6,
+            100 * t.seconds / max(wall, 1e-9),
+        )
+    files = sum(t.files for t in throughput.values())
+    size = sum(t.bytes for t in throughput.values())
+    if wall > 0:
+        log.info(
+            "Total: %d files in %.0f s, %.2f files/s, %.1f MB/s",
+            files,
+            wall,
+            files / wall,
+            size / wall / 1e6,
+        )
+
+
+def run(
+    manifest: Manifest,
+    jobs: list[Job],
+    workers: int | None = None,
+    retries: int = RETRIES,
+    backoff: float = BACKOFF,
+    verify: bool = False,
+) -> bool:
+    """Run the jobs not finished yet, retrying failures.
+
+    Args:
+        manifest: state of the tasks, updated and saved while running.
+        jobs: all jobs, the finished ones are skipped.
+        workers: number of processes.
+        retries: attempts per job in this run.
+        backoff: delay before the first retry, doubled for each further one.
+        verify: compare the checksums of finished outputs, not only sizes.
+
+    Returns:
+        Whether all jobs are done.
+    """
+    # Delayed jobs by time to run and attempt in this run
+    queue: list[tuple[float, int, int]] = []
+    for i, job in enumerate(jobs):
+        if manifest.finished(job.output, verify):
+            continue
+        task = manifest.tasks.setdefault(job.output, Task(job.input))
+        task.state = PENDING
+        heapq.heappush(queue, (0.0, i, 1))
+    log.info("%d of %d jobs to run", len(queue), len(jobs))
+    manifest.save()
+    if not queue:
+        return True
+
+    throughput: dict[int, _Throughput] = {}
+    start = last_save = time.monotonic()
+    # ROOT may already run threads, do not fork
+    context = multiprocessing.get_context("spawn")
+    executor = concurrent.futures.ProcessPoolExecutor(workers, context)
+    broken = False
+    crashes: dict[int, int] = {}
+    running: dict[concurrent.futures.Future, tuple[int, int]] = {}
+    try:
+        while queue or running:
+            now = time.monotonic()
+            if broken and not running:
+                # A worker crashed, the pool is unusable
+                executor.shutdown()
+                executor = concurrent.futures.ProcessPoolExecutor(workers, context)
+                broken = False
+            while queue and queue[0][0] <= now and not broken:
+                _, i, attempt = heapq.heappop(queue)
+                job = jobs[i]
+                task = manifest.tasks[job.output]
+                task.state = RUNNING
+                task.attempts += 1
+                task.input_bytes = os.stat(job.input).st_size
+                pathlib.Path(job.output).parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    future = executor.submit(_run_job, job.function, job.args)
+                except concurrent.futures.process.BrokenProcessPool:
+                    broken = True
+                    task.attempts -= 1
+                    heapq.heappush(queue, (0.0, i, attempt))
+                    break
+                running[future] = (i, attempt)
+
+            timeout = max(queue[0][0] - now, 0) if queue else None
+            finished, _ = concurrent.futures.wait(
+                running, timeout, concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                i, attempt = running.pop(future)
+                job = jobs[i]
+                task = manifest.tasks[job.output]
+                try:
+                    pid, seconds = future.result()
+                    task.output_bytes = os.stat(job.output).st_size
+                    task.checksum = checksum(job.output)
+                except concurrent.futures.process.BrokenProcessPool as e:
+                    # Any of the running jobs may have crashed the pool, retry
+                    # all of them without backoff, up to the number of retries
+                    broken = True
+                    task.state = FAILED
+                    task.error = str(e)
+                    crashes[i] = crashes.get(i, 0) + 1
+                    if crashes[i] <= retries:
+                        heapq.heappush(queue, (0.0, i, attempt))
+                    else:
+                        log.error("%s crashed the workers, giving up", job.input)
+                    continue
+                except Exception as e:
+                    task.state = FAILED
+                    task.error = str(e) or type(e).__name__
+                    if attempt < retries:
+                        delay = backoff * 2 ** (attempt - 1)
+                        log.warning(
+                            "%s failed (%s), retry in %.0f s", job.input, e, delay
+                        )
+                        heapq.heappush(
+                            queue, (time.monotonic() + delay, i, attempt + 1)
+                        )
+                    else:
+                        log.error("%s failed (%s), giving up", job.input, e)
+                    continue
+                task.state = DONE
+                task.error = None
+                task.seconds = seconds
+                t = throughput.setdefault(pid, _Throughput())
+                t.files += 1
+                t.bytes += task.input_bytes or 0
+                t.seconds += seconds
+
+            if time.monotonic() - last_save > SAVE_INTERVAL:
+                manifest.save()
+                last_save = time.monotonic()
+    finally:
+        executor.shutdown(cancel_futures=True)
+        manifest.save()
+
+    _report(throughput, time.monotonic() - start)
+    summary = manifest.summary()
+    log.info("Tasks: %s", ", ".join(f"{n} {s}" for s, n in summary.items()))
+    return all(manifest.tasks[job.output].state == DONE for job in jobs)
@@ -1,5 +1,22 @@
-"""Auxiliary scripts for jsonpog-integration."""
+"""Auxiliary scripts for jsonpog-integration.
 
+The corrections are read with the C++ interface of correctionlib. Each
+correction is loaded once per process and cached by period, and evaluated
+by a PogCorrection object (see pog_inc.hxx) with preallocated inputs per
+RDataFrame slot, so that implicit MT runs evaluate without locks and without
+allocations.
+
+The JSON files are read from the jsonpog-integration submodule, or from
+$STOPS_JSONPOG if set, so that a small local fixture can be used instead.
+
+Example:
+    from tools import pog
+
+    df = pog.def_pileup_weight(df, "new_reweightPU", period)
+"""
+
+import os
+import pathlib
 from typing import Any
 import logging
 
@@ -9,17 +26,103 @@ log = logging.getLogger("mrtools.tools")
 
 RDataFrame = Any
 
-ROOT."""
-std::unique_ptr<Correction::Cset> PileupCorrection;
-"""
+JSONPOG_PATH = pathlib.Path(
+    os.environ.get(
+        "STOPS_JSONPOG",
+        pathlib.Path(__file__).parent.parent / "jsonpog-integration" / "POG",
+    )
+)
 
-def def_pileup_weight(df: RDataFrame, name: str, period: str) -> RDataFrame:
-    
-    """
-    PileupCorrection = new Correction::CSet()
+# File and correction name of the pileup weights per period
+PILEUP = {
+    "Run2016preVFP": (
+        "LUM/2016preVFP_UL/puWeights.json.gz",
+        "Collisions16_UltraLegacy_goldenJSON",
+    ),
+    "Run2016postVFP": (
+        "LUM/2016postVFP_UL/puWeights.json.gz",
+        "Collisions16_UltraLegacy_goldenJSON",
+    ),
+    "Run2017": (
+        "LUM/2017_UL/puWeights.json.gz",
+        "Collisions17_UltraLegacy_goldenJSON",
+    ),
+    "Run2018": (
+        "LUM/2018_UL/puWeights.json.gz",
+        "Collisions18_UltraLegacy_goldenJSON",
+    ),
+}
+
+SYSTEMATICS = ["nominal", "up", "down"]
+
+_initialized = False
+
+# C++ name of the evaluator by (file, correction, number of slots)
+_evaluators: dict[tuple[pathlib.Path, str, int], str] = {}
+
+
+def init() -> None:
+    """Load correctionlib and the C++ helpers."""
+    global _initialized
+    if _initialized:
+        return
+
+    import correctionlib
+
+    log.debug("Load correctionlib.")
+    correctionlib.register_pyroot_binding()
+    ROOT.gInterpreter.AddIncludePath(str(pathlib.Path(__file__).parent))
+    ROOT.gInterpreter.Declare('#include "pog_inc.hxx"')
+    _initialized = True
+
+
+def evaluator(path: pathlib.Path, correction: str, nr_slots: int) -> str:
+    """Name of the C++ evaluator of a correction, loading it if needed."""
+    init()
+    key = (path.resolve(), correction, nr_slots)
+    if key not in _evaluators:
+        name = f"PogCorrection_{len(_evaluators)}"
+        log.info("Load %s from %s", correction, path)
+        systematics = ", ".join(f'"{s}"' for s in SYSTEMATICS)
+        if not ROOT.gInterpreter.Declare(
+            f'PogCorrection {name}("{key[0]}", "{correction}", {nr_slots}, '
+            f"{{{systematics}}});"
+        ):
+            raise RuntimeError(f"Failed to load {correction} from {path}")
+        _evaluators[key] = name
+    return _evaluators[key]
+
+
+def pileup_files() -> list[pathlib.Path]:
+    """JSON files of the pileup weights of all periods."""
+    return [JSONPOG_PATH / file for file, _ in PILEUP.values()]
+
+
+def def_pileup_weight(
+    df: RDataFrame,
+    name: str,
+    period: str,
+    column: str = "Pileup_nTrueInt",
+    path: pathlib.Path | None = None,
+) -> RDataFrame:
+    """Define the pileup weight and its variations.
+
+    Defines name, nameUp and nameDown.
+
+    Args:
+        df: input dataframe.
+        name: name of the weight column.
+        period: data taking period, a key of PILEUP.
+        column: number of true interactions.
+        path: JSON file, instead of the one of the period.
     """
-    log.debug('Define(%s, PileupCorrection->evaluate(BlaBla,"nominal"))', name)
-    return df.Define(
-        name, 
-        f'PileupCorrection->evaluate(,"nominal")'
-    )
\ No newline at end of file
+    file, correction = PILEUP[period]
+    if path is None:
+        path = JSONPOG_PATH / file
+    pileup = evaluator(path, correction, df.GetNSlots())
+
+    for suffix, systematic in [("", "nominal"), ("Up", "up"), ("Down", "down")]:
+        expr = f"{pileup}(rdfslot_, {column}, {SYSTEMATICS.index(systematic)})"
+        log.debug('Define("%s%s", "%s")', name, suffix, expr)
+        df = df.Define(f"{name}{suffix}", expr)
+    return df
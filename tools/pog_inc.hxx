@@ -0,0 +1,46 @@
+#ifndef POG_INC_HXX
+#define POG_INC_HXX
+
+#include "correction.h"
+
+#include <string>
+#include <vector>
+
+/// Correction evaluator with preallocated inputs per processing slot.
+///
+/// correction::Correction::evaluate is const and thread safe, but takes its
+/// inputs as a vector of variants. Each slot keeps one such vector per
+/// systematic, so an evaluation only assigns the numeric input, without
+/// allocations or locking.
+class PogCorrection
+{
+private:
+    correction::Correction::Ref correction_;
+    std::vector<std::string> systematics_;
+    std::vector<std::vector<std::vector<correction::Variable::Type>>> inputs_;
+
+public:
+    PogCorrection(const std::string &file, const std::string &name, unsigned int nSlots,
+                  const std::vector<std::string> &systematics = {"nominal", "up", "down"})
+        : correction_(correction::CorrectionSet::from_file(file)->at(name)), systematics_(systematics)
+    {
+        inputs_.resize(nSlots);
+        for (auto &slot : inputs_)
+        {
+            for (const auto &systematic : systematics_)
+            {
+                slot.push_back({0.0, systematic});
+            }
+        }
+    }
+
+    /// Evaluate for one input value and the systematic with the given index.
+    double operator()(unsigned int slot, double x, std::size_t systematic = 0)
+    {
+        auto &inputs = inputs_[slot][systematic];
+        inputs[0] = x;
+        return correction_->evaluate(inputs);
+    }
+};
+
+#endif
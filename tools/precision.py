@@ -0,0 +1,94 @@
+"""Reduced precision of float columns.
+
+Float columns matching a rule are rounded to fewer mantissa bits (see
+precision_inc.hxx) before they are written, as NanoAOD does for many of its
+own columns. The zeroed low bits compress to almost nothing. Rules are glob
+patterns of column names with the number of mantissa bits kept, out of 23;
+the first matching rule applies.
+
+Example:
+    from tools import precision
+
+    rules = precision.parse_rules(["*_phi=10"]) | precision.PRECISION
+    df = precision.def_reduced(df, schema, rules)
+"""
+
+import fnmatch
+import logging
+import pathlib
+from typing import Any
+
+import ROOT
+
+log = logging.getLogger("mrtools.tools")
+
+RDataFrame = Any
+
+TOOLS_PATH = pathlib.Path(__file__).parent
+
+# Mantissa bits by column pattern, lossy also for columns cut on (eta, dxy, dz)
+PRECISION = {
+    "*_eta": 12,
+    "*_phi": 12,
+    "*_deltaEtaSC": 10,
+    "*_dxy": 10,
+    "*_dz": 10,
+    "*_pfRelIso*": 8,
+    "*_miniPFRelIso*": 8,
+}
+
+FLOAT_TYPES = {
+    "Float_t",
+    "float",
+    "ROOT::VecOps::RVec<Float_t>",
+    "ROOT::VecOps::RVec<float>",
+}
+
+_initialized = False
+
+
+def init() -> None:
+    """Load the C++ routines."""
+    global _initialized
+    if _initialized:
+        return
+    log.debug("Load precision C++ routines.")
+    ROOT.gInterpreter.AddIncludePath(str(TOOLS_PATH))
+    ROOT.gInterpreter.Declare('#include "precision_inc.hxx"')
+    _initialized = True
+
+
+def parse_rules(rules: list[str]) -> dict[str, int]:
+    """Rules from PATTERN=BITS strings."""
+    result = {}
+    for rule in rules:
+        pattern, _, bits = rule.partition("=")
+        if not bits.isdigit() or not 1 <= int(bits) <= 23:
+            raise ValueError(f"Invalid precision rule {rule}, expected PATTERN=BITS")
+        result[pattern] = int(bits)
+    return result
+
+
+def reduced_columns(schema: dict[str, str], rules: dict[str, int]) -> dict[str, int]:
+    """Mantissa bits of the float columns matching a rule."""
+    result = {}
+    for column, column_type in schema.items():
+        for pattern, bits in rules.items():
+            if fnmatch.fnmatchcase(column, pattern):
+                if column_type in FLOAT_TYPES:
+                    result[column] = bits
+                else:
+                    log.debug("%s is %s, precision kept", column, column_type)
+                break
+    return result
+
+
+def def_reduced(
+    df: RDataFrame, schema: dict[str, str], rules: dict[str, int]
+) -> RDataFrame:
+    """Redefine the float columns matching the rules with reduced precision."""
+    init()
+    for column, bits in reduced_columns(schema, rules).items():
+        log.debug('Redefine("%s", "Precision::Truncate(%s, %d)")', column, column, bits)
+        df = df.Redefine(column, f"Precision::Truncate({column}, {bits})")
+    return df
@@ -0,0 +1,42 @@
+#ifndef PRECISION_INC_HXX
+#define PRECISION_INC_HXX
+
+#include "ROOT/RVec.hxx"
+
+#include <cmath>
+#include <cstdint>
+#include <cstring>
+
+namespace Precision
+{
+    /// Round a float to the nearest value with only bits mantissa bits.
+    ///
+    /// The dropped low bits are zero and compress to almost nothing, as
+    /// for the reduced precision columns of NanoAOD.
+    inline float Truncate(float x, int bits)
+    {
+        if (bits >= 23 || !std::isfinite(x))
+        {
+            return x;
+        }
+        std::uint32_t i;
+        std::memcpy(&i, &x, sizeof(i));
+        const int shift = 23 - bits;
+        i += std::uint32_t(1) << (shift - 1);
+        i &= ~((std::uint32_t(1) << shift) - 1);
+        float result;
+        std::memcpy(&result, &i, sizeof(result));
+        return std::isfinite(result) ? result : x;
+    }
+
+    inline ROOT::RVec<float> Truncate(const ROOT::RVec<float> &x, int bits)
+    {
+        ROOT::RVec<float> result(x.size());
+        for (std::size_t i = 0; i < x.size(); ++i)
+        {
+            result[i] = Truncate(x[i], bits);
+        }
+        return result;
+    }
+} // namespace Precision
+#endif
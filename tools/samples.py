@@ -0,0 +1,273 @@
+"""Samples from the dataset definitions.
+
+Reads the YAML written by create_yaml.py, one document per period, with
+nested groups (datasets or samples_groups) and samples on the filesystem
+(datasets_from_fs or samples_from_fs) given by their directory. Files listed
+in the exclude key of a sample (see create_yaml.py --exclude-report) are
+skipped.
+
+With create_yaml.py --manifest a sample also lists its files with their
+entries, size, modification time and weight sums:
+
+    files:
+    - {name: tree_1.root, entries: 120000, size: 81234567,
+       mtime_ns: 1690000000000000000, sum_weights: 95.2, sum_weights2: 1.3}
+
+Chains are then built without opening the files, and entries are known up
+front. An entry is ignored, with one warning per file, if the size or
+modification time of the file changed since.
+
+Columns added by fixdata.py --friend are in friend trees, one file per input
+file in a sibling directory named <directory>_friend. dataframe() attaches
+them when they exist.
+
+Example:
+    from tools import samples
+
+    for sample in samples.load("datasets/Met_NanoNtuple_v10_scratch.yaml"):
+        df = samples.dataframe(sample)
+"""
+
+import fnmatch
+import logging
+import os
+import pathlib
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Iterator
+
+import ROOT
+import ruamel.yaml
+
+log = logging.getLogger("mrtools.tools")
+
+RDataFrame = Any
+
+GROUP_KEYS = ["datasets", "samples_groups"]
+FS_KEYS = ["datasets_from_fs", "samples_from_fs"]
+EOS_KEYS = ["datasets_from_eos", "samples_from_eos"]
+
+TREE = "Events"
+FRIEND_TREE = "Friends"
+
+# RDataFrame does not own the chains
+_chains: list[ROOT.TChain] = []
+
+# Files with a stale manifest entry, warned about once
+_stale: set[str] = set()
+
+
+def friend_directory(directory: pathlib.Path) -> pathlib.Path:
+    """Directory of the friend trees of a sample directory."""
+    return directory.with_name(f"{directory.name}_friend")
+
+
+def friend_path(path: pathlib.Path | str) -> pathlib.Path:
+    """Friend tree file of an input file."""
+    path = pathlib.Path(path)
+    return friend_directory(path.parent) / f"{path.stem}_friend.root"
+
+
+@dataclass
+class Sample:
+    """Sample of one period."""
+
+    name: str
+    type: str
+    period: str
+    directory: pathlib.Path
+    groups: tuple[str, ...] = ()
+    attributes: dict[str, Any] = field(default_factory=dict)
+    exclude: list[str] = field(default_factory=list)
+    manifest: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        """Unique name, period/name."""
+        return f"{self.period}/{self.name}"
+
+    def files(self) -> list[str]:
+        """ROOT files of the sample, sorted, without the excluded ones."""
+        return sorted(
+            str(p) for p in self.directory.glob("*.root") if p.name not in self.exclude
+        )
+
+    def manifest_entry(self, path: str) -> dict[str, Any] | None:
+        """Manifest entry of a file, None if missing or stale."""
+        entry = self.manifest.get(os.path.basename(path))
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+            if path not in _stale:
+                log.warning("Stale manifest entry of %s", path)
+                _stale.add(path)
+            return None
+        return entry
+
+    def nr_entries(self, files: list[str] | None = None) -> int | None:
+        """Entries of the files from the manifest, None if any is unknown."""
+        total = 0
+        for file in files or self.files():
+            entry = self.manifest_entry(file)
+            if entry is None:
+                return None
+            total += entry["entries"]
+        return total
+
+    def friends(self, files: list[str] | None = None) -> list[str] | None:
+        """Friend tree files matching the files, None if there are none.
+
+        Raises:
+            FileNotFoundError: only some of the files have a friend.
+        """
+        if not friend_directory(self.directory).is_dir():
+            return None
+        result = [friend_path(f) for f in (files or self.files())]
+        missing = [str(p) for p in result if not p.exists()]
+        if missing:
+            raise FileNotFoundError(
+                f"{self.key}: {len(missing)} friend files missing, e.g. {missing[0]}"
+            )
+        return [str(p) for p in result]
+
+
+def dataframe(sample: Sample, files: list[str] | None = None) -> RDataFrame:
+    """RDataFrame of (some of) the files of a sample, with its friend trees."""
+    files = files or sample.files()
+    entries = []
+    for file in files:
+        entry = sample.manifest_entry(file)
+        # Known entries spare opening every file to count them before the loop
+        entries.append(entry["entries"] if entry else ROOT.TTree.kMaxEntries)
+
+    chain = ROOT.TChain(TREE)
+    for file, nr in zip(files, entries):
+        chain.Add(file, nr)
+    _chains.append(chain)
+
+    friends = sample.friends(files)
+    if friends:
+        friend_chain = ROOT.TChain(FRIEND_TREE)
+        for friend, nr in zip(friends, entries):
+            friend_chain.Add(friend, nr)
+        chain.AddFriend(friend_chain)
+        _chains.append(friend_chain)
+        log.debug("%s: %d friend files", sample.key, len(friends))
+
+    return ROOT.RDataFrame(chain)
+
+
+def first_entries(sample: Sample, entries: int) -> RDataFrame:
+    """RDataFrame of the first entries of a sample.
+
+    Only the files with these entries are read, e.g. to measure cuts on a
+    few entries (see tools.cutflow). With implicit MT the entries are those
+    with rdfentry_ below entries, in the order of the threads.
+    """
+    files = []
+    total = 0
+    for file in sample.files():
+        files.append(file)
+        entry = sample.manifest_entry(file)
+        # Without a manifest entry, one file is taken to be enough
+        total += entry["entries"] if entry else entries
+        if total >= entries:
+            break
+    df = dataframe(sample, files)
+    if ROOT.IsImplicitMTEnabled():
+        # Range is not supported in multi-threaded runs
+        log.debug('Filter("rdfentry_ < %d")', entries)
+        return df.Filter(f"rdfentry_ < {entries}")
+    return df.Range(entries)
+
+
+def release() -> None:
+    """Forget the chains of dataframes that are no longer used."""
+    _chains.clear()
+
+
+def _walk(
+    node: dict[str, Any], period: str, groups: tuple[str, ...]
+) -> Iterator[Sample]:
+    for key in FS_KEYS:
+        for entry in node.get(key, []):
+            yield Sample(
+                entry["name"],
+                entry["type"],
+                period,
+                pathlib.Path(entry["directory"]),
+                groups,
+                entry.get("attributes", {}),
+                entry.get("exclude", []),
+                {f["name"]: f for f in entry.get("files", [])},
+            )
+    for key in EOS_KEYS:
+        for entry in node.get(key, []):
+            log.warning("Sample %s on EOS is not supported", entry["name"])
+    for key in GROUP_KEYS:
+        for group in node.get(key, []):
+            yield from _walk(group, period, groups + (group["name"],))
+
+
+def load(
+    path: pathlib.Path | str,
+    periods: list[str] | None = None,
+    patterns: list[str] | None = None,
+) -> list[Sample]:
+    """Samples of a dataset definition.
+
+    Args:
+        path: YAML file.
+        periods: only these periods, if given.
+        patterns: only samples matching one of these glob patterns, if given.
+    """
+    with open(path, "r") as inp:
+        documents = list(ruamel.yaml.YAML(typ="safe").load_all(inp))
+
+    result = []
+    for document in documents:
+        period = document["period"]
+        if periods and period not in periods:
+            continue
+        for sample in _walk(document, period, ()):
+            if patterns and not any(fnmatch.fnmatch(sample.name, p) for p in patterns):
+                continue
+            result.append(sample)
+
+    log.debug("%d samples from %s", len(result), path)
+    return result
+
+
+def rewrite_directories(
+    input: pathlib.Path, output: pathlib.Path, directories: dict[str, pathlib.Path]
+) -> None:
+    """Copy of a dataset definition with new directories, by sample key."""
+
+    def walk(node: dict[str, Any], period: str) -> None:
+        for key in FS_KEYS:
+            for entry in node.get(key, []):
+                directory = directories.get(f"{period}/{entry['name']}")
+                if directory:
+                    entry["directory"] = str(directory)
+                    # Those were of the old files
+                    entry.pop("exclude", None)
+                    entry.pop("files", None)
+        for key in GROUP_KEYS:
+            for group in node.get(key, []):
+                walk(group, period)
+
+    yaml = ruamel.yaml.YAML()
+    yaml.explicit_start = True
+    with open(input, "r") as inp:
+        documents = list(yaml.load_all(inp))
+    for document in documents:
+        document["name"] = output.stem
+        walk(document, document["period"])
+    with open(output, "w") as out:
+        yaml.dump_all(documents, out)
+    log.info("Dataset definition written to %s", output)
@@ -0,0 +1,119 @@
+"""Compression and basket layout of snapshots.
+
+Settings are given as ALGORITHM[:LEVEL] (zlib, lzma, lz4 or zstd), a basket
+size in bytes and the auto-flush cluster size (entries if positive, bytes
+if negative, as for TTree::SetAutoFlush). Unset values keep the ROOT
+defaults. bench_snapshot.py compares settings.
+
+Example:
+    from tools import snapshot
+
+    settings = snapshot.Settings.parse("zstd:5", basket_size=256000)
+    df.Snapshot("Events", path, columns, settings.options())
+
+Scripts writing snapshots add the command line options with
+@snapshot.click_options and get Settings as the snapshot_settings argument.
+"""
+
+import functools
+import logging
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+
+import click
+import ROOT
+
+log = logging.getLogger("mrtools.tools")
+
+ALGORITHMS = {
+    "zlib": "kZLIB",
+    "lzma": "kLZMA",
+    "lz4": "kLZ4",
+    "zstd": "kZSTD",
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Compression and basket layout, None for the ROOT default."""
+
+    algorithm: str | None = None
+    level: int | None = None
+    basket_size: int | None = None
+    auto_flush: int | None = None
+
+    @classmethod
+    def parse(
+        cls,
+        compression: str | None,
+        basket_size: int | None = None,
+        auto_flush: int | None = None,
+    ) -> "Settings":
+        """Settings from ALGORITHM[:LEVEL] and the basket layout."""
+        algorithm = level = None
+        if compression:
+            algorithm, _, level_text = compression.lower().partition(":")
+            if algorithm not in ALGORITHMS:
+                raise ValueError(f"Unknown compression algorithm {algorithm}")
+            level = int(level_text) if level_text else None
+        return cls(algorithm, level, basket_size, auto_flush)
+
+    @property
+    def label(self) -> str:
+        parts = [self.algorithm or "default"]
+        if self.level is not None:
+            parts[0] += f":{self.level}"
+        if self.basket_size:
+            parts.append(f"basket={self.basket_size}")
+        if self.auto_flush:
+            parts.append(f"flush={self.auto_flush}")
+        return ",".join(parts)
+
+    def options(self, lazy: bool = False) -> ROOT.RDF.RSnapshotOptions:
+        """RSnapshotOptions with these settings."""
+        options = ROOT.RDF.RSnapshotOptions()
+        options.fLazy = lazy
+        if self.algorithm:
+            options.fCompressionAlgorithm = getattr(
+                ROOT.RCompressionSetting.EAlgorithm, ALGORITHMS[self.algorithm]
+            )
+        if self.level is not None:
+            options.fCompressionLevel = self.level
+        if self.basket_size:
+            # ROOT >= 6.30
+            options.fBasketSize = self.basket_size
+        if self.auto_flush:
+            options.fAutoFlush = self.auto_flush
+        log.debug("Snapshot options %s", self.label)
+        return options
+
+
+def click_options(function: Callable) -> Callable:
+    """Add --compression, --basket-size and --auto-flush, as snapshot_settings."""
+
+    @click.option(
+        "--compression",
+        help="Output compression ALGORITHM[:LEVEL], zlib, lzma, lz4 or zstd.",
+    )
+    @click.option("--basket-size", type=int, help="Output basket size in bytes.")
+    @click.option(
+        "--auto-flush",
+        type=int,
+        help="Output cluster size, entries if positive, bytes if negative.",
+    )
+    @functools.wraps(function)
+    def wrapper(
+        *args: Any,
+        compression: str | None,
+        basket_size: int | None,
+        auto_flush: int | None,
+        **kwargs: Any,
+    ) -> Any:
+        try:
+            settings = Settings.parse(compression, basket_size, auto_flush)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--compression")
+        return function(*args, snapshot_settings=settings, **kwargs)
+
+    return wrapper
@@ -0,0 +1,104 @@
+"""Event weights with systematic variations.
+
+The event weight is the product of factors, each with optional up and down
+variants. The nominal weight is a Define, and each factor with variants is
+registered with RDataFrame Vary, so histograms booked on the weight can get
+all variations filled in the nominal event loop with VariationsFor (see
+tools.histos).
+
+Example:
+    from tools import weights
+
+    df = weights.def_weight(df, "the_weight", weights.FACTORS, is_data)
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+log = logging.getLogger("mrtools.tools")
+
+RDataFrame = Any
+
+
+@dataclass(frozen=True)
+class Factor:
+    """Weight factor, with the columns of its down and up variants."""
+
+    nominal: str
+    down: str | None = None
+    up: str | None = None
+    systematic: str | None = None
+
+    @property
+    def name(self) -> str:
+        """Name of the variation."""
+        return self.systematic or self.nominal
+
+    @property
+    def varied(self) -> bool:
+        return self.down is not None and self.up is not None
+
+
+FACTORS = [
+    Factor("reweightPU", "reweightPUDown", "reweightPUUp"),
+    Factor("reweightBTag_SF", "reweightBTag_SF_b_Down", "reweightBTag_SF_b_Up"),
+    Factor("reweightL1Prefire", "reweightL1PrefireDown", "reweightL1PrefireUp"),
+    Factor("reweightwPt"),
+    Factor("reweightLeptonSF", "reweightLeptonSFDown", "reweightLeptonSFUp"),
+]
+
+
+def replace(factors: list[Factor], nominal: str, factor: Factor) -> list[Factor]:
+    """Factors with the one of the given nominal column replaced."""
+    return [factor if f.nominal == nominal else f for f in factors]
+
+
+def _product(factors: list[str]) -> str:
+    return "*".join(factors) if factors else "1"
+
+
+def def_weight(
+    df: RDataFrame,
+    name: str,
+    factors: list[Factor],
+    is_data: bool = False,
+    variations: bool = True,
+) -> RDataFrame:
+    """Define the event weight and register its variations.
+
+    Variants whose columns are missing in the dataframe are skipped.
+
+    Args:
+        df: input dataframe.
+        name: name of the weight column.
+        factors: weight factors.
+        is_data: if True the weight is 1.
+        variations: register the variations with Vary.
+    """
+    if is_data:
+        log.debug('Define("%s", "1")', name)
+        return df.Define(name, "1")
+
+    # Float_t products, in double like the RVecD of the variations
+    nominal = [f.nominal for f in factors]
+    expr = f"static_cast<double>({_product(nominal)})"
+    log.debug('Define("%s", "%s")', name, expr)
+    df = df.Define(name, expr)
+    if not variations:
+        return df
+
+    columns = set(df.GetColumnNames())
+    for i, factor in enumerate(factors):
+        if not factor.varied:
+            continue
+        if factor.down not in columns or factor.up not in columns:
+            log.warning("No variations for %s", factor.nominal)
+            continue
+        down = _product(nominal[:i] + [factor.down] + nominal[i + 1 :])
+        up = _product(nominal[:i] + [factor.up] + nominal[i + 1 :])
+        expr = f"ROOT::RVecD{{{down}, {up}}}"
+        log.debug('Vary("%s", "%s", ["down", "up"], "%s")', name, expr, factor.name)
+        df = df.Vary(name, expr, ["down", "up"], factor.name)
+
+    return df